@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.v1.routes import health, ingest, embed, generate, collections
+from app.api.v1.routes import health, ingest, embed, generate, collections, jobs
 
 
 api_router = APIRouter()
@@ -7,4 +7,5 @@ api_router.include_router(health.router, prefix="/health", tags=["health"])
 api_router.include_router(ingest.router, prefix="/ingest", tags=["ingest"])
 api_router.include_router(embed.router, prefix="/ingest", tags=["embedding"])
 api_router.include_router(generate.router, prefix="/generate", tags=["generation"])
-api_router.include_router(collections.router, prefix="/collections", tags=["collections"])
\ No newline at end of file
+api_router.include_router(collections.router, prefix="/collections", tags=["collections"])
+api_router.include_router(jobs.router, prefix="/jobs", tags=["jobs"])
\ No newline at end of file
@@ -1,7 +1,18 @@
 import logging
 from fastapi import APIRouter, HTTPException
-from app.config.config import PGVECTOR_DSN
-from app.core.pgvector.pgvector import PgVectorStore
+from app.core.pgvector.factory import get_vector_store
+from app.tasks.collections import build_collection_index, build_source_indexes, reindex_collection, tune_collection_search
+
+from app.api.v1.schemas.collections import (
+    CreateCollectionRequest,
+    CollectionInfo,
+    BuildIndexRequest,
+    ReindexRequest,
+    TuneRequest,
+    SourceIndexRequest,
+    CollectionJobResponse,
+    IndexProgressResponse,
+)
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -12,9 +23,9 @@ def list_collections():
     Lists all available vector collections (tables).
     """
     try:
-        pgvector_store = PgVectorStore(dsn=PGVECTOR_DSN)
+        pgvector_store = get_vector_store()
         tables = pgvector_store.list_tables()
-        pgvector_store.pg_pool.disconnect()
+        pgvector_store.close()
         return tables
     except Exception as e:
         logger.error(f"Error listing collections: {str(e)}", exc_info=True)
@@ -22,3 +33,214 @@ def list_collections():
             status_code=500,
             detail=f"Failed to list collections: {str(e)}"
         )
+
+@router.post("/", response_model=CollectionInfo)
+def create_collection(req: CreateCollectionRequest):
+    """
+    Creates a vector collection.
+
+    With defer_index=True the collection is created without its ANN index (bulk-load
+    mode), the index is then built once with POST /collections/{name}/index.
+    """
+    pgvector_store = get_vector_store()
+    try:
+        created = pgvector_store.create_vector_collection(
+            collection_name=req.name,
+            index_type=req.index_type,
+            dim=req.dim,
+            hnsw_m=req.hnsw_m,
+            hnsw_ef_construction=req.hnsw_ef_construction,
+            ivf_lists=req.ivf_lists,
+            storage=req.storage,
+            short_dim=req.short_dim,
+            defer_index=req.defer_index,
+            recall_target=req.recall_target,
+            partition_by=req.partition_by,
+            hash_partitions=req.hash_partitions,
+        )
+        if not created:
+            raise HTTPException(status_code=409, detail=f"Collection '{req.name}' already exists or is invalid.")
+
+        meta = pgvector_store.get_collection_meta(req.name)
+        return CollectionInfo(**vars(meta))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        pgvector_store.close()
+
+@router.post("/{name}/index", response_model=CollectionJobResponse)
+def build_index(name: str, req: BuildIndexRequest):
+    """
+    Enqueues the build of the ANN index of a bulk-loaded collection.
+    The job can be followed with GET /collections/{name}/index/progress.
+    """
+    pgvector_store = get_vector_store()
+    try:
+        if not pgvector_store.table_exists(name.lower()):
+            raise HTTPException(status_code=404, detail=f"Collection '{name}' does not exist.")
+    finally:
+        pgvector_store.close()
+
+    msg = build_collection_index.send(
+        collection=name.lower(),
+        maintenance_work_mem=req.maintenance_work_mem,
+        parallel_workers=req.parallel_workers,
+    )
+
+    return CollectionJobResponse(
+        job_id=msg.message_id,
+        queue=msg.queue_name,
+        actor=msg.actor_name,
+        collection=name.lower(),
+    )
+
+@router.post("/{name}/reindex", response_model=CollectionJobResponse)
+def reindex(name: str, req: ReindexRequest):
+    """
+    Enqueues an online rebuild of the ANN index of a collection (new parameters or
+    HNSW <-> IVFFlat). The new index only replaces the current one if it passes the
+    recall check, the job result tells which one is in place.
+    """
+    if req.index_type is not None and req.index_type.lower() not in ("hnsw", "ivfflat"):
+        raise HTTPException(status_code=400, detail="index_type must be 'hnsw' or 'ivfflat'")
+
+    pgvector_store = get_vector_store()
+    try:
+        if not pgvector_store.table_exists(name.lower()):
+            raise HTTPException(status_code=404, detail=f"Collection '{name}' does not exist.")
+    finally:
+        pgvector_store.close()
+
+    msg = reindex_collection.send(
+        collection=name.lower(),
+        index_type=req.index_type,
+        index_params=req.index_params,
+        min_recall=req.min_recall,
+        sample_size=req.sample_size,
+        maintenance_work_mem=req.maintenance_work_mem,
+    )
+
+    return CollectionJobResponse(
+        job_id=msg.message_id,
+        queue=msg.queue_name,
+        actor=msg.actor_name,
+        collection=name.lower(),
+    )
+
+@router.get("/{name}/index/progress", response_model=IndexProgressResponse)
+def index_progress(name: str):
+    """
+    Returns the progress of the ANN index build of a collection (pg_stat_progress_create_index).
+    """
+    pgvector_store = get_vector_store()
+    try:
+        if not pgvector_store.table_exists(name.lower()):
+            raise HTTPException(status_code=404, detail=f"Collection '{name}' does not exist.")
+
+        progress = pgvector_store.get_index_build_progress(name)
+        meta = pgvector_store.get_collection_meta(name)
+
+        return IndexProgressResponse(
+            collection=meta.name,
+            building=progress is not None,
+            index_deferred=bool(meta.options.get("index_deferred")),
+            progress=progress,
+        )
+    finally:
+        pgvector_store.close()
+
+@router.post("/{name}/tune", response_model=CollectionJobResponse)
+def tune(name: str, req: TuneRequest):
+    """
+    Enqueues the tuning of the search parameters (ef_search / probes) of a collection.
+    Retrieval uses the tuned values as soon as the job is done.
+    """
+    pgvector_store = get_vector_store()
+    try:
+        if not pgvector_store.table_exists(name.lower()):
+            raise HTTPException(status_code=404, detail=f"Collection '{name}' does not exist.")
+    finally:
+        pgvector_store.close()
+
+    msg = tune_collection_search.send(
+        collection=name.lower(),
+        ks=req.ks,
+        recall_target=req.recall_target,
+        sample_size=req.sample_size,
+    )
+
+    return CollectionJobResponse(
+        job_id=msg.message_id,
+        queue=msg.queue_name,
+        actor=msg.actor_name,
+        collection=name.lower(),
+    )
+
+@router.get("/{name}/tuning", response_model=list[dict])
+def get_tuning(name: str):
+    """
+    Returns the tuned search parameters of a collection.
+    """
+    pgvector_store = get_vector_store()
+    try:
+        if not pgvector_store.table_exists(name.lower()):
+            raise HTTPException(status_code=404, detail=f"Collection '{name}' does not exist.")
+        return pgvector_store.get_search_tuning(name)
+    finally:
+        pgvector_store.close()
+
+@router.post("/{name}/source-indexes", response_model=CollectionJobResponse)
+def build_partial_indexes(name: str, req: SourceIndexRequest):
+    """
+    Enqueues the build of partial ANN indexes for hot sources. Searches filtered on
+    these sources then use their own index instead of filtering the main one.
+    """
+    pgvector_store = get_vector_store()
+    try:
+        if not pgvector_store.table_exists(name.lower()):
+            raise HTTPException(status_code=404, detail=f"Collection '{name}' does not exist.")
+    finally:
+        pgvector_store.close()
+
+    msg = build_source_indexes.send(
+        collection=name.lower(),
+        sources=req.sources,
+        min_rows=req.min_rows,
+        maintenance_work_mem=req.maintenance_work_mem,
+    )
+
+    return CollectionJobResponse(
+        job_id=msg.message_id,
+        queue=msg.queue_name,
+        actor=msg.actor_name,
+        collection=name.lower(),
+    )
+
+@router.delete("/{name}/source-indexes/{source}")
+def drop_partial_index(name: str, source: str):
+    """
+    Drops the partial ANN index of a source.
+    """
+    pgvector_store = get_vector_store()
+    try:
+        if not pgvector_store.drop_source_index(name, source):
+            raise HTTPException(status_code=404, detail=f"Source '{source}' has no partial index in '{name}'.")
+        return {"status": "success", "collection": name.lower(), "source": source}
+    finally:
+        pgvector_store.close()
+
+@router.delete("/{name}/partitions/{key}")
+def drop_partition(name: str, key: str):
+    """
+    Drops the partition of a source / tenant of a LIST partitioned collection.
+    """
+    pgvector_store = get_vector_store()
+    try:
+        if not pgvector_store.table_exists(name.lower()):
+            raise HTTPException(status_code=404, detail=f"Collection '{name}' does not exist.")
+        rows = pgvector_store.drop_partition(name, key)
+        return {"status": "success", "collection": name.lower(), "key": key, "rows_deleted": rows}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        pgvector_store.close()
@@ -1,18 +1,22 @@
 import logging
-import torch
-from typing import List
+from typing import TYPE_CHECKING, List, Optional
 
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 
-from app.core.qwen_embedder import QwenEmbedder
+from app.core.metrics import EMBED_BATCH_SECONDS, EMBED_BATCH_SIZE, timed
+from app.core.profiling import profile_request
+
+if TYPE_CHECKING:
+    # Torch and transformers are loaded with the first embedding, not when the API starts.
+    from app.core.qwen_embedder import QwenEmbedder
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 _embedder = None
 
-def get_embedder() -> QwenEmbedder:
+def get_embedder() -> "QwenEmbedder":
     """
     Initializes and returns a singleton instance of QwenEmbedder.
     """
@@ -20,6 +24,7 @@ def get_embedder() -> QwenEmbedder:
     if _embedder is None:
         logger.info("Initializing QwenEmbedder...")
         try:
+            from app.core.qwen_embedder import QwenEmbedder
             _embedder = QwenEmbedder()
             logger.info("QwenEmbedder successfully initialized")
         except Exception as e:
@@ -27,13 +32,62 @@ def get_embedder() -> QwenEmbedder:
             raise HTTPException(status_code=503, detail="Embedding service unavailable")
     return _embedder
 
+def _empty_cuda_cache():
+    # Nothing to free if the embedder (and so torch) was never loaded.
+    if _embedder is None:
+        return
+    import torch
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
 class EmbedRequest(BaseModel):
     texts: List[str]
     max_length: int = 1024
+    dim: Optional[int] = None  # Truncated (Matryoshka) output dimension, e.g. 256
 
 class EmbedResponse(BaseModel):
     embeddings: List[List[float]]
 
+def compute_embeddings(texts: List[str], max_length: int = 1024, dim: Optional[int] = None) -> List[List[float]]:
+    """
+    Generates normalized embeddings for a list of texts with the in-process embedder.
+
+    Args:
+        texts: Texts to embed
+        max_length: Maximum number of tokens per text
+        dim: Optional reduced output dimension (prefix of the vector, re-normalized)
+
+    Returns:
+        One embedding vector per text
+    """
+    if not texts:
+        return []
+
+    embedder = get_embedder()
+
+    # Process in small batches to avoid memory issues.
+    batch_size = 8
+    all_embeddings = []
+
+    for i in range(0, len(texts), batch_size):
+        batch_texts = texts[i:i + batch_size]
+        logger.debug(f"Processing batch {i//batch_size + 1} ({len(batch_texts)} texts)")
+
+        with timed(EMBED_BATCH_SECONDS, where="api"):
+            batch_embeddings = embedder.embed(batch_texts, max_length=max_length, dim=dim)
+        EMBED_BATCH_SIZE.labels(where="api").observe(len(batch_texts))
+
+        if hasattr(batch_embeddings, 'tolist'):
+            batch_embeddings_list = batch_embeddings.tolist()
+        else:
+            batch_embeddings_list = batch_embeddings
+
+        all_embeddings.extend(batch_embeddings_list)
+
+    _empty_cuda_cache()
+
+    return all_embeddings
+
 @router.post("/embed", response_model=EmbedResponse)
 def embed_texts(req: EmbedRequest):
     """
@@ -54,27 +108,8 @@ def embed_texts(req: EmbedRequest):
             
         logger.info(f"Computing embeddings for {len(req.texts)} texts")
         
-        embedder = get_embedder()
-        
-        # Process in small batches to avoid memory issues.
-        batch_size = 8
-        all_embeddings = []
-        
-        for i in range(0, len(req.texts), batch_size):
-            batch_texts = req.texts[i:i + batch_size]
-            logger.debug(f"Processing batch {i//batch_size + 1} ({len(batch_texts)} texts)")
-            
-            batch_embeddings = embedder.embed(batch_texts, max_length=req.max_length)
-            
-            if hasattr(batch_embeddings, 'tolist'):
-                batch_embeddings_list = batch_embeddings.tolist()
-            else:
-                batch_embeddings_list = batch_embeddings
-                
-            all_embeddings.extend(batch_embeddings_list)
-            
-        if torch.cuda.is_available():
-            torch.cuda.empty_cache()
+        with profile_request("embed"):
+            all_embeddings = compute_embeddings(req.texts, max_length=req.max_length, dim=req.dim)
             
         logger.info(f"Embeddings computed: {len(all_embeddings)} vectors of dimension {len(all_embeddings[0]) if all_embeddings else 0}")
         
@@ -82,6 +117,5 @@ def embed_texts(req: EmbedRequest):
         
     except Exception as e:
         logger.error(f"Error during embedding computation: {e}")
-        if torch.cuda.is_available():
-            torch.cuda.empty_cache()
+        _empty_cuda_cache()
         raise HTTPException(status_code=500, detail=f"Error during embedding computation: {str(e)}")
\ No newline at end of file
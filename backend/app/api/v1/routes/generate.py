@@ -2,6 +2,8 @@ import json
 import logging
 import time 
 
+from concurrent.futures import ThreadPoolExecutor
+
 from fastapi import APIRouter, HTTPException, Depends
 from fastapi.responses import StreamingResponse
 from dramatiq.results import ResultTimeout, ResultMissing
@@ -11,6 +13,12 @@ from app.api.v1.schemas.ingest import JobStatusReq
 from app.tasks.generate import generate_answer, generate_answer_stream, STREAM_PREFIX
 # Redis
 from app.core.redis_config import redis_client
+from app.core import job_coalescing
+from app.core.query_vectors import publish_query_vector
+from app.api.v1.routes.embed import compute_embeddings
+from app.core.pgvector.pgvector_utils import PgVectorUtils
+from app.config.embedding_settings import embedding_settings
+from app.core.metrics import SSE_CLIENTS
 from app.tasks import results_backend
 
 
@@ -18,6 +26,29 @@ from app.tasks import results_backend
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Query embeddings computed while the stream job waits in the queue.
+_speculative_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="speculative-embed")
+
+
+def _speculative_embed(job_id: str, query: str):
+    """
+    Embeds the query (embedding service, or the API process without one) and hands the vector over to the worker of job_id.
+    """
+    vector = None
+    try:
+        if embedding_settings.EMBEDDING_SERVICE_URL:
+            vector = PgVectorUtils().embed([query], priority="interactive")[0]
+        else:
+            vector = compute_embeddings([query])[0]
+    except Exception as e:
+        logger.error(f"Speculative query embedding failed for job {job_id}: {str(e)}")
+    finally:
+        # Always publish (even None) so the worker doesn't wait for nothing.
+        try:
+            publish_query_vector(job_id, vector)
+        except Exception as e:
+            logger.error(f"Error publishing query vector for job {job_id}: {str(e)}")
+
 @router.post("/", response_model=GenerateResponse)
 def generate_endpoint(req: GenerateRequest) -> GenerateResponse:
     """
@@ -31,17 +62,48 @@ def generate_endpoint(req: GenerateRequest) -> GenerateResponse:
     """
     try:
         logger.info(f"Submitting generation job for query: '{req.query[:50]}...'")
-        
-        # Send job to Dramatiq worker
-        message = generate_answer.send(
+
+        coalesce_key = job_coalescing.build_coalesce_key(
+            "result",
+            collection=req.collection,
+            query=req.query,
+            k=req.k,
+            sources=req.sources,
+            tenant=req.tenant,
+            temperature=req.temperature,
+            rerank=req.rerank,
+        )
+
+        # The message id is known before enqueueing, so we can register it as the leader first.
+        message = generate_answer.message(
             query=req.query,
             collection=req.collection,
             k=req.k,
             sources=req.sources,
-            temperature=req.temperature
+            tenant=req.tenant,
+            temperature=req.temperature,
+            rerank=req.rerank,
+            coalesce_key=coalesce_key,
         )
 
-        job_id = message.message_id
+        job_id, is_leader = job_coalescing.acquire_or_join(coalesce_key, message.message_id)
+
+        if not is_leader:
+            logger.info(f"Identical generation job already in flight, joining job {job_id}")
+            return GenerateResponse(
+                job_id=job_id,
+                status="pending",
+                message="An identical generation job is already running. Use job_id to check status.",
+                coalesced=True,
+            )
+
+        # Send job to Dramatiq worker
+        try:
+            generate_answer.broker.enqueue(message)
+        except Exception:
+            job_coalescing.release(coalesce_key, job_id)
+            raise
+
         logger.info(f"Generation job submitted with ID: {job_id}")
 
         return GenerateResponse(
@@ -61,19 +123,48 @@ def generate_endpoint(req: GenerateRequest) -> GenerateResponse:
 @router.get("/stream")
 def stream_generate(req: GenerateStreamRequest = Depends()):
     job_id = f"stream-{int(time.time() * 1000)}-{id(req)}"
-    stream_key = f"{STREAM_PREFIX}:{job_id}"
 
-    generate_answer_stream.send(
-        job_id=job_id,
-        query=req.query,
+    coalesce_key = job_coalescing.build_coalesce_key(
+        "stream",
         collection=req.collection,
+        query=req.query,
         k=req.k,
         sources=req.sources,
+        tenant=req.tenant,
         temperature=req.temperature,
+        rerank=req.rerank,
     )
+    job_id, is_leader = job_coalescing.acquire_or_join(coalesce_key, job_id)
+
+    if is_leader:
+        # Start embedding the query right away, concurrently with enqueueing and queue wait.
+        _speculative_executor.submit(_speculative_embed, job_id, req.query)
+
+        try:
+            generate_answer_stream.send(
+                job_id=job_id,
+                query=req.query,
+                collection=req.collection,
+                k=req.k,
+                sources=req.sources,
+                tenant=req.tenant,
+                temperature=req.temperature,
+                rerank=req.rerank,
+                coalesce_key=coalesce_key,
+                speculative_embedding=True,
+            )
+        except Exception:
+            job_coalescing.release(coalesce_key, job_id)
+            raise
+    else:
+        # Followers read the leader's stream from the beginning, so they get every token.
+        logger.info(f"Identical stream already in flight, attaching to {job_id}")
+
+    stream_key = f"{STREAM_PREFIX}:{job_id}"
 
     def event_stream():
         last_id = "0-0"
+        SSE_CLIENTS.inc()
         try:
             while True:
                 results = redis_client.xread(
@@ -107,6 +198,8 @@ def stream_generate(req: GenerateStreamRequest = Depends()):
             logger.error(f"Error streaming generation: {str(e)}", exc_info=True)
             payload = json.dumps({"error": str(e)})
             yield f"event: error\ndata: {payload}\n\n"
+        finally:
+            SSE_CLIENTS.dec()
 
     headers = {
         "Cache-Control": "no-cache",
@@ -1,7 +1,47 @@
+from typing import Optional
+
 from fastapi import APIRouter
 
+from app.config.config import PGVECTOR_DSN, PGVECTOR_REPLICA_DSNS, REPLICA_MAX_LAG_SECONDS
+from app.core.pgvector.pgpool_connector import PgPoolConnector
+from app.core.pgvector.replica_router import ReplicaRouter
+
 router = APIRouter()
 
+_replica_router: Optional[ReplicaRouter] = None
+
+
+def get_replica_router() -> ReplicaRouter:
+    """
+    ReplicaRouter of the health endpoint, created on first use and shared by every call
+    (its replica pools are only opened by reads, status() checks on short-lived connections).
+    """
+    global _replica_router
+    if _replica_router is None:
+        _replica_router = ReplicaRouter(
+            PgPoolConnector(PGVECTOR_DSN),
+            PGVECTOR_REPLICA_DSNS,
+            max_lag_seconds=REPLICA_MAX_LAG_SECONDS,
+        )
+    return _replica_router
+
+
+def close_replica_router():
+    global _replica_router
+    if _replica_router is not None:
+        _replica_router.disconnect()
+        _replica_router.primary.disconnect()
+        _replica_router = None
+
+
 @router.get("/healthz")
 def healthz():
     return {"status": "ok"}
+
+
+@router.get("/replicas")
+def replicas():
+    """
+    Health and replication lag of the read replicas (empty list without replicas).
+    """
+    return {"replicas": get_replica_router().status()}
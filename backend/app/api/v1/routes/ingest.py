@@ -19,8 +19,10 @@ from app.core.redis_config import redis_client
 from uuid import uuid4
 
 from app.tasks.ingest import validate_and_promote
-from app.core.minio_client import MinioClient # Bucket client for MinIO/S3.
+from app.core.minio_client import get_minio_client # Bucket client for MinIO/S3 (created on first use).
 from app.core.job_utils import build_message_for
+from app.core.job_status import save_batch
+from app.core.ingest_stages import read_progress
 from app.core.settings import Settings
 # from app.core.qwen_embedder import QwenEmbedder
 
@@ -37,8 +39,6 @@ router = APIRouter()
 # embedder = QwenEmbedder()
 logger = logging.getLogger(__name__)
 
-minio_client = MinioClient()
-
 @router.post("/upload/presign/batch", response_model=BatchPresignResp)
 def presign_batch(req: BatchPresignReq):
     expires_in = 600
@@ -51,7 +51,7 @@ def presign_batch(req: BatchPresignReq):
 
         headers = {"Content-Type": f.content_type or "application/octet-stream"}
 
-        url = minio_client.presigned_put_url(
+        url = get_minio_client().presigned_put_url(
             key=s3_key,
             expires_seconds=expires_in,
         )
@@ -103,7 +103,7 @@ def presign_upload(req: PresignReq):
     
     expires_in = 600 
 
-    url = minio_client.presigned_put_url(
+    url = get_minio_client().presigned_put_url(
         key=s3_key,
         expires_seconds=expires_in
     )
@@ -142,7 +142,7 @@ def enqueue_batch(req: EnqueueBatchReq):
     queue_name: Optional[str] = None
 
     for item in req.items:
-        if not minio_client.object_exists(item.s3_key):
+        if not get_minio_client().object_exists(item.s3_key):
             file_refused.append(item.doc_id)
             logger.warning("S3 key not found, skipping: %s", item.s3_key)
             continue
@@ -153,17 +153,27 @@ def enqueue_batch(req: EnqueueBatchReq):
             filename=item.filename,
             collection=req.collection,
             checksum_sha256=item.checksum_sha256,
+            tenant=req.tenant or item.tenant,
         )
 
         job_ids.append(msg.message_id)
         if queue_name is None:
             queue_name = msg.queue_name
 
+    batch_id = None
+    if job_ids:
+        try:
+            batch_id = save_batch(job_ids, validate_and_promote.actor_name, queue_name)
+        except Exception as e:
+            # The jobs are enqueued anyway, they can still be followed by job id.
+            logger.error(f"Error registering the job batch: {str(e)}")
+
     return EnqueueBatchResp(
         collection=req.collection,
         job_ids=job_ids,
         file_refused=file_refused,
         queue=queue_name,
+        batch_id=batch_id,
     )
 
 
@@ -188,7 +198,7 @@ def enqueue_after_upload(req: EnqueueReq):
     if not stored or stored.get("doc_id") != req.doc_id:
         raise HTTPException(status_code=400, detail="doc_id and s3_key do not match any known upload.")
 
-    if not minio_client.object_exists(req.s3_key):
+    if not get_minio_client().object_exists(req.s3_key):
         raise HTTPException(status_code=404, detail=f"S3 key not found: {req.s3_key}")
     
     msg: Message = validate_and_promote.send(
@@ -197,6 +207,7 @@ def enqueue_after_upload(req: EnqueueReq):
         filename=req.filename,
         collection=req.collection,
         checksum_sha256=req.checksum_sha256,
+        tenant=req.tenant,
     )
 
     logger.info(f"Message : {msg}")
@@ -234,3 +245,29 @@ def job_status(req: JobStatusReq = Depends()):
         return {"status": "pending"}
     except ResultTimeout:
         return {"status": "timeout"}
+
+
+@router.get("/ingest/progress/{doc_id}")
+def ingest_progress(doc_id: str, last_id: str = "0-0", count: int = 100):
+    """
+    Progress events of a document ingestion (stage timings, started / finished / failed).
+
+    Args:
+        doc_id: Document id returned by the enqueue endpoints
+        last_id: Id of the last event already received, to only get the new ones
+        count: Maximum number of events returned
+
+    Returns:
+        dict: {"doc_id", "events": [{"id", "type", "data"}, ...], "last_id"}
+    """
+    try:
+        events = read_progress(doc_id, last_id=last_id, count=count)
+    except Exception as e:
+        logger.error(f"Error reading ingest progress of {doc_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return {
+        "doc_id": doc_id,
+        "events": events,
+        "last_id": events[-1]["id"] if events else last_id,
+    }
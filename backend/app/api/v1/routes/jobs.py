@@ -0,0 +1,151 @@
+import asyncio
+import json
+import logging
+import time
+
+from functools import partial
+from typing import Dict, List, Optional
+
+from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+
+from app.api.v1.schemas.jobs import BulkJobStatusRequest, BulkJobStatusResponse, JobBatchRequest, JobBatchResponse
+from app.config.config import JOB_STATUS_POLL_MS, JOB_STATUS_MAX_WAIT_MS, JOB_STATUS_MAX_JOBS, JOB_EVENTS_MAX_SECONDS
+from app.core import job_status
+from app.core.job_status import JobRef
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+KEEPALIVE_SECONDS = 15  # SSE comment sent when nothing changed for this long (proxies close idle connections)
+
+
+def _resolve_jobs(batch_id: Optional[str], job_ids: List[str], actor_name: str, queue: Optional[str]) -> List[JobRef]:
+    try:
+        if batch_id:
+            refs = job_status.load_batch(batch_id)
+            if refs is None:
+                raise HTTPException(status_code=404, detail=f"Unknown or expired batch: {batch_id}")
+            return refs
+        if not job_ids:
+            raise HTTPException(status_code=400, detail="job_ids or batch_id is required.")
+        if len(job_ids) > JOB_STATUS_MAX_JOBS:
+            raise HTTPException(status_code=400, detail=f"At most {JOB_STATUS_MAX_JOBS} jobs per request.")
+        return job_status.job_refs(job_ids, actor_name, queue)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/status", response_model=BulkJobStatusResponse)
+async def bulk_job_status(req: BulkJobStatusRequest):
+    """
+    Status of many jobs with one pipelined Redis round trip, instead of one /ingest/status call per job.
+
+    With wait_ms > 0 the request long-polls: it returns as soon as a job changes state
+    (compared to `known`, or to the states when the request came in), when every job
+    is finished, or after wait_ms. The client sends the states it got back as `known`
+    on its next call.
+
+    Returns:
+        jobs: {job_id: {"status": "pending" | "done" | "failed", "state", "result" | "error", "next"}}
+        changed: ids of the jobs whose state differs from known
+        pending: number of jobs not finished yet
+        timed_out: True if wait_ms expired without any change
+    """
+    refs = _resolve_jobs(req.batch_id, req.job_ids, req.actor_name, req.queue)
+    fetch = partial(job_status.fetch_statuses, refs, include_results=req.include_results, follow=req.follow)
+    wait_ms = min(max(req.wait_ms, 0), JOB_STATUS_MAX_WAIT_MS)
+
+    try:
+        statuses = await run_in_threadpool(fetch)
+        # Without known states, a long-poll waits for changes from now on, a plain call reports every job.
+        known: Dict[str, str] = req.known or ({job_id: entry["state"] for job_id, entry in statuses.items()} if wait_ms else {})
+        moved = job_status.changed(statuses, known)
+
+        deadline = time.monotonic() + wait_ms / 1000.0
+        timed_out = False
+        while not moved and not all(job_status.is_terminal(entry) for entry in statuses.values()):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                timed_out = wait_ms > 0
+                break
+            await asyncio.sleep(min(JOB_STATUS_POLL_MS / 1000.0, remaining))
+            statuses = await run_in_threadpool(fetch)
+            moved = job_status.changed(statuses, known)
+    except Exception as e:
+        logger.error(f"Error reading the status of {len(refs)} job(s): {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Failed to read job status: {str(e)}")
+
+    return BulkJobStatusResponse(
+        jobs=statuses,
+        changed=moved,
+        pending=sum(1 for entry in statuses.values() if not job_status.is_terminal(entry)),
+        timed_out=timed_out,
+    )
+
+
+@router.post("/batches", response_model=JobBatchResponse)
+def create_job_batch(req: JobBatchRequest):
+    """
+    Registers jobs under a batch id to follow them with /jobs/batches/{batch_id}/events
+    (POST /ingest/ingest/enqueue/batch already returns one for its jobs).
+    """
+    _resolve_jobs(None, req.job_ids, req.actor_name, req.queue)
+    batch_id = job_status.save_batch(req.job_ids, req.actor_name, req.queue)
+    return JobBatchResponse(batch_id=batch_id, jobs=len(req.job_ids))
+
+
+@router.get("/batches/{batch_id}/events")
+async def job_batch_events(batch_id: str, follow: bool = False, include_results: bool = False):
+    """
+    Server-sent events of the state changes of the jobs of a batch.
+
+    Sends a `status` event per job when connecting, then one per state change
+    ({"job_id", "status", "state", ...} as in /jobs/status), and a `done` event
+    once every job is finished. The feed is closed with a `timeout` event after
+    JOB_EVENTS_MAX_SECONDS, the client reconnects to get the current states again.
+    """
+    refs = _resolve_jobs(batch_id, [], "", None)
+    fetch = partial(job_status.fetch_statuses, refs, include_results=include_results, follow=follow)
+
+    async def event_stream():
+        known: Dict[str, str] = {}
+        deadline = time.monotonic() + JOB_EVENTS_MAX_SECONDS
+        last_sent = time.monotonic()
+        try:
+            while True:
+                statuses = await run_in_threadpool(fetch)
+                for job_id in job_status.changed(statuses, known):
+                    known[job_id] = statuses[job_id]["state"]
+                    payload = json.dumps({"job_id": job_id, **statuses[job_id]}, ensure_ascii=False, default=str)
+                    yield f"event: status\ndata: {payload}\n\n"
+                    last_sent = time.monotonic()
+
+                pending = sum(1 for entry in statuses.values() if not job_status.is_terminal(entry))
+                if not pending:
+                    failed = sum(1 for entry in statuses.values() if job_status.FAILED in entry["state"])
+                    yield f"event: done\ndata: {json.dumps({'jobs': len(statuses), 'failed': failed})}\n\n"
+                    return
+                if time.monotonic() > deadline:
+                    yield f"event: timeout\ndata: {json.dumps({'pending': pending})}\n\n"
+                    return
+                if time.monotonic() - last_sent > KEEPALIVE_SECONDS:
+                    yield ": keep-alive\n\n"
+                    last_sent = time.monotonic()
+
+                await asyncio.sleep(JOB_STATUS_POLL_MS / 1000.0)
+        except Exception as e:
+            logger.error(f"Error streaming the status of batch {batch_id}: {str(e)}", exc_info=True)
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+
+    headers = {
+        "Cache-Control": "no-cache",
+        "Connection": "keep-alive",
+        "X-Accel-Buffering": "no",
+    }
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers=headers,
+    )
@@ -0,0 +1,89 @@
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
+
+
+class CreateCollectionRequest(BaseModel):
+    name: str
+    dim: int = 1024
+    index_type: Optional[str] = "hnsw"
+    hnsw_m: int = 32
+    hnsw_ef_construction: int = 400
+    ivf_lists: Optional[int] = Field(
+        None,
+        description="IVFFlat lists, picked from the row count when the index is trained if omitted."
+    )
+    recall_target: Optional[float] = Field(None, gt=0.0, le=1.0)
+    storage: str = "vector"
+    short_dim: Optional[int] = None
+    defer_index: bool = Field(
+        False,
+        description="Bulk-load mode: create the collection without its ANN index, build it after the ingestion."
+    )
+    partition_by: Optional[str] = Field(
+        None,
+        description="'source' or 'tenant' to partition the collection, each partition with its own ANN index."
+    )
+    hash_partitions: int = Field(
+        0,
+        ge=0,
+        description="Number of HASH partitions, 0 for one LIST partition per source / tenant."
+    )
+
+class CollectionInfo(BaseModel):
+    name: str
+    dim: int
+    storage: str
+    index_type: Optional[str] = None
+    index_params: Dict[str, Any] = {}
+    options: Dict[str, Any] = {}
+
+class BuildIndexRequest(BaseModel):
+    maintenance_work_mem: Optional[str] = Field(
+        None,
+        description="maintenance_work_mem for the build (e.g. '4GB'), defaults to INDEX_BUILD_MAINTENANCE_WORK_MEM."
+    )
+    parallel_workers: Optional[int] = Field(
+        None,
+        description="max_parallel_maintenance_workers for the build."
+    )
+
+class ReindexRequest(BaseModel):
+    index_type: Optional[str] = Field(
+        None,
+        description="'hnsw' or 'ivfflat', keeps the current index type if omitted."
+    )
+    index_params: Optional[Dict[str, Any]] = Field(
+        None,
+        description="New index parameters, e.g. {'m': 16, 'ef_construction': 200} or {'lists': 500}."
+    )
+    min_recall: float = Field(0.9, ge=0.0, le=1.0)
+    sample_size: int = Field(50, gt=0)
+    maintenance_work_mem: Optional[str] = None
+
+class TuneRequest(BaseModel):
+    ks: Optional[List[int]] = Field(
+        None,
+        description="Values of k to tune for, defaults to SEARCH_TUNING_KS."
+    )
+    recall_target: Optional[float] = Field(None, gt=0.0, le=1.0)
+    sample_size: int = Field(100, gt=0)
+
+class CollectionJobResponse(BaseModel):
+    job_id: str
+    queue: str
+    actor: str
+    collection: str
+
+class IndexProgressResponse(BaseModel):
+    collection: str
+    building: bool
+    index_deferred: bool = False
+    progress: Optional[Dict[str, Any]] = None
+
+class SourceIndexRequest(BaseModel):
+    sources: Optional[List[str]] = Field(
+        None,
+        description="Sources that get a partial ANN index, every source with at least min_rows rows if omitted."
+    )
+    min_rows: int = Field(50000, gt=0)
+    maintenance_work_mem: Optional[str] = None
@@ -6,14 +6,18 @@ class GenerateRequest(BaseModel):
     collection: str 
     k: int = 10
     sources: Optional[List[str]] = None
+    tenant: Optional[str] = None
     temperature: float = 0.5
+    rerank: Optional[bool] = None
 
 class GenerateStreamRequest(BaseModel):
     query: str
     collection: str
     k: int = 10
     sources: Optional[List[str]] = None
+    tenant: Optional[str] = None
     temperature: float = 0.5
+    rerank: Optional[bool] = None
 
 
 
@@ -24,6 +28,7 @@ class GenerateResponse(BaseModel):
     job_id: str
     status: str
     message: str
+    coalesced: bool = False
 
 class GenerationResult(BaseModel):
     """
@@ -34,4 +39,5 @@ class GenerationResult(BaseModel):
     sources: List[dict]
     retrieved_chunks: int
     generation_time_ms: float
-    retrieval_time_ms: float
\ No newline at end of file
+    retrieval_time_ms: float
+    rerank_time_ms: float = 0.0
\ No newline at end of file
@@ -0,0 +1,44 @@
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
+
+
+class BulkJobStatusRequest(BaseModel):
+    """
+    Status of many jobs of the same actor (job_ids), or of the jobs of a batch (batch_id).
+    """
+    job_ids: List[str] = []
+    batch_id: Optional[str] = None
+    actor_name: str = "validate_and_promote"
+    queue: Optional[str] = None # Queue of the actor by default
+    follow: bool = Field(
+        False,
+        description="Also report the job each finished job enqueued (validate_and_promote -> ingest_document)."
+    )
+    include_results: bool = True
+    wait_ms: int = Field(
+        0,
+        description="Long-polling: milliseconds to wait for a job to change state (capped by JOB_STATUS_MAX_WAIT_MS)."
+    )
+    known: Dict[str, str] = Field(
+        default_factory=dict,
+        description="job_id -> state already seen by the client, a job changes when its state differs. "
+                    "Empty: the states at the time of the request."
+    )
+
+
+class BulkJobStatusResponse(BaseModel):
+    jobs: Dict[str, Dict[str, Any]]
+    changed: List[str]
+    pending: int
+    timed_out: bool = False
+
+
+class JobBatchRequest(BaseModel):
+    job_ids: List[str]
+    actor_name: str = "validate_and_promote"
+    queue: Optional[str] = None
+
+
+class JobBatchResponse(BaseModel):
+    batch_id: str
+    jobs: int
@@ -26,23 +26,20 @@ class EnqueueReq(BaseModel):
     s3_key: str
     filename: str
     collection: str # TODO: To delete
-    checksum_sha256: str = Field(
+    checksum_sha256: Optional[str] = Field(
+        None,
         description="SHA-256 checksum of the file to be uploaded to verify integrity."
     )
+    tenant: Optional[str] = None # Required by collections partitioned by tenant
 
 class EnqueueBatchReq(BaseModel):
     collection: str
     items: List[EnqueueReq]
+    tenant: Optional[str] = None # Required by collections partitioned by tenant
     
 class EnqueueBatchResp(BaseModel):
     collection: str
     job_ids: List[str]
     file_refused: List[str]
     queue: Optional[str] = None
-
-class EnqueueReq(BaseModel):
-    doc_id: str
-    s3_key: str
-    filename: str
-    collection: str
-    checksum_sha256: Optional[str] = None 
\ No newline at end of file
+    batch_id: Optional[str] = None # Follow the jobs with /jobs/status or /jobs/batches/{batch_id}/events
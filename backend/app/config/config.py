@@ -9,4 +9,57 @@ POSTGRES_HOST = os.getenv("POSTGRES_HOST", "localhost")
 POSTGRES_PORT = os.getenv("POSTGRES_PORT", "5432")
 POSTGRES_DB = os.getenv("POSTGRES_DB", "ragdb")
 
-PGVECTOR_DSN = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
\ No newline at end of file
+PGVECTOR_DSN = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
+
+# Streaming replicas serving the retrieval reads (comma separated DSNs, empty to read from the primary)
+PGVECTOR_REPLICA_DSNS = [dsn.strip() for dsn in os.getenv("PGVECTOR_REPLICA_DSNS", "").split(",") if dsn.strip()]
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))  # Replicas lagging more are left out
+REPLICA_LSN_WAIT_MS = int(os.getenv("REPLICA_LSN_WAIT_MS", "500"))  # Wait for a replica to replay a recent ingest before reading the primary
+READ_YOUR_WRITES_SECONDS = int(os.getenv("READ_YOUR_WRITES_SECONDS", "60"))  # Reads of a collection see its last ingest for this long (0 to disable)
+
+# Postgres nodes the collections are sharded on by source (comma separated DSNs, empty for the single PGVECTOR_DSN).
+# The order matters and the list must not change once collections exist (a source always maps to the same node).
+PGVECTOR_SHARD_DSNS = [dsn.strip() for dsn in os.getenv("PGVECTOR_SHARD_DSNS", "").split(",") if dsn.strip()]
+SHARD_ALLOW_PARTIAL = os.getenv("SHARD_ALLOW_PARTIAL", "false").lower() == "true"  # Answer from the shards still up when one fails
+
+# Port of the Prometheus exporter of the Dramatiq workers (0 to disable), the API serves /metrics itself
+WORKER_METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", "9191"))
+
+# OpenTelemetry tracing (API, workers, embedding service): none | otlp | file
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "none").lower()
+TRACING_OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_TRACES_ENDPOINT", "http://jaeger:4318/v1/traces")
+TRACING_FILE = os.getenv("TRACING_FILE", "logs/traces.jsonl")  # One JSON span per line (TRACING_EXPORTER=file)
+TRACING_SAMPLE_RATIO = float(os.getenv("TRACING_SAMPLE_RATIO", "1.0"))  # Share of the traces started here that are kept
+
+# On-demand profiling: jobs sent with the profile option and requests with an X-Profile header
+# are profiled and the result stored in MinIO under profiles/<id>/ (ignored unless enabled)
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILER = os.getenv("PROFILER", "auto").lower()  # auto (pyinstrument if installed) | pyinstrument | cprofile
+PROFILE_TOP_FUNCTIONS = int(os.getenv("PROFILE_TOP_FUNCTIONS", "40"))  # Functions listed in the summary
+
+# Bulk job status (/jobs): Redis is polled every JOB_STATUS_POLL_MS while a long-poll or an event feed waits for changes
+JOB_STATUS_POLL_MS = int(os.getenv("JOB_STATUS_POLL_MS", "250"))
+JOB_STATUS_MAX_WAIT_MS = int(os.getenv("JOB_STATUS_MAX_WAIT_MS", "30000"))  # Longest long-poll, longer wait_ms are capped
+JOB_STATUS_MAX_JOBS = int(os.getenv("JOB_STATUS_MAX_JOBS", "1000"))  # Jobs per bulk status request / batch
+JOB_EVENTS_MAX_SECONDS = int(os.getenv("JOB_EVENTS_MAX_SECONDS", "3600"))  # An event feed is closed after this, the client reconnects
+
+# Loads the embedding model when the API starts instead of with the first /embed request
+PRELOAD_EMBEDDER = os.getenv("PRELOAD_EMBEDDER", "false").lower() == "true"
+
+# Storage mode of the collections created at ingestion time
+VECTOR_STORAGE = os.getenv("VECTOR_STORAGE", "vector")  # vector | halfvec | bit
+VECTOR_SHORT_DIM = int(os.getenv("VECTOR_SHORT_DIM", "0")) or None  # e.g. 256 to index a short prefix vector only
+VECTOR_PARTITION_BY = os.getenv("VECTOR_PARTITION_BY", "") or None  # source | tenant, empty for single-table collections
+VECTOR_HASH_PARTITIONS = int(os.getenv("VECTOR_HASH_PARTITIONS", "0"))  # 0: one LIST partition per source / tenant
+
+# ANN index builds (deferred bulk-load builds and reindexing)
+INDEX_BUILD_MAINTENANCE_WORK_MEM = os.getenv("INDEX_BUILD_MAINTENANCE_WORK_MEM", "2GB")
+INDEX_BUILD_PARALLEL_WORKERS = int(os.getenv("INDEX_BUILD_PARALLEL_WORKERS", "-1"))  # -1 keeps the server setting
+IVFFLAT_MIN_TRAIN_ROWS = int(os.getenv("IVFFLAT_MIN_TRAIN_ROWS", "10000"))  # IVFFlat indexes are trained once a collection has this many rows
+IVFFLAT_RETRAIN_GROWTH = float(os.getenv("IVFFLAT_RETRAIN_GROWTH", "4"))  # and retrained when it has grown by this factor (0 to disable)
+SEARCH_TUNING_KS = [int(k) for k in os.getenv("SEARCH_TUNING_KS", "10,40").split(",") if k.strip()]  # k values tuned after each index build
+
+# Generation sessions (audit / analytics)
+SESSION_SINK = os.getenv("SESSION_SINK", "jsonl")  # jsonl | postgres
+SESSION_FLUSH_INTERVAL_SECONDS = float(os.getenv("SESSION_FLUSH_INTERVAL_SECONDS", "2"))
+SESSION_ROTATE_MAX_BYTES = int(os.getenv("SESSION_ROTATE_MAX_BYTES", str(64 * 1024 * 1024)))
@@ -0,0 +1,28 @@
+from pydantic_settings import BaseSettings
+
+
+class EmbeddingSettings(BaseSettings):
+    """Embedding service configuration settings."""
+
+    # Where the API and the workers send their texts, empty to embed in the API process (/api/v1/ingest/embed).
+    EMBEDDING_SERVICE_URL: str = ""
+
+    # Standalone service (python -m app.embedding_service)
+    EMBED_MODEL: str = "Qwen/Qwen3-Embedding-0.6B"
+    EMBED_SERVICE_PORT: int = 8001
+    EMBED_WORKERS: int = 2  # Model-serving processes (1 per GPU, the model is loaded once per process).
+    EMBED_THREADS_PER_WORKER: int = 0  # torch threads of each process, 0 splits the CPUs between the processes.
+    EMBED_BATCH_SIZE: int = 8  # Texts per model call, a bulk request is queued as several batches.
+    EMBED_MAX_QUEUED_BATCHES: int = 2000  # Bulk requests are refused above this backlog (interactive ones never are).
+
+    # Clients (PgVectorUtils)
+    EMBED_CLIENT_MAX_RETRIES: int = 8  # Retries of a 429 / 503 answer (backlog full), waiting for its Retry-After.
+    EMBED_CLIENT_BATCH_SIZE: int = 256  # Texts per request when embedding a whole document.
+
+    class Config:
+        env_file = ".env"
+        case_sensitive = True
+        extra = "ignore"
+
+
+embedding_settings = EmbeddingSettings()
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic_settings import BaseSettings
 from app.core.generator.llmprovider import LLMProvider
 
@@ -14,6 +16,7 @@ class LLMSettings(BaseSettings):
     
     # OpenAI
     OPENAI_API_KEY: str = ""
+    OPENAI_BASE_URL: Optional[str] = None # OpenAI-compatible endpoint (e.g. the benchmarks mock server), None for api.openai.com
     
     # Anthropic
     ANTHROPIC_API_KEY: str = ""
@@ -0,0 +1,22 @@
+from pydantic_settings import BaseSettings
+
+
+class RetrievalSettings(BaseSettings):
+    """Retrieval configuration settings."""
+
+    # Cross-encoder reranking (CPU)
+    RERANK_ENABLED: bool = False
+    RERANK_MODEL: str = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"  # Small multilingual cross-encoder (EN/FR).
+    RERANK_CANDIDATES: int = 40  # Number of chunks retrieved before reranking.
+    RERANK_BATCH_SIZE: int = 16
+    RERANK_MAX_LENGTH: int = 512
+    RERANK_NUM_THREADS: int = 0  # 0 keeps the torch default.
+    RERANK_BACKEND: str = "auto"  # auto | onnx | int8 | fp32
+
+    class Config:
+        env_file = ".env"
+        case_sensitive = True
+        extra = "ignore"
+
+
+retrieval_settings = RetrievalSettings()
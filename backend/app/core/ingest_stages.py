@@ -0,0 +1,141 @@
+import json
+import logging
+import time
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.core.metrics import INGEST_STAGE_SECONDS
+
+try:
+    import resource
+except ImportError:  # Not available on Windows, peak RSS is then left out.
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_PREFIX = "knowhub:ingest"
+PROGRESS_TTL_SECONDS = 24 * 3600
+PROGRESS_MAXLEN = 1000  # Events kept per document
+
+_recorder: ContextVar[Optional["StageRecorder"]] = ContextVar("ingest_stage_recorder", default=None)
+
+
+def progress_key(doc_id: str) -> str:
+    return f"{PROGRESS_PREFIX}:{doc_id}"
+
+
+def _peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    # ru_maxrss is in KiB on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+class StageRecorder:
+    """
+    Timings of the ingestion stages of one job, published live to the Redis stream of the document.
+
+    Entered around an actor body (`with StageRecorder(doc_id, "ingest") as recorder:`),
+    it becomes the current recorder and every `stage()` block run by the job (in any
+    module) adds an entry to recorder.stages and a "stage" event to the stream
+    knowhub:ingest:<doc_id>.
+
+    Each entry holds the wall time, the CPU time of the worker process, its peak RSS
+    at the end of the stage (high-water mark since the process started, rss_growth_mb
+    is how much the stage raised it) and the item counts the stage reported.
+    """
+
+    def __init__(self, doc_id: str, job: str, publish: bool = True):
+        self.doc_id = doc_id
+        self.job = job
+        self.publish_events = publish
+        self.stages: List[Dict[str, Any]] = []
+        self._token = None
+
+    def __enter__(self) -> "StageRecorder":
+        self._token = _recorder.set(self)
+        self.publish("started", {"job": self.job})
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _recorder.reset(self._token)
+        if exc is not None:
+            self.publish("failed", {"job": self.job, "error": str(exc), "stages": self.stages})
+        else:
+            self.publish("finished", {"job": self.job, "stages": self.stages})
+        return False
+
+    def publish(self, event_type: str, data: Any):
+        """
+        Appends an event to the progress stream, a Redis failure never fails the ingestion.
+        """
+        if not self.publish_events:
+            return
+        from app.core.redis_config import redis_client
+
+        key = progress_key(self.doc_id)
+        try:
+            pipe = redis_client.pipeline()
+            pipe.xadd(key, {"type": event_type, "data": json.dumps(data, ensure_ascii=False)}, maxlen=PROGRESS_MAXLEN, approximate=True)
+            pipe.expire(key, PROGRESS_TTL_SECONDS)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Error publishing ingest progress of {self.doc_id}: {str(e)}")
+
+    def add(self, entry: Dict[str, Any]):
+        self.stages.append(entry)
+        self.publish("stage", entry)
+
+
+@contextmanager
+def stage(name: str, **counts: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Times an ingestion stage: `with stage("split") as st: ...; st["chunks"] = len(chunks)`.
+
+    The duration always goes to the Prometheus histogram, the full entry (with the
+    counts set on the yielded dict) to the current StageRecorder if there is one.
+    """
+    recorder = _recorder.get()
+    info: Dict[str, Any] = dict(counts)
+    rss_before = _peak_rss_mb() if recorder is not None else None
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    status = "ok"
+    try:
+        yield info
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        wall = time.perf_counter() - wall_start
+        INGEST_STAGE_SECONDS.labels(stage=name).observe(wall)
+
+        if recorder is not None:
+            peak_rss = _peak_rss_mb()
+            recorder.add({
+                "stage": name,
+                "status": status,
+                "wall_ms": round(wall * 1000, 2),
+                "cpu_ms": round((time.process_time() - cpu_start) * 1000, 2),
+                "peak_rss_mb": round(peak_rss, 1) if peak_rss is not None else None,
+                "rss_growth_mb": round(peak_rss - rss_before, 1) if peak_rss is not None else None,
+                **info,
+            })
+
+
+def read_progress(doc_id: str, last_id: str = "0-0", count: int = 100) -> List[Dict[str, Any]]:
+    """
+    Progress events of a document after last_id (oldest first).
+    """
+    from app.core.redis_config import redis_client
+
+    events = []
+    for entry_id, fields in redis_client.xrange(progress_key(doc_id), min=f"({last_id}" if last_id != "0-0" else "-", count=count):
+        try:
+            data = json.loads(fields.get("data", "null"))
+        except json.JSONDecodeError:
+            data = fields.get("data")
+        events.append({"id": entry_id, "type": fields.get("type"), "data": data})
+    return events
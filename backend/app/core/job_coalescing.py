@@ -0,0 +1,104 @@
+import hashlib
+import json
+import logging
+import re
+import unicodedata
+
+from typing import Any, List, Optional, Tuple
+
+from app.core.redis_config import redis_client
+
+logger = logging.getLogger(__name__)
+
+INFLIGHT_PREFIX = "knowhub:inflight"
+INFLIGHT_TTL_SECONDS = 600  # Safety net if a worker dies before releasing the key.
+
+_WS = re.compile(r"\s+")
+
+# Only delete the key if it still points to our job (a newer leader may own it after a TTL expiry).
+_RELEASE_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalizes a query so that trivially different spellings share the same key.
+    """
+    s = unicodedata.normalize("NFC", query or "")
+    s = _WS.sub(" ", s)
+    return s.strip().casefold()
+
+
+def build_coalesce_key(
+    kind: str,
+    collection: str,
+    query: str,
+    k: int,
+    sources: Optional[List[str]],
+    temperature: float,
+    **extra: Any,
+) -> str:
+    """
+    Builds the single-flight key of a generation job.
+
+    Args:
+        kind: Job flavour ("result" or "stream"), they don't produce the same output
+        collection: Collection to search
+        query: User query (normalized before hashing)
+        k: Number of chunks to retrieve
+        sources: Optional source filter (order doesn't matter)
+        temperature: Generation temperature
+        **extra: Any other parameter that changes the answer
+
+    Returns:
+        The Redis key identifying identical in-flight jobs
+    """
+    payload = {
+        "collection": collection.lower(),
+        "query": normalize_query(query),
+        "k": int(k),
+        "sources": sorted(sources) if sources else None,
+        "temperature": round(float(temperature), 3),
+        **extra,
+    }
+    digest = hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+    return f"{INFLIGHT_PREFIX}:{kind}:{digest}"
+
+
+def acquire_or_join(coalesce_key: str, job_id: str, ttl_seconds: int = INFLIGHT_TTL_SECONDS) -> Tuple[str, bool]:
+    """
+    Registers job_id as the leader for the key, or returns the job already running.
+
+    Args:
+        coalesce_key: Key built with build_coalesce_key
+        job_id: Id of the job we are about to enqueue
+        ttl_seconds: Expiry of the key
+
+    Returns:
+        (job_id to follow, True if the caller is the leader and must enqueue its job)
+    """
+    # Two attempts: the leader can release the key between our SET and our GET.
+    for _ in range(2):
+        if redis_client.set(coalesce_key, job_id, nx=True, ex=ttl_seconds):
+            return job_id, True
+
+        leader_id = redis_client.get(coalesce_key)
+        if leader_id:
+            logger.info(f"Coalescing request into in-flight job {leader_id}")
+            return leader_id, False
+
+    return job_id, True
+
+
+def release(coalesce_key: str, job_id: str) -> None:
+    """
+    Releases the key once the leader job is finished.
+    """
+    try:
+        redis_client.eval(_RELEASE_SCRIPT, 1, coalesce_key, job_id)
+    except Exception as e:
+        logger.error(f"Error releasing in-flight key {coalesce_key}: {str(e)}")
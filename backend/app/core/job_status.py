@@ -0,0 +1,149 @@
+import json
+import logging
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+from uuid import uuid4
+
+import dramatiq
+
+from dramatiq.errors import ActorNotFound
+from dramatiq.results.errors import ResultFailure
+
+from app.core.job_utils import build_message_for
+from app.core.redis_config import redis_client
+from app.tasks import results_backend
+
+logger = logging.getLogger(__name__)
+
+BATCH_PREFIX = "knowhub:jobs:batch"
+BATCH_TTL_SECONDS = 24 * 3600  # A batch is followed while its files are being ingested, not longer.
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+TERMINAL_STATUSES = {DONE, FAILED}
+
+
+@dataclass(frozen=True)
+class JobRef:
+    """
+    What the result of a job is stored under (the message key of the results backend).
+    """
+    job_id: str
+    actor_name: str
+    queue: str
+
+
+def job_refs(job_ids: List[str], actor_name: str, queue: Optional[str] = None) -> List[JobRef]:
+    """
+    References of jobs of the same actor, the queue defaults to the one the actor is declared on.
+    """
+    if queue is None:
+        try:
+            queue = dramatiq.get_broker().get_actor(actor_name).queue_name
+        except ActorNotFound:
+            raise ValueError(f"Unknown actor '{actor_name}'")
+    return [JobRef(job_id, actor_name, queue) for job_id in job_ids]
+
+
+def _decode(data: Optional[bytes], include_result: bool) -> Dict[str, Any]:
+    if data is None:
+        return {"status": PENDING}
+    try:
+        result = results_backend.unwrap_result(results_backend.encoder.decode(data))
+    except ResultFailure as e:
+        return {"status": FAILED, "error": str(e)}
+    entry: Dict[str, Any] = {"status": DONE}
+    if include_result:
+        entry["result"] = result
+    if isinstance(result, dict) and result.get("next_job_id") and result.get("actor"):
+        # Chained jobs (validate_and_promote -> ingest_document) tell which job comes next.
+        entry["next_job_id"] = result["next_job_id"]
+        entry["next_actor"] = result["actor"]
+    return entry
+
+
+def _fetch(refs: List[JobRef], include_results: bool) -> List[Dict[str, Any]]:
+    # LINDEX key 0 is what RedisBackend.get_result(block=False) reads, here for all the jobs in one round trip.
+    with results_backend.client.pipeline(transaction=False) as pipe:
+        for ref in refs:
+            pipe.lindex(results_backend.build_message_key(build_message_for(ref.job_id, ref.queue, ref.actor_name)), 0)
+        raw = pipe.execute()
+    return [_decode(data, include_results) for data in raw]
+
+
+def fetch_statuses(refs: List[JobRef],
+                   include_results: bool = True,
+                   follow: bool = False, # Also resolve the job each finished job enqueued (one more round trip)
+                   ) -> Dict[str, Dict[str, Any]]:
+    """
+    Status of many jobs with one pipelined Redis round trip (two with follow).
+
+    Returns:
+        {job_id: {"status": "pending" | "done" | "failed", "state", "result" | "error", "next"}}
+        where state changes whenever the job (or, with follow, the job it enqueued) changes
+        status, it is what changed() compares.
+    """
+    entries = _fetch(refs, include_results) if refs else []
+    statuses = dict(zip((ref.job_id for ref in refs), entries))
+
+    if follow:
+        parents, next_refs = [], []
+        for job_id, entry in statuses.items():
+            if not entry.get("next_job_id"):
+                continue
+            try:
+                next_refs.extend(job_refs([entry["next_job_id"]], entry["next_actor"]))
+            except ValueError as e:
+                logger.warning(f"Not following job {job_id}: {str(e)}")
+                continue
+            parents.append(job_id)
+        if next_refs:
+            for job_id, next_ref, next_entry in zip(parents, next_refs, _fetch(next_refs, include_results)):
+                next_entry["job_id"] = next_ref.job_id
+                statuses[job_id]["next"] = next_entry
+
+    for entry in statuses.values():
+        entry["state"] = entry["status"] if "next" not in entry else f"{entry['status']}:{entry['next']['status']}"
+    return statuses
+
+
+def is_terminal(entry: Dict[str, Any]) -> bool:
+    """
+    Whether a job (and, if it was followed, the job it enqueued) won't change anymore.
+    """
+    if entry["status"] == DONE and "next" in entry:
+        return entry["next"]["status"] in TERMINAL_STATUSES
+    return entry["status"] in TERMINAL_STATUSES
+
+
+def changed(statuses: Dict[str, Dict[str, Any]], known: Dict[str, str]) -> List[str]:
+    """
+    Jobs whose state differs from the known one (jobs not in known count as changed).
+    """
+    return [job_id for job_id, entry in statuses.items() if known.get(job_id) != entry["state"]]
+
+
+def save_batch(job_ids: List[str], actor_name: str, queue: Optional[str] = None) -> str:
+    """
+    Registers jobs of the same actor under a batch id, for the status event feed.
+    """
+    batch_id = uuid4().hex
+    redis_client.set(
+        f"{BATCH_PREFIX}:{batch_id}",
+        json.dumps({"job_ids": job_ids, "actor_name": actor_name, "queue": queue}),
+        ex=BATCH_TTL_SECONDS,
+    )
+    return batch_id
+
+
+def load_batch(batch_id: str) -> Optional[List[JobRef]]:
+    """
+    References of the jobs of a batch, None if the batch doesn't exist (or expired).
+    """
+    stored = redis_client.get(f"{BATCH_PREFIX}:{batch_id}")
+    if stored is None:
+        return None
+    batch = json.loads(stored)
+    return job_refs(batch["job_ids"], batch["actor_name"], batch.get("queue"))
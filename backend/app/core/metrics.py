@@ -0,0 +1,166 @@
+import logging
+import os
+import time
+
+from contextlib import contextmanager
+from typing import Any, Dict, Optional, Tuple
+
+import dramatiq
+
+logger = logging.getLogger(__name__)
+
+try:
+    import prometheus_client
+    from prometheus_client import Gauge, Histogram
+except ImportError:  # Optional: without it every metric is a no-op and /metrics answers 404.
+    prometheus_client = None
+
+# Latency buckets (seconds) shared by the query and stage histograms.
+FAST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+SLOW_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+
+class _NoopMetric:
+    def labels(self, *args: Any, **kwargs: Any) -> "_NoopMetric":
+        return self
+
+    def observe(self, *args: Any, **kwargs: Any):
+        pass
+
+    def inc(self, *args: Any, **kwargs: Any):
+        pass
+
+    def dec(self, *args: Any, **kwargs: Any):
+        pass
+
+    def set(self, *args: Any, **kwargs: Any):
+        pass
+
+
+def _histogram(name: str, doc: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = FAST_BUCKETS):
+    if prometheus_client is None:
+        return _NoopMetric()
+    return Histogram(name, doc, labels, buckets=buckets)
+
+
+def _gauge(name: str, doc: str, labels: Tuple[str, ...] = ()):
+    if prometheus_client is None:
+        return _NoopMetric()
+    # livesum: the SSE clients of every API process add up in multiprocess mode.
+    return Gauge(name, doc, labels, multiprocess_mode="livesum")
+
+
+# Embedding ("api": in-process embedder, "service": embedding service pool)
+EMBED_BATCH_SECONDS = _histogram("knowhub_embed_batch_seconds", "Latency of one embedding model call", ("where",), SLOW_BUCKETS)
+EMBED_BATCH_SIZE = _histogram("knowhub_embed_batch_size", "Texts per embedding model call", ("where",), BATCH_SIZE_BUCKETS)
+
+# Vector store
+VECTOR_QUERY_SECONDS = _histogram("knowhub_vector_query_seconds", "Latency of the retrieval queries", ("collection", "kind"))
+POOL_WAIT_SECONDS = _histogram("knowhub_pg_pool_wait_seconds", "Time spent waiting for a pooled Postgres connection", ("pool",))
+
+# Dramatiq
+QUEUE_LATENCY_SECONDS = _histogram("knowhub_queue_latency_seconds", "Time between enqueue and start of a job", ("actor",), SLOW_BUCKETS)
+ACTOR_SECONDS = _histogram("knowhub_actor_seconds", "Processing time of a job", ("actor", "outcome"), SLOW_BUCKETS)
+
+# Ingestion: download, hash, camelot, pdfplumber, split, embed, insert (timed by app.core.ingest_stages.stage)
+INGEST_STAGE_SECONDS = _histogram("knowhub_ingest_stage_seconds", "Duration of the ingestion stages", ("stage",), SLOW_BUCKETS)
+
+# Generation
+LLM_TTFT_SECONDS = _histogram("knowhub_llm_ttft_seconds", "LLM time to first token", ("model",), SLOW_BUCKETS)
+LLM_TOKENS_PER_SECOND = _histogram(
+    "knowhub_llm_tokens_per_second",
+    "LLM streaming throughput",
+    ("model",),
+    (1, 5, 10, 20, 30, 50, 75, 100, 150, 200, 400),
+)
+LLM_GENERATION_SECONDS = _histogram("knowhub_llm_generation_seconds", "Duration of an LLM completion", ("model", "mode"), SLOW_BUCKETS)
+SSE_CLIENTS = _gauge("knowhub_sse_clients", "Clients connected to a generation stream")
+
+
+@contextmanager
+def timed(histogram, **labels: str):
+    """
+    Observes the duration of the block (seconds) in histogram, also when it raises.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metric = histogram.labels(**labels) if labels else histogram
+        metric.observe(time.perf_counter() - start)
+
+
+def _registry():
+    # Multiprocess mode (PROMETHEUS_MULTIPROC_DIR): the values of every process are read from their files.
+    if not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        return prometheus_client.REGISTRY
+    from prometheus_client import multiprocess
+    registry = prometheus_client.CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def render_latest() -> Optional[Tuple[bytes, str]]:
+    """
+    Current metrics in the Prometheus text format (all the processes in multiprocess mode).
+
+    Returns:
+        (payload, content type), None if prometheus_client is not installed
+    """
+    if prometheus_client is None:
+        return None
+    return prometheus_client.generate_latest(_registry()), prometheus_client.CONTENT_TYPE_LATEST
+
+
+def metrics_response():
+    """
+    /metrics handler of the FastAPI apps.
+    """
+    from fastapi import Response
+
+    rendered = render_latest()
+    if rendered is None:
+        return Response("prometheus_client is not installed\n", status_code=404, media_type="text/plain")
+    payload, content_type = rendered
+    return Response(payload, media_type=content_type)
+
+
+class MetricsMiddleware(dramatiq.Middleware):
+    """
+    Queue latency and processing time of the Dramatiq jobs, and the worker-side exporter.
+
+    The exporter listens on port (WORKER_METRICS_PORT), started once per worker
+    process. With several worker processes, set PROMETHEUS_MULTIPROC_DIR so that
+    the first one to bind the port serves the metrics of all of them.
+    """
+
+    def __init__(self, port: int = 0):
+        self.port = port
+        self._started: Dict[str, float] = {}
+
+    def after_worker_boot(self, broker, worker):
+        if not self.port or prometheus_client is None:
+            return
+        try:
+            prometheus_client.start_http_server(self.port, registry=_registry())
+            logger.info(f"Worker metrics exported on :{self.port}/metrics")
+        except OSError:
+            # Another worker process of this host already serves them.
+            pass
+
+    def before_process_message(self, broker, message):
+        now = time.time()
+        QUEUE_LATENCY_SECONDS.labels(actor=message.actor_name).observe(max(0.0, now - message.message_timestamp / 1000.0))
+        self._started[message.message_id] = time.perf_counter()
+
+    def after_process_message(self, broker, message, *, result=None, exception=None):
+        start = self._started.pop(message.message_id, None)
+        if start is not None:
+            ACTOR_SECONDS.labels(
+                actor=message.actor_name,
+                outcome="error" if exception is not None else "ok",
+            ).observe(time.perf_counter() - start)
+
+    def after_skip_message(self, broker, message):
+        self._started.pop(message.message_id, None)
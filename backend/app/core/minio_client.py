@@ -2,9 +2,6 @@ import io, os
 
 from pathlib import Path
 
-from minio import Minio
-from minio.error import S3Error
-
 from typing import Optional, Tuple
 from datetime import timedelta
 
@@ -29,6 +26,9 @@ class MinioClient:
         self.bucket = os.getenv("MINIO_BUCKET", "knowhub")
         self.secure = os.getenv("MINIO_SECURE", "false").lower() == "true"
 
+        # The minio package is slow to import (~0.25s), it is only loaded with the first client.
+        from minio import Minio
+
         self.client = Minio(
             self.internal_endpoint,
             access_key=self.access_key,
@@ -87,6 +87,7 @@ class MinioClient:
         Returns:
             bool: True if the object exists, False otherwise.
         """
+        from minio.error import S3Error
         try:
             self.client.stat_object(self.bucket, key)
             return True
@@ -122,6 +123,7 @@ class MinioClient:
         if dest.exists() and not overwrite:
             raise FileExistsError(f"Destination exists: {dest}")
 
+        from minio.error import S3Error
         try:
             stat = self.client.stat_object(self.bucket, key)
             meta = {
@@ -149,6 +151,7 @@ class MinioClient:
         
         if not isinstance(data, (bytes, bytearray)):
             raise TypeError("put_bytes expects 'bytes' or 'bytearray'.")
+        from minio.error import S3Error
         try:
             self.client.put_object(
                 bucket_name=self.bucket,
@@ -159,4 +162,16 @@ class MinioClient:
             )
             return f"s3://{self.bucket}/{key}"
         except S3Error as e:
-            raise RuntimeError(f"MinIO upload failed for key '{key}': {e}") from e
\ No newline at end of file
+            raise RuntimeError(f"MinIO upload failed for key '{key}': {e}") from e
+
+_minio_client: Optional[MinioClient] = None
+
+def get_minio_client() -> MinioClient:
+    """
+    Shared MinioClient of the process, created on first use (its bucket check is a network call,
+    it must not run when a module is imported).
+    """
+    global _minio_client
+    if _minio_client is None:
+        _minio_client = MinioClient()
+    return _minio_client
@@ -0,0 +1,190 @@
+import math
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+from psycopg import sql
+
+META_TABLE = "knowhub_collections"
+TUNING_TABLE = "knowhub_search_tuning"
+
+# vector:  full precision (fp32) vectors, indexed as is.
+# halfvec: fp16 vectors, half the memory for the table and the index.
+# bit:     full vectors kept in the table, the index is built on their binary
+#          quantization and the best candidates are rescored with the full vectors.
+STORAGE_MODES = ("vector", "halfvec", "bit")
+# Any mode but bit can also keep a short prefix of the vector (options["short_dim"],
+# e.g. 256 of 1024 dims, re-normalized) in an "embedding_short" column: the ANN index
+# is built on it alone and the candidates are rescored with the full vector.
+INDEX_TYPES = ("hnsw", "ivfflat")
+# Partitioned layout (options["partition_by"]): one partition per source (or tenant),
+# LIST partitions created with their first rows, or options["hash_partitions"] HASH
+# partitions created with the table. Each partition gets its own ANN index.
+PARTITION_KEYS = ("source", "tenant")
+
+DEFAULT_RECALL_TARGET = 0.95
+
+
+def ivfflat_lists(rows: int) -> int:
+    """
+    Number of IVFFlat lists for a table size: rows / 1000 up to 1M rows, sqrt(rows) above.
+    """
+    if rows <= 1_000_000:
+        return max(1, rows // 1000)
+    return int(math.sqrt(rows))
+
+
+def ivfflat_probes(lists: int, recall_target: float = DEFAULT_RECALL_TARGET) -> int:
+    """
+    Number of lists probed per query for a recall target.
+
+    sqrt(lists) is the usual starting point (around 0.9 recall), higher targets
+    probe a multiple of it. The tuner can override it per collection.
+    """
+    if recall_target <= 0.9:
+        factor = 1
+    elif recall_target <= 0.95:
+        factor = 2
+    elif recall_target <= 0.98:
+        factor = 4
+    else:
+        factor = 8
+    return max(1, min(int(lists), math.ceil(math.sqrt(lists) * factor)))
+
+
+@dataclass
+class CollectionMeta:
+    """
+    Storage and index layout of a vector collection.
+    """
+    name: str
+    dim: int = 1024
+    storage: str = "vector"
+    index_type: Optional[str] = "hnsw"
+    index_params: Dict[str, Any] = field(default_factory=dict)
+    options: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def short_dim(self) -> Optional[int]:
+        """
+        Dimension of the re-normalized prefix vector indexed instead of the full one, if any.
+        """
+        value = self.options.get("short_dim")
+        return int(value) if value else None
+
+    @property
+    def partition_by(self) -> Optional[str]:
+        """
+        Column the collection is partitioned on ("source" or "tenant"), None for a single table.
+        """
+        return self.options.get("partition_by") or None
+
+    @property
+    def hash_partitions(self) -> int:
+        """
+        Number of HASH partitions, 0 for LIST partitions (one per value of partition_by).
+        """
+        return int(self.options.get("hash_partitions") or 0)
+
+    @property
+    def list_partitioned(self) -> bool:
+        return self.partition_by is not None and self.hash_partitions == 0
+
+    @property
+    def recall_target(self) -> float:
+        return float(self.options.get("recall_target") or DEFAULT_RECALL_TARGET)
+
+    @property
+    def index_ready(self) -> bool:
+        """
+        True if the ANN index exists (not deferred until a bulk load ends or enough rows to train IVFFlat).
+        """
+        return self.index_type is not None and not self.options.get("index_deferred")
+
+    def probes(self) -> Optional[int]:
+        """
+        ivfflat.probes for the searches of this collection, None if it is not an IVFFlat collection.
+        """
+        if self.index_type != "ivfflat" or not self.index_params.get("lists"):
+            return None
+        if self.options.get("probes"):
+            return int(self.options["probes"])
+        return ivfflat_probes(int(self.index_params["lists"]), self.recall_target)
+
+    @property
+    def two_stage(self) -> bool:
+        """
+        True if the ANN search only returns candidates that must be rescored with the full vector.
+        """
+        return self.storage == "bit" or self.short_dim is not None
+
+    def column_type(self, dim: Optional[int] = None) -> sql.Composable:
+        dim = int(dim or self.dim)
+        if self.storage == "halfvec":
+            return sql.SQL("HALFVEC({})").format(sql.Literal(dim))
+        return sql.SQL("VECTOR({})").format(sql.Literal(dim))
+
+    def insert_placeholder(self) -> sql.Composable:
+        if self.storage == "halfvec":
+            return sql.SQL("%s::halfvec")
+        return sql.SQL("%s")
+
+    def ann_expression(self) -> sql.Composable:
+        """
+        Indexed expression used to order the ANN search.
+        """
+        if self.short_dim is not None:
+            return sql.SQL("embedding_short")
+        if self.storage == "bit":
+            return sql.SQL("(binary_quantize(embedding)::bit({}))").format(sql.Literal(int(self.dim)))
+        return sql.SQL("embedding")
+
+    def ann_query(self, qvec: sql.Composable, qvec_short: Optional[sql.Composable] = None) -> sql.Composable:
+        """
+        Converts the query vector expression to the type of ann_expression.
+
+        Collections with a short_dim search with qvec_short, the truncated and
+        re-normalized query vector.
+        """
+        if self.short_dim is not None:
+            if qvec_short is None:
+                raise ValueError(f"Collection '{self.name}' needs the short query vector")
+            if self.storage == "halfvec":
+                return sql.SQL("({})::halfvec({})").format(qvec_short, sql.Literal(self.short_dim))
+            return sql.SQL("({})::vector({})").format(qvec_short, sql.Literal(self.short_dim))
+        if self.storage == "bit":
+            return sql.SQL("binary_quantize({})::bit({})").format(qvec, sql.Literal(int(self.dim)))
+        if self.storage == "halfvec":
+            return sql.SQL("({})::halfvec({})").format(qvec, sql.Literal(int(self.dim)))
+        return qvec
+
+    def ann_operator(self) -> sql.SQL:
+        if self.storage == "bit" and self.short_dim is None:
+            return sql.SQL("<~>")
+        return sql.SQL("<=>")
+
+    def ann_order(self, qvec: sql.Composable, qvec_short: Optional[sql.Composable] = None) -> sql.Composable:
+        return sql.SQL("{} {} {}").format(
+            self.ann_expression(),
+            self.ann_operator(),
+            self.ann_query(qvec, qvec_short),
+        )
+
+    def exact_distance(self, qvec: sql.Composable) -> sql.Composable:
+        """
+        Cosine distance between the stored vector and the query.
+        """
+        if self.storage == "halfvec":
+            return sql.SQL("embedding <=> ({})::halfvec({})").format(qvec, sql.Literal(int(self.dim)))
+        return sql.SQL("embedding <=> {}").format(qvec)
+
+    def opclass(self) -> sql.SQL:
+        if self.short_dim is not None and self.storage == "halfvec":
+            return sql.SQL("halfvec_cosine_ops")
+        if self.short_dim is not None:
+            return sql.SQL("vector_cosine_ops")
+        return {
+            "vector": sql.SQL("vector_cosine_ops"),
+            "halfvec": sql.SQL("halfvec_cosine_ops"),
+            "bit": sql.SQL("bit_hamming_ops"),
+        }[self.storage]
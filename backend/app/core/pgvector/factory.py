@@ -0,0 +1,38 @@
+import logging
+
+from typing import Union
+
+from app.core.pgvector.pgvector import PgVectorStore
+from app.core.pgvector.sharded_store import ShardedPgVectorStore
+from app.config.config import (
+    PGVECTOR_DSN,
+    PGVECTOR_SHARD_DSNS,
+    SHARD_ALLOW_PARTIAL,
+    PGVECTOR_REPLICA_DSNS,
+    REPLICA_MAX_LAG_SECONDS,
+    REPLICA_LSN_WAIT_MS,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def get_vector_store(read_replicas: bool = False) -> Union[PgVectorStore, ShardedPgVectorStore]:
+    """
+    Vector store of the deployment: sharded when PGVECTOR_SHARD_DSNS is set, the single primary otherwise.
+
+    Args:
+        read_replicas: Sends the reads of a single primary to its replicas (ignored when sharded)
+
+    The caller closes it with store.close().
+    """
+    if PGVECTOR_SHARD_DSNS:
+        return ShardedPgVectorStore(PGVECTOR_SHARD_DSNS, allow_partial=SHARD_ALLOW_PARTIAL)
+
+    if read_replicas:
+        return PgVectorStore(
+            dsn=PGVECTOR_DSN,
+            replica_dsns=PGVECTOR_REPLICA_DSNS,
+            replica_max_lag_seconds=REPLICA_MAX_LAG_SECONDS,
+            replica_lsn_wait_ms=REPLICA_LSN_WAIT_MS,
+        )
+    return PgVectorStore(dsn=PGVECTOR_DSN)
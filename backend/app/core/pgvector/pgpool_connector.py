@@ -1,9 +1,13 @@
+import time
+
 import psycopg_pool
 from psycopg import sql
 from typing import Optional
 from contextlib import contextmanager
 from pgvector.psycopg import register_vector
 
+from app.core.metrics import POOL_WAIT_SECONDS
+
 class PgPoolConnector:
     """
     PostgreSQL connector with connection pooling using psycopg3.
@@ -31,6 +35,8 @@ class PgPoolConnector:
         self._pool: Optional[psycopg_pool.ConnectionPool] = None
         self.min_size = min_size
         self.max_size = max_size
+        # Metrics label: host/db part of the dsn, never the credentials.
+        self.label = dsn.rsplit("@", 1)[-1]
 
     def connect(self):
         """
@@ -70,11 +76,34 @@ class PgPoolConnector:
         if self._pool is None:
             self.connect()
             
+        wait_start = time.perf_counter()
         with self._pool.connection() as conn: # Already have a connection when initialize the class with connect method.
+            POOL_WAIT_SECONDS.labels(pool=self.label).observe(time.perf_counter() - wait_start)
             with conn.cursor() as cur: # At the end of the with, both cursor and connection are returned to the pool because thanks to the context managers.
                 # No need to close manually with a finally (the context manager does it).
                 # __enter__ and __exit__ methods of the connection and cursor handle that.
                 yield cur
 
+    @contextmanager
+    def transaction(self):
+        """
+        Context manager for getting a cursor inside a transaction.
+
+        SET LOCAL parameters (hnsw.ef_search, ...) only live until the end of the
+        block, so they never leak to the next user of the pooled connection.
+
+        Yields:
+            psycopg.Cursor: Database cursor
+        """
+        if self._pool is None:
+            self.connect()
+
+        wait_start = time.perf_counter()
+        with self._pool.connection() as conn:
+            POOL_WAIT_SECONDS.labels(pool=self.label).observe(time.perf_counter() - wait_start)
+            with conn.transaction():
+                with conn.cursor() as cur:
+                    yield cur
+
     def is_connected(self) -> bool:
         return self._pool is not None
\ No newline at end of file
@@ -1,41 +1,138 @@
+import hashlib
+import json
 import logging
 import os
+import time
+
+import psycopg
 
 from psycopg import sql
+from psycopg.types.json import Jsonb
 from dotenv import load_dotenv
 from pgvector.psycopg import Vector
-from typing import Any, Dict, List, Optional
-from langchain_core.documents import Document
+from dataclasses import replace
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
-from app.core.pgvector.pgvector_utils import PgVectorUtils
+from app.core.pgvector.pgvector_utils import PgVectorUtils, truncate_embedding
 from app.core.pgvector.pgpool_connector import PgPoolConnector
+from app.core.pgvector.replica_router import ReplicaRouter
+from app.core.metrics import VECTOR_QUERY_SECONDS, timed
+from app.core.ingest_stages import stage
+from app.core.tracing import span
+from app.core.pgvector.collection_meta import (
+    CollectionMeta,
+    META_TABLE,
+    TUNING_TABLE,
+    STORAGE_MODES,
+    PARTITION_KEYS,
+    ivfflat_lists,
+)
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
 
 logger = logging.getLogger(__name__)
 
+META_CACHE_TTL_SECONDS = 30
+_META_CACHE: Dict[Tuple[str, str, str], Tuple[float, CollectionMeta]] = {}
+_TUNING_CACHE: Dict[Tuple[str, str, str], Tuple[float, Dict[str, Dict[int, int]]]] = {}
+
+DEFAULT_EF_SEARCH = 150 # Used when the collection has not been tuned
+EXACT_SCAN_MAX_ROWS = 20000 # Source filters matching fewer rows are searched exactly (per collection: options["exact_scan_max_rows"])
+MAX_PARTIAL_UNION = 4 # Maximum number of per-source partial indexes searched by one query
+
 class PgVectorStore:
     """
     
     """
 
-    def __init__(self, dsn: str, schema: str = "public"):
+    def __init__(self,
+                 dsn: str, # Primary, all the writes and DDL go to it
+                 schema: str = "public",
+                 replica_dsns: Optional[List[str]] = None, # Streaming replicas serving the read paths
+                 replica_max_lag_seconds: float = 5.0,
+                 replica_lsn_wait_ms: int = 500,
+                 pg_utils: Optional[PgVectorUtils] = None, # Embedding client, e.g. a deterministic fake for benchmarks
+                 ):
         self.dsn = dsn
         self.schema = schema
 
         self.pg_pool = PgPoolConnector(dsn)
         self.pg_pool.connect()
 
-        self.pg_utils = PgVectorUtils()
+        self.replicas: Optional[ReplicaRouter] = None
+        if replica_dsns:
+            self.replicas = ReplicaRouter(
+                self.pg_pool,
+                replica_dsns,
+                max_lag_seconds=replica_max_lag_seconds,
+                lsn_wait_ms=replica_lsn_wait_ms,
+            )
+
+        self.pg_utils = pg_utils or PgVectorUtils()
+
+        self._vector_version: Optional[Tuple[int, ...]] = None
+        self._meta_table_ready = False
+        self._tuning_table_ready = False
+        self._source_indexed: set = set()
+        self._partitions: set = set()
+
+    def close(self):
+        """
+        Closes the primary pool and the replica pools.
+        """
+        self.pg_pool.disconnect()
+        if self.replicas is not None:
+            self.replicas.disconnect()
+
+    def _read_pool(self, min_lsn: Optional[str] = None) -> PgPoolConnector:
+        """
+        Pool serving a read: a healthy replica (that has replayed min_lsn) if any, otherwise the primary.
+        """
+        if self.replicas is None:
+            return self.pg_pool
+        return self.replicas.pick(min_lsn)
+
+    def _read(self, run, min_lsn: Optional[str] = None, primary: bool = False):
+        """
+        Runs run(pool) on the pool picked for a read, again on the primary if the replica fails.
+
+        Standby queries can be cancelled by the replay of the WAL (conflict with
+        recovery), the read is then retried on the primary but the replica is kept.
+        """
+        pool = self.pg_pool if primary else self._read_pool(min_lsn)
+        try:
+            return run(pool)
+        except psycopg.OperationalError as e:
+            if pool is self.pg_pool:
+                raise
+            logger.warning(f"Read on a replica failed, retrying on the primary: {e}")
+            if not isinstance(e, psycopg.errors.TransactionRollback):
+                self.replicas.mark_unhealthy(pool)
+            return run(self.pg_pool)
 
-  
-    def table_exists(self, table_name: str) -> bool:
+    def current_wal_lsn(self) -> str:
+        """
+        WAL position of the primary, reads given it as min_lsn see every write committed before this call.
+        """
+        with self.pg_pool.cursor() as cur:
+            cur.execute("SELECT pg_current_wal_lsn()::text;")
+            return cur.fetchone()[0]
+
+    def table_exists(self, table_name: str, primary: bool = False, min_lsn: Optional[str] = None) -> bool:
         """
         Checks if a table with the specified name exists in the given schema.
         Args:
             table_name (str): The name of the table to check for existence.
+            primary (bool): Checks on the primary (write paths), otherwise on a replica if any.
+            min_lsn (Optional[str]): Read-your-writes: WAL position the replica must have replayed.
         Returns:
             bool: True if the table exists, False otherwise.
         """
-        with self.pg_pool.cursor() as cur:
+        return self._read(lambda pool: self._table_exists(pool, table_name), min_lsn=min_lsn, primary=primary)
+
+    def _table_exists(self, pool: PgPoolConnector, table_name: str) -> bool:
+        with pool.cursor() as cur:
             cur.execute("""
                 SELECT EXISTS (
                     SELECT 1
@@ -66,23 +163,310 @@ class PgVectorStore:
             return False
         return True
 
+    def vector_version(self) -> Tuple[int, ...]:
+        """
+        Returns the installed pgvector extension version, e.g. (0, 8, 0).
+        """
+        if self._vector_version is None:
+            with self.pg_pool.cursor() as cur:
+                cur.execute("SELECT extversion FROM pg_extension WHERE extname = 'vector';")
+                row = cur.fetchone()
+            version = row[0] if row else "0"
+            self._vector_version = tuple(int(p) for p in version.split(".") if p.isdigit())
+        return self._vector_version
+
+    def _ensure_meta_table(self):
+        """
+        Creates the table holding the storage and index layout of every collection.
+        """
+        if self._meta_table_ready:
+            return
+
+        with self.pg_pool.cursor() as cur:
+            cur.execute(
+                sql.SQL("""
+                    CREATE TABLE IF NOT EXISTS {tbl} (
+                    name TEXT PRIMARY KEY,
+                    dim INT NOT NULL,
+                    storage TEXT NOT NULL DEFAULT 'vector',
+                    index_type TEXT,
+                    index_params JSONB NOT NULL DEFAULT '{{}}',
+                    options JSONB NOT NULL DEFAULT '{{}}',
+                    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                    );
+                """).format(tbl=sql.Identifier(META_TABLE))
+            )
+        self._meta_table_ready = True
+
+    def _save_collection_meta(self, meta: CollectionMeta):
+        self._ensure_meta_table()
+
+        with self.pg_pool.cursor() as cur:
+            cur.execute(
+                sql.SQL("""
+                    INSERT INTO {tbl} (name, dim, storage, index_type, index_params, options)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                    ON CONFLICT (name) DO UPDATE SET
+                        dim = EXCLUDED.dim,
+                        storage = EXCLUDED.storage,
+                        index_type = EXCLUDED.index_type,
+                        index_params = EXCLUDED.index_params,
+                        options = EXCLUDED.options,
+                        updated_at = now();
+                """).format(tbl=sql.Identifier(META_TABLE)),
+                (meta.name, meta.dim, meta.storage, meta.index_type, Jsonb(meta.index_params), Jsonb(meta.options))
+            )
+        _META_CACHE.pop((self.dsn, self.schema, meta.name), None)
+
+    def get_collection_meta(self, collection: str) -> CollectionMeta:
+        """
+        Returns the storage and index layout of a collection.
+
+        Collections created before the metadata table existed get the historical
+        defaults (1024-d fp32 vectors with an HNSW index).
+        """
+        name = collection.lower()
+        cache_key = (self.dsn, self.schema, name)
+
+        cached = _META_CACHE.get(cache_key)
+        if cached and time.monotonic() - cached[0] < META_CACHE_TTL_SECONDS:
+            return cached[1]
+
+        self._ensure_meta_table()
+
+        with self.pg_pool.cursor() as cur:
+            cur.execute(
+                sql.SQL("""
+                    SELECT dim, storage, index_type, index_params, options
+                    FROM {tbl}
+                    WHERE name = %s;
+                """).format(tbl=sql.Identifier(META_TABLE)),
+                (name,)
+            )
+            row = cur.fetchone()
+
+        if row is None:
+            meta = CollectionMeta(name=name)
+        else:
+            dim, storage, index_type, index_params, options = row
+            meta = CollectionMeta(
+                name=name,
+                dim=dim,
+                storage=storage,
+                index_type=index_type,
+                index_params=index_params or {},
+                options=options or {},
+            )
+
+        _META_CACHE[cache_key] = (time.monotonic(), meta)
+        return meta
+
+    def _ensure_tuning_table(self):
+        """
+        Creates the table holding the tuned search parameters of every (collection, k).
+        """
+        if self._tuning_table_ready:
+            return
+
+        with self.pg_pool.cursor() as cur:
+            cur.execute(
+                sql.SQL("""
+                    CREATE TABLE IF NOT EXISTS {tbl} (
+                    collection TEXT NOT NULL,
+                    k INT NOT NULL,
+                    param TEXT NOT NULL, -- ef_search (HNSW) or probes (IVFFlat)
+                    value INT NOT NULL,
+                    recall DOUBLE PRECISION NOT NULL,
+                    recall_target DOUBLE PRECISION NOT NULL,
+                    p50_ms DOUBLE PRECISION,
+                    rows BIGINT,
+                    tuned_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                    PRIMARY KEY (collection, k, param)
+                    );
+                """).format(tbl=sql.Identifier(TUNING_TABLE))
+            )
+        self._tuning_table_ready = True
+
+    def save_search_tuning(self,
+                           collection: str,
+                           k: int,
+                           param: str,
+                           value: int,
+                           recall: float,
+                           recall_target: float,
+                           p50_ms: Optional[float] = None,
+                           rows: Optional[int] = None,
+                           ):
+        """
+        Stores the tuned value of a search parameter for a (collection, k).
+        """
+        self._ensure_tuning_table()
+
+        with self.pg_pool.cursor() as cur:
+            cur.execute(
+                sql.SQL("""
+                    INSERT INTO {tbl} (collection, k, param, value, recall, recall_target, p50_ms, rows)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                    ON CONFLICT (collection, k, param) DO UPDATE SET
+                        value = EXCLUDED.value,
+                        recall = EXCLUDED.recall,
+                        recall_target = EXCLUDED.recall_target,
+                        p50_ms = EXCLUDED.p50_ms,
+                        rows = EXCLUDED.rows,
+                        tuned_at = now();
+                """).format(tbl=sql.Identifier(TUNING_TABLE)),
+                (collection.lower(), k, param, value, recall, recall_target, p50_ms, rows)
+            )
+        _TUNING_CACHE.pop((self.dsn, self.schema, collection.lower()), None)
+
+    def get_search_tuning(self, collection: str) -> List[Dict[str, Any]]:
+        """
+        Returns the tuned search parameters of a collection, one entry per (k, param).
+        """
+        self._ensure_tuning_table()
+
+        with self.pg_pool.cursor() as cur:
+            cur.execute(
+                sql.SQL("""
+                    SELECT k, param, value, recall, recall_target, p50_ms, rows, tuned_at
+                    FROM {tbl}
+                    WHERE collection = %s
+                    ORDER BY param, k;
+                """).format(tbl=sql.Identifier(TUNING_TABLE)),
+                (collection.lower(),)
+            )
+            return self._fetch_records(cur)
+
+    def clear_search_tuning(self, collection: str):
+        """
+        Forgets the tuned search parameters of a collection (they are only valid for the index they were measured on).
+        """
+        self._ensure_tuning_table()
+
+        with self.pg_pool.cursor() as cur:
+            cur.execute(
+                sql.SQL("DELETE FROM {} WHERE collection = %s;").format(sql.Identifier(TUNING_TABLE)),
+                (collection.lower(),)
+            )
+        _TUNING_CACHE.pop((self.dsn, self.schema, collection.lower()), None)
+
+    def _tuned_value(self, meta: CollectionMeta, param: str, k: int) -> Optional[int]:
+        """
+        Tuned value of a search parameter for k.
+
+        Uses the entry of the smallest tuned k >= k. Above the largest tuned k, the
+        value is scaled with k (a larger k needs a wider search).
+        """
+        cache_key = (self.dsn, self.schema, meta.name)
+        cached = _TUNING_CACHE.get(cache_key)
+
+        if cached and time.monotonic() - cached[0] < META_CACHE_TTL_SECONDS:
+            tuned = cached[1]
+        else:
+            tuned: Dict[str, Dict[int, int]] = {}
+            try:
+                for entry in self.get_search_tuning(meta.name):
+                    tuned.setdefault(entry["param"], {})[entry["k"]] = entry["value"]
+            except Exception as e:
+                logger.warning(f"Could not read the search tuning of '{meta.name}': {e}")
+            _TUNING_CACHE[cache_key] = (time.monotonic(), tuned)
+
+        values = tuned.get(param)
+        if not values:
+            return None
+
+        for tuned_k in sorted(values):
+            if tuned_k >= k:
+                return values[tuned_k]
+
+        largest_k = max(values)
+        return int(values[largest_k] * k / largest_k)
+
+    def _index_sql(self,
+                   meta: CollectionMeta,
+                   index_name: str,
+                   index_type: Optional[str] = None,
+                   index_params: Optional[Dict[str, Any]] = None,
+                   concurrently: bool = False,
+                   where: Optional[sql.Composable] = None, # Predicate of a partial index
+                   ) -> sql.Composed:
+        """
+        Builds the CREATE INDEX statement of the ANN index of a collection.
+        """
+        index_type = (index_type or meta.index_type or "hnsw").lower()
+        params = meta.index_params if index_params is None else index_params
+
+        if index_type == "hnsw":
+            with_sql = sql.SQL("m = {m}, ef_construction = {ef}").format(
+                m=sql.Literal(int(params.get("m", 32))),
+                ef=sql.Literal(int(params.get("ef_construction", 400))),
+            )
+        elif index_type == "ivfflat":
+            with_sql = sql.SQL("lists = {lists}").format(lists=sql.Literal(int(params.get("lists") or 1000)))
+        else:
+            raise ValueError("index_type must be 'hnsw' or 'ivfflat'")
+
+        return sql.SQL("""
+            CREATE INDEX {concurrently} IF NOT EXISTS {idx} ON {tbl}
+            USING {method} ({expr} {opclass})
+            WITH ({with_sql})
+            {where};
+        """).format(
+            concurrently=sql.SQL("CONCURRENTLY") if concurrently else sql.SQL(""),
+            idx=sql.Identifier(index_name),
+            tbl=sql.Identifier(meta.name),
+            method=sql.SQL(index_type),
+            expr=meta.ann_expression(),
+            opclass=meta.opclass(),
+            with_sql=with_sql,
+            where=sql.SQL("WHERE {}").format(where) if where is not None else sql.SQL(""),
+        )
+
     def create_vector_collection(self,
                                  collection_name: str,
-                                 index_type: str = "hnsw",  # Hierarchical Navigable Small World Graph.
+                                 index_type: Optional[str] = "hnsw",  # Hierarchical Navigable Small World Graph.
                                  dim: int = 1024,
                                  hnsw_m: int = 32,  # Maximum connections per node in the graph (higher value increases accuracy).
                                  hnsw_ef_construction: int = 400,  # Number of candidates considered during construction (improves node selection).
-                                 ivf_lists: int = 1000, # Number of clusters.
+                                 ivf_lists: Optional[int] = None, # Number of clusters, None to pick it from the row count at training time.
+                                 storage: str = "vector", # "vector" (fp32), "halfvec" (fp16) or "bit" (binary quantization + rerank).
+                                 short_dim: Optional[int] = None, # Dimension of the indexed prefix vector (e.g. 256), None to index the full vector.
+                                 defer_index: bool = False, # Bulk-load mode: the ANN index is built later with build_vector_index().
+                                 recall_target: Optional[float] = None, # IVFFlat: recall the probes are chosen for (default 0.95).
+                                 partition_by: Optional[str] = None, # "source" or "tenant" to partition the table, None for a single table.
+                                 hash_partitions: int = 0, # Number of HASH partitions, 0 for one LIST partition per source / tenant.
                                  ) -> bool:
         """
         Creates a new vector collection (table) in the database with the specified dimension and index type.
 
         Args:
             collection_name (str): Name of the collection (table) to create.
-            index_type (str, optional): Type of index to use ("hnsw" or "ivfflat"). Defaults to "hnsw".
+            index_type (str, optional): Type of index to use ("hnsw", "ivfflat" or None). Defaults to "hnsw".
             hnsw_m (int, optional): Maximum connections per node in HNSW graph. Defaults to 32.
             hnsw_ef_construction (int, optional): Number of candidates considered during HNSW construction. Defaults to 400.
-            ivf_lists (int, optional): Number of clusters for IVFFlat index. Defaults to 1000.
+            ivf_lists (int, optional): Number of clusters for IVFFlat index. Defaults to None: rows / 1000
+                up to 1M rows, sqrt(rows) above, computed when the index is trained.
+            storage (str, optional): Vector storage mode ("vector", "halfvec" or "bit"). Defaults to "vector".
+                - halfvec stores fp16 vectors (half the memory of the table and index).
+                - bit indexes the binary quantization of the vectors, and rescores the
+                  candidates with the full vectors at query time.
+            short_dim (int, optional): Also stores the first short_dim values of each vector,
+                re-normalized, and builds the ANN index on them only. Searches run on the short
+                vectors and the candidates are rescored with the full ones. Not available with bit.
+            defer_index (bool, optional): Creates the table without its ANN index. Inserting into an
+                unindexed table is much faster for initial loads, build_vector_index() then builds
+                the index once over all the rows. Defaults to False.
+                IVFFlat indexes are always deferred: k-means on an empty table gives useless
+                centroids, the index is trained once the collection has enough rows.
+            recall_target (float, optional): IVFFlat recall target, ivfflat.probes is derived from it.
+            partition_by (str, optional): Partitions the table on "source" or on a "tenant" column, each
+                partition with its own ANN index. Filtered searches only scan the partitions of their
+                sources / tenant, and a document group is removed with drop_partition() (no bloat,
+                no degraded index). With hash_partitions=0 there is one LIST partition per value,
+                created with its first rows. HNSW only: IVFFlat lists are sized for a whole table.
+            hash_partitions (int, optional): Number of HASH partitions instead of LIST ones (for many
+                small sources or tenants). Defaults to 0.
 
         Returns:
             bool: True if the collection was created successfully, False if it already exists.
@@ -92,27 +476,88 @@ class PgVectorStore:
         self.ensure_extension()
 
         # Ensure index type.
-        if not self.ensure_index_type(index_type):
+        if index_type is not None and not self.ensure_index_type(index_type):
             return False
 
+        if storage not in STORAGE_MODES:
+            raise ValueError(f"storage must be one of {STORAGE_MODES}")
+
+        if storage != "vector" and self.vector_version() < (0, 7, 0):
+            raise ValueError(f"storage='{storage}' requires pgvector >= 0.7.0")
+
+        if short_dim is not None:
+            if storage == "bit":
+                raise ValueError("short_dim cannot be combined with storage='bit'")
+            if not 0 < int(short_dim) < int(dim):
+                raise ValueError(f"short_dim must be between 1 and {int(dim) - 1}")
+
+        if partition_by is not None:
+            if partition_by not in PARTITION_KEYS:
+                raise ValueError(f"partition_by must be one of {PARTITION_KEYS}")
+            if index_type is not None and index_type.lower() == "ivfflat":
+                raise ValueError("Partitioned collections use HNSW indexes")
+
         # Check if the collection (table) already exists.
-        if self.table_exists(collection_name):
+        if self.table_exists(collection_name, primary=True):
             print(f"Table {collection_name} already exists.")
             return False
 
         collection_name = collection_name.lower()
 
+        if index_type is None:
+            index_params = {}
+        elif index_type.lower() == "hnsw":
+            index_params = {"m": hnsw_m, "ef_construction": hnsw_ef_construction}
+        else:
+            index_params = {"lists": int(ivf_lists)} if ivf_lists else {}
+            defer_index = True # Trained later, on real data.
+
+        meta = CollectionMeta(
+            name=collection_name,
+            dim=int(dim),
+            storage=storage,
+            index_type=index_type.lower() if index_type else None,
+            index_params=index_params,
+            options={"short_dim": int(short_dim)} if short_dim else {},
+        )
+        if defer_index and meta.index_type is not None:
+            meta.options["index_deferred"] = True
+        if recall_target is not None:
+            meta.options["recall_target"] = float(recall_target)
+        if meta.index_type == "ivfflat" and not ivf_lists:
+            meta.options["auto_lists"] = True
+        if partition_by is not None:
+            meta.options["partition_by"] = partition_by
+            if hash_partitions:
+                meta.options["hash_partitions"] = int(hash_partitions)
+
         tbl = sql.Identifier(collection_name)
-        idx = sql.Identifier(f"{collection_name}_vec_idx")
+        short_column = sql.SQL("")
+        if meta.short_dim is not None:
+            short_column = sql.SQL("embedding_short {} NOT NULL,").format(meta.column_type(meta.short_dim))
+
+        # The partition key must be part of the primary key of a partitioned table.
+        primary_key = sql.SQL("PRIMARY KEY (id)")
+        tenant_column, partition_sql = sql.SQL(""), sql.SQL("")
+        if meta.partition_by is not None:
+            primary_key = sql.SQL("PRIMARY KEY (id, {})").format(sql.Identifier(meta.partition_by))
+            partition_sql = sql.SQL("PARTITION BY {} ({})").format(
+                sql.SQL("HASH" if meta.hash_partitions else "LIST"),
+                sql.Identifier(meta.partition_by),
+            )
+        if meta.partition_by == "tenant":
+            tenant_column = sql.SQL("tenant VARCHAR(256) NOT NULL,")
 
         with self.pg_pool.cursor() as cur:
             cur.execute(
                 sql.SQL("""
                     CREATE TABLE IF NOT EXISTS {tbl} (
-                    id BIGSERIAL PRIMARY KEY,
-                    embedding VECTOR({dim}) NOT NULL,
+                    id BIGSERIAL,
+                    embedding {embedding_type} NOT NULL,
+                    {short_column}
                     text TEXT NOT NULL,
                     source VARCHAR(512) NOT NULL,
+                    {tenant_column}
                     page INT NOT NULL,
                     creation_date TIMESTAMPTZ NOT NULL DEFAULT now(),
                     skillsets VARCHAR(256)[],
@@ -124,54 +569,651 @@ class PgVectorStore:
                     ) STORED,
                     ts_vector_fr TSVECTOR GENERATED ALWAYS AS (
                         to_tsvector('french', coalesce(text, ''))
-                    ) STORED
-                    );
+                    ) STORED,
+                    {primary_key}
+                    ) {partition_sql};
                 """).format(
                     tbl=tbl,
-                    dim=sql.Literal(int(dim))
+                    embedding_type=meta.column_type(),
+                    short_column=short_column,
+                    tenant_column=tenant_column,
+                    primary_key=primary_key,
+                    partition_sql=partition_sql,
                 )
             )
 
-            # No index have been choosed (either HNSW or IVFFLAT).
-            if index_type is None:
-                return True
-
-            # Creation of the index HNSW
-            if index_type.lower() == "hnsw":
+            for remainder in range(meta.hash_partitions):
                 cur.execute(
-                    sql.SQL("""
-                        CREATE INDEX IF NOT EXISTS {idx} ON {tbl}
-                        USING hnsw (embedding vector_cosine_ops)
-                        WITH (m = {m}, ef_construction = {ef});
-                    """).format(
-                        idx=idx,
-                        tbl=tbl,
-                        m=sql.Literal(hnsw_m),
-                        ef=sql.Literal(hnsw_ef_construction),
+                    sql.SQL("CREATE TABLE IF NOT EXISTS {} PARTITION OF {} FOR VALUES WITH (MODULUS {}, REMAINDER {});").format(
+                        sql.Identifier(f"{collection_name}_h{remainder}"),
+                        tbl,
+                        sql.Literal(meta.hash_partitions),
+                        sql.Literal(remainder),
                     )
                 )
-            elif index_type.lower() == "ivfflat":
+
+            # Filtered searches read the rows of a few sources through it (exact filter strategy).
+            cur.execute(self._source_index_sql(collection_name))
+
+            # Creation of the ANN index (HNSW or IVFFLAT), none if index_type is None or deferred.
+            if meta.index_type is not None and not defer_index:
+                cur.execute(self._index_sql(meta, index_name=f"{collection_name}_vec_idx"))
+
+        self._save_collection_meta(meta)
+        return True
+
+    def build_vector_index(self,
+                           collection: str,
+                           maintenance_work_mem: str = "2GB", # Memory for the build, the HNSW graph should fit in it.
+                           parallel_workers: Optional[int] = None, # max_parallel_maintenance_workers, None keeps the server setting.
+                           ) -> Dict[str, Any]:
+        """
+        Builds the ANN index of a collection created with defer_index=True.
+
+        The settings are applied with SET LOCAL, so they only last for the build
+        transaction. Progress can be followed with get_index_build_progress().
+
+        Args:
+            collection (str): Name of the collection (table).
+            maintenance_work_mem (str): maintenance_work_mem used by the build (e.g. "2GB").
+            parallel_workers (Optional[int]): Number of parallel maintenance workers.
+
+        Returns:
+            Dict[str, Any]: Index name, build time and index size.
+        """
+        meta = self.get_collection_meta(collection)
+
+        if meta.index_type is None:
+            raise ValueError(f"Collection '{meta.name}' has no ANN index to build")
+
+        meta = replace(meta, index_params=dict(meta.index_params), options=dict(meta.options))
+        self._prepare_ivfflat_params(meta)
+
+        index_name = f"{meta.name}_vec_idx"
+        start = time.perf_counter()
+
+        with self.pg_pool.transaction() as cur:
+            cur.execute(sql.SQL("SET LOCAL maintenance_work_mem = {}").format(sql.Literal(maintenance_work_mem)))
+            if parallel_workers is not None:
                 cur.execute(
-                    sql.SQL("""
-                        CREATE INDEX IF NOT EXISTS {idx} ON {tbl}
-                        USING ivfflat (embedding vector_cosine_ops)
-                        WITH (lists = {lists})
-                    """).format(
-                        idx=idx,
-                        tbl=tbl,
-                        lists=sql.Literal(ivf_lists)
-                    )
+                    sql.SQL("SET LOCAL max_parallel_maintenance_workers = {}").format(sql.Literal(int(parallel_workers)))
                 )
-            else:
-                raise ValueError("index_type must be 'hnsw', 'ivfflat', or None")
-            return True
+            cur.execute(self._index_sql(meta, index_name=index_name))
+            # Partitioned collections: the index of the parent is the sum of the partitions' indexes.
+            cur.execute("SELECT sum(pg_relation_size(relid)) FROM pg_partition_tree(%s::regclass);", (index_name,))
+            index_bytes = int(cur.fetchone()[0] or 0)
+
+        build_seconds = time.perf_counter() - start
+
+        meta.options.pop("index_deferred", None)
+        self._save_collection_meta(meta)
+        self.clear_search_tuning(meta.name)
+
+        logger.info(f"Built index {index_name} in {build_seconds:.1f}s ({index_bytes / (1024 * 1024):.1f} MB)")
+        return {
+            "collection": meta.name,
+            "index": index_name,
+            "index_type": meta.index_type,
+            "build_seconds": round(build_seconds, 2),
+            "index_bytes": index_bytes,
+        }
+
+    def get_index_build_progress(self, collection: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the progress of a running CREATE INDEX on a collection, from pg_stat_progress_create_index.
+
+        Returns:
+            Optional[Dict[str, Any]]: Phase and counters of the build, None if no index is being built.
+        """
+        with self.pg_pool.cursor() as cur:
+            cur.execute("""
+                SELECT p.pid, p.phase, i.relname AS index_name,
+                       p.blocks_done, p.blocks_total, p.tuples_done, p.tuples_total,
+                       now() - a.xact_start AS elapsed
+                FROM pg_stat_progress_create_index p
+                JOIN pg_class c ON c.oid = p.relid
+                LEFT JOIN pg_class i ON i.oid = p.index_relid
+                LEFT JOIN pg_stat_activity a ON a.pid = p.pid
+                WHERE c.relname = %s;
+            """, (collection.lower(),))
+            row = cur.fetchone()
+
+        if row is None:
+            return None
+
+        pid, phase, index_name, blocks_done, blocks_total, tuples_done, tuples_total, elapsed = row
+
+        # The loading phases report tuples, the others (e.g. the initial scan) report blocks.
+        if tuples_total:
+            percent = 100.0 * tuples_done / tuples_total
+        elif blocks_total:
+            percent = 100.0 * blocks_done / blocks_total
+        else:
+            percent = None
+
+        return {
+            "pid": pid,
+            "phase": phase,
+            "index": index_name,
+            "blocks_done": blocks_done,
+            "blocks_total": blocks_total,
+            "tuples_done": tuples_done,
+            "tuples_total": tuples_total,
+            "percent": round(percent, 1) if percent is not None else None,
+            "elapsed_seconds": elapsed.total_seconds() if elapsed is not None else None,
+        }
+
+    def count_rows(self, collection: str) -> int:
+        """
+        Number of rows of a collection, from the planner statistics when they exist
+        (cheap on large tables), with an exact count otherwise.
+        """
+        with self.pg_pool.cursor() as cur:
+            cur.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s);", (f"{self.schema}.{collection.lower()}",))
+            row = cur.fetchone()
+            if row is not None and row[0] is not None and row[0] > 0:
+                return int(row[0])
+
+            cur.execute(sql.SQL("SELECT count(*) FROM {}").format(sql.Identifier(collection.lower())))
+            return int(cur.fetchone()[0])
+
+    def _prepare_ivfflat_params(self, meta: CollectionMeta):
+        """
+        Sets the number of lists of an IVFFlat index from the row count (unless it was
+        given explicitly) and records the row count the index is trained on.
+        """
+        if meta.index_type != "ivfflat":
+            return
+
+        rows = self.count_rows(meta.name)
+        if not meta.index_params.get("lists"):
+            meta.index_params["lists"] = ivfflat_lists(rows)
+        meta.options["trained_rows"] = rows
+
+    def ivfflat_training_plan(self,
+                              collection: str,
+                              min_rows: int = 10000, # Rows needed before the first training.
+                              growth_factor: float = 4.0, # Retrain once the table has grown this much since the last training.
+                              ) -> Optional[Dict[str, Any]]:
+        """
+        Tells whether the IVFFlat index of a collection should be trained or retrained.
+
+        Returns:
+            Optional[Dict[str, Any]]: {"action": "build" | "reindex", "rows": ..., "lists": ...},
+            None if there is nothing to do (or the collection is not IVFFlat).
+        """
+        meta = self.get_collection_meta(collection)
+        if meta.index_type != "ivfflat":
+            return None
+
+        rows = self.count_rows(meta.name)
+        lists = int(meta.index_params.get("lists") or 0) if not meta.options.get("auto_lists") else ivfflat_lists(rows)
+
+        if meta.options.get("index_deferred"):
+            if rows < min_rows:
+                return None
+            return {"action": "build", "rows": rows, "lists": lists or ivfflat_lists(rows)}
+
+        trained_rows = int(meta.options.get("trained_rows") or 0)
+        if growth_factor > 1 and rows >= max(trained_rows, 1) * growth_factor:
+            return {"action": "reindex", "rows": rows, "lists": lists or ivfflat_lists(rows)}
+
+        return None
+
+    def _index_exists(self, index_name: str) -> bool:
+        with self.pg_pool.cursor() as cur:
+            cur.execute("SELECT to_regclass(%s) IS NOT NULL;", (f"{self.schema}.{index_name}",))
+            return bool(cur.fetchone()[0])
+
+    def reindex_collection(self,
+                           collection: str,
+                           index_type: Optional[str] = None, # New index type ("hnsw" or "ivfflat"), None keeps the current one.
+                           index_params: Optional[Dict[str, Any]] = None, # e.g. {"m": 16, "ef_construction": 200} or {"lists": 500}
+                           min_recall: float = 0.9, # The new index is rejected under this recall@k.
+                           k: int = 10,
+                           sample_size: int = 50,
+                           ef_search: Optional[int] = 150,
+                           maintenance_work_mem: Optional[str] = None,
+                           lock_timeout: str = "5s", # Give up the swap instead of queueing behind long queries.
+                           ) -> Dict[str, Any]:
+        """
+        Rebuilds the ANN index of a collection online, with new parameters or another index type.
+
+        1. The new index is built next to the current one with CREATE INDEX CONCURRENTLY,
+           reads and writes keep going meanwhile.
+        2. recall@k of the new index is measured on sample queries against exact
+           neighbours, in a read-only transaction forced onto the new index (see
+           _index_recall). The new index is dropped (rejected) under min_recall.
+        3. A transaction bounded by lock_timeout drops the current index and renames
+           the new one in place, the only step that locks the table (lock_ms).
+
+        When the planner can't be forced onto the new index (no pg_hint_plan and it
+        prefers the current one), step 2 runs after the swap instead: under min_recall
+        the previous index is rebuilt concurrently and swapped back ("reverted").
+
+        Returns:
+            Dict[str, Any]: Status ("swapped", "rejected" or "reverted"), recall of the old and new index, timings.
+        """
+        from app.core.pgvector.recall import sample_query_vectors, exact_neighbors, measure_recall
+
+        meta = self.get_collection_meta(collection)
+        if meta.partition_by is not None:
+            # CREATE INDEX CONCURRENTLY is not available on partitioned tables.
+            raise ValueError(f"Collection '{meta.name}' is partitioned, online reindexing is not supported")
+
+        index_type = (index_type or meta.index_type or "hnsw").lower()
+        if not self.ensure_index_type(index_type):
+            raise ValueError("index_type must be 'hnsw' or 'ivfflat'")
+
+        explicit_lists = index_params is not None and "lists" in index_params
+        if index_params is None:
+            index_params = dict(meta.index_params) if index_type == meta.index_type else {}
+        new_meta = replace(meta, index_type=index_type, index_params=dict(index_params), options=dict(meta.options))
+        new_meta.options.pop("index_deferred", None)
+
+        if index_type == "ivfflat":
+            if explicit_lists:
+                new_meta.options.pop("auto_lists", None)
+            elif "lists" not in index_params or new_meta.options.get("auto_lists"):
+                new_meta.options["auto_lists"] = True
+                new_meta.index_params.pop("lists", None) # Recomputed from the current row count
+        self._prepare_ivfflat_params(new_meta)
+        index_params = new_meta.index_params
+
+        index_name = f"{meta.name}_vec_idx"
+        new_index_name = f"{meta.name}_vec_idx_new"
+        had_index = self._index_exists(index_name)
+
+        # Ground truth and recall of the current index, measured before the new index
+        # exists (the planner could pick either of them afterwards).
+        queries = [vec for _, vec in sample_query_vectors(self, meta.name, sample_size)]
+        ground_truth = [exact_neighbors(self, meta.name, vec, k) for vec in queries]
+        old_recall = measure_recall(self, meta.name, queries, ground_truth, k, ef_search=ef_search)["recall"] if had_index else None
+
+        # Leftover of a failed run (CONCURRENTLY leaves an invalid index behind on error).
+        with self.pg_pool.cursor() as cur:
+            cur.execute(sql.SQL("DROP INDEX CONCURRENTLY IF EXISTS {}").format(sql.Identifier(new_index_name)))
+
+        logger.info(f"Reindex '{meta.name}': building {index_type} {index_params} concurrently")
+        start = time.perf_counter()
+        self._build_index_concurrently(new_meta, new_index_name, maintenance_work_mem)
+        build_seconds = time.perf_counter() - start
+
+        if not had_index:
+            # Nothing to swap with (e.g. deferred index), the new index just takes its name.
+            with self.pg_pool.cursor() as cur:
+                cur.execute(sql.SQL("ALTER INDEX {} RENAME TO {}").format(
+                    sql.Identifier(new_index_name), sql.Identifier(index_name)
+                ))
+            self._save_collection_meta(new_meta)
+            self.clear_search_tuning(meta.name)
+            return {
+                "status": "swapped",
+                "collection": meta.name,
+                "index_type": index_type,
+                "index_params": index_params,
+                "old_recall": None,
+                "new_recall": None,
+                "build_seconds": round(build_seconds, 2),
+            }
+
+        result = {
+            "collection": meta.name,
+            "index_type": index_type,
+            "index_params": index_params,
+            "old_recall": round(old_recall, 4) if old_recall is not None else None,
+            "min_recall": min_recall,
+            "build_seconds": round(build_seconds, 2),
+        }
+
+        # Measured before any lock, None if the planner can't be forced onto the new index.
+        new_recall = self._index_recall(new_meta, new_index_name, queries, ground_truth, k, ef_search)
+
+        if new_recall is not None and new_recall < min_recall:
+            with self.pg_pool.cursor() as cur:
+                cur.execute(sql.SQL("DROP INDEX CONCURRENTLY IF EXISTS {}").format(sql.Identifier(new_index_name)))
+            logger.warning(f"Reindex '{meta.name}': rejected, recall {new_recall:.3f} < {min_recall}")
+            return {**result, "status": "rejected", "new_recall": round(new_recall, 4)}
+
+        lock_ms = self._swap_index(new_index_name, index_name, lock_timeout)
+        self._save_collection_meta(new_meta)
+        self.clear_search_tuning(meta.name)
+
+        if new_recall is None:
+            # Only the new index is left, the planner can't pick another one anymore.
+            new_recall = measure_recall(self, meta.name, queries, ground_truth, k, ef_search=ef_search)["recall"]
+            if new_recall < min_recall:
+                logger.warning(f"Reindex '{meta.name}': recall {new_recall:.3f} < {min_recall}, restoring the previous index")
+                previous = replace(meta, index_params=dict(meta.index_params), options=dict(meta.options))
+                self._prepare_ivfflat_params(previous)
+                self._build_index_concurrently(previous, new_index_name, maintenance_work_mem)
+                lock_ms += self._swap_index(new_index_name, index_name, lock_timeout)
+                self._save_collection_meta(previous)
+                self.clear_search_tuning(meta.name)
+                return {**result, "status": "reverted", "new_recall": round(new_recall, 4), "lock_ms": round(lock_ms, 1)}
+
+        logger.info(f"Reindex '{meta.name}': swapped, recall {old_recall} -> {new_recall:.3f}")
+        return {**result, "status": "swapped", "new_recall": round(new_recall, 4), "lock_ms": round(lock_ms, 1)}
+
+    def _build_index_concurrently(self, meta: CollectionMeta, index_name: str, maintenance_work_mem: Optional[str] = None):
+        """
+        CREATE INDEX CONCURRENTLY of the ANN index of meta under index_name, dropped again if the build fails.
+        """
+        with self.pg_pool.cursor() as cur:
+            try:
+                if maintenance_work_mem:
+                    cur.execute(sql.SQL("SET maintenance_work_mem = {}").format(sql.Literal(maintenance_work_mem)))
+                cur.execute(self._index_sql(meta, index_name=index_name, concurrently=True))
+            except Exception:
+                cur.execute(sql.SQL("DROP INDEX CONCURRENTLY IF EXISTS {}").format(sql.Identifier(index_name)))
+                raise
+            finally:
+                cur.execute("RESET maintenance_work_mem")
+
+    def _swap_index(self, new_index_name: str, index_name: str, lock_timeout: str) -> float:
+        """
+        Drops index_name and renames new_index_name in its place, in one short transaction.
+
+        Returns:
+            float: Time the table was locked (ms)
+        """
+        start = time.perf_counter()
+        with self.pg_pool.transaction() as cur:
+            cur.execute(sql.SQL("SET LOCAL lock_timeout = {}").format(sql.Literal(lock_timeout)))
+            cur.execute(sql.SQL("DROP INDEX {}").format(sql.Identifier(index_name)))
+            cur.execute(sql.SQL("ALTER INDEX {} RENAME TO {}").format(
+                sql.Identifier(new_index_name), sql.Identifier(index_name)
+            ))
+        return (time.perf_counter() - start) * 1000
+
+    def _index_recall(self,
+                      meta: CollectionMeta,
+                      index_name: str,
+                      queries: List[List[float]],
+                      ground_truth: List[List[int]],
+                      k: int,
+                      ef_search: Optional[int],
+                      ) -> Optional[float]:
+        """
+        recall@k of one ANN index of a collection that has two, without locking the table.
+
+        The queries run in a read-only transaction with sequential scans disabled and a
+        pg_hint_plan IndexScan hint on index_name (when the extension can be loaded),
+        placed at the head of the statement, the only place pg_hint_plan reads it (before
+        EXPLAIN too). EXPLAIN checks that the plan does use index_name first.
+
+        Returns:
+            Optional[float]: Mean recall@k, None if the planner picks another index.
+        """
+        from app.core.pgvector.recall import recall_at_k
+
+        candidates = self._candidate_limit(meta, k)
+        # The ANN scan reads the collection under its own name, also in the candidates
+        # subquery of the two-stage modes: the hint targets the table, not an alias.
+        hint = sql.SQL("/*+ IndexScan({table} {index}) */ ").format(
+            table=sql.Identifier(meta.name), index=sql.Identifier(index_name)
+        )
+        query = self._knn_sql(meta, sql.SQL("%(qvec)s::vector"), qvec_short=sql.SQL("%(qvec_short)s::vector"))
+        knn = hint + query
+
+        def params(qvec: List[float]) -> Dict[str, Any]:
+            return {
+                "qvec": Vector(qvec),
+                "qvec_short": Vector(truncate_embedding(qvec, meta.short_dim)) if meta.short_dim else None,
+                "k": k,
+                "candidates": candidates,
+            }
+
+        with self.pg_pool.transaction() as cur:
+            cur.execute("SET TRANSACTION READ ONLY")
+            try:
+                with cur.connection.transaction(): # Savepoint, LOAD fails if the library isn't installed
+                    cur.execute("LOAD 'pg_hint_plan'")
+            except psycopg.Error:
+                pass
+            cur.execute("SET LOCAL enable_seqscan = off")
+            self._set_search_params(cur, meta, ef_search, candidates, k=k)
+
+            if not queries:
+                return None
+            cur.execute(hint + sql.SQL("EXPLAIN (FORMAT JSON) ") + query, params(queries[0]))
+            if f'"Index Name": "{index_name}"' not in json.dumps(cur.fetchone()[0]):
+                logger.info(f"Planner doesn't use {index_name}, its recall is measured after the swap")
+                return None
+
+            recalls = []
+            for qvec, truth in zip(queries, ground_truth):
+                cur.execute(knn, params(qvec))
+                recalls.append(recall_at_k([row[0] for row in cur.fetchall()], truth))
+        return sum(recalls) / len(recalls)
+
+    @staticmethod
+    def _source_index_sql(collection: str, concurrently: bool = False) -> sql.Composed:
+        return sql.SQL("CREATE INDEX {concurrently} IF NOT EXISTS {idx} ON {tbl} (source);").format(
+            concurrently=sql.SQL("CONCURRENTLY") if concurrently else sql.SQL(""),
+            idx=sql.Identifier(f"{collection}_source_idx"),
+            tbl=sql.Identifier(collection),
+        )
+
+    def ensure_source_index(self, collection: str):
+        """
+        Creates the btree index on source of collections created before it existed.
+        """
+        collection = collection.lower()
+        if collection in self._source_indexed:
+            return
+
+        if not self._index_exists(f"{collection}_source_idx"):
+            logger.info(f"Creating the source index of '{collection}'")
+            with self.pg_pool.cursor() as cur:
+                cur.execute(self._source_index_sql(collection, concurrently=True))
+        self._source_indexed.add(collection)
+
+    @staticmethod
+    def _partial_index_name(collection: str, source: str) -> str:
+        # Sources are file names: hashed to get a valid identifier under 63 characters.
+        return f"{collection}_vec_src_{hashlib.sha1(source.encode('utf-8')).hexdigest()[:12]}"
+
+    def create_source_index(self,
+                            collection: str,
+                            source: str,
+                            maintenance_work_mem: Optional[str] = None,
+                            ) -> Dict[str, Any]:
+        """
+        Builds an ANN index restricted to the rows of one source (partial index).
+
+        Searches filtered on hot sources then walk a graph (or lists) holding only
+        their rows, instead of discarding the other sources' rows from the main index.
+        The index is built concurrently, searches and inserts keep running.
+
+        Returns:
+            Dict with the index name, its size and the build time
+        """
+        meta = self.get_collection_meta(collection)
+        if not meta.index_ready:
+            raise ValueError(f"Collection '{meta.name}' has no ANN index yet")
+        if meta.partition_by is not None:
+            raise ValueError(f"Collection '{meta.name}' is partitioned, its partitions already have their own ANN index")
+
+        index_name = self._partial_index_name(meta.name, source)
+        index_params = dict(meta.index_params)
+        if meta.index_type == "ivfflat":
+            with self.pg_pool.cursor() as cur:
+                cur.execute(
+                    sql.SQL("SELECT count(*) FROM {} WHERE source = %s").format(sql.Identifier(meta.name)),
+                    (source,)
+                )
+                index_params["lists"] = ivfflat_lists(cur.fetchone()[0])
+
+        start = time.perf_counter()
+        with self.pg_pool.cursor() as cur:
+            try:
+                if maintenance_work_mem:
+                    cur.execute(sql.SQL("SET maintenance_work_mem = {}").format(sql.Literal(maintenance_work_mem)))
+                cur.execute(self._index_sql(
+                    meta,
+                    index_name=index_name,
+                    index_params=index_params,
+                    concurrently=True,
+                    where=sql.SQL("source = {}").format(sql.Literal(source)),
+                ))
+            except Exception:
+                cur.execute(sql.SQL("DROP INDEX CONCURRENTLY IF EXISTS {}").format(sql.Identifier(index_name)))
+                raise
+            finally:
+                cur.execute("RESET maintenance_work_mem")
+            cur.execute("SELECT pg_relation_size(%s::regclass);", (index_name,))
+            index_bytes = cur.fetchone()[0]
+        build_seconds = time.perf_counter() - start
+
+        meta = self.get_collection_meta(meta.name)
+        meta.options["partial_indexes"] = {**(meta.options.get("partial_indexes") or {}), source: index_name}
+        self._save_collection_meta(meta)
+
+        return {
+            "collection": meta.name,
+            "source": source,
+            "index_name": index_name,
+            "index_mb": round(index_bytes / (1024 * 1024), 2),
+            "build_seconds": round(build_seconds, 2),
+        }
+
+    def drop_source_index(self, collection: str, source: str) -> bool:
+        """
+        Drops the partial ANN index of a source.
+
+        Returns:
+            bool: False if the source had no partial index
+        """
+        meta = self.get_collection_meta(collection)
+        partial_indexes = dict(meta.options.get("partial_indexes") or {})
+        index_name = partial_indexes.pop(source, None)
+        if index_name is None:
+            return False
+
+        # Forget it first, so that no search targets it while it is being dropped.
+        meta.options["partial_indexes"] = partial_indexes
+        self._save_collection_meta(meta)
+
+        with self.pg_pool.cursor() as cur:
+            cur.execute(sql.SQL("DROP INDEX CONCURRENTLY IF EXISTS {}").format(sql.Identifier(index_name)))
+        return True
+
+    def hot_sources(self, collection: str, min_rows: int = 50000, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Sources with at least min_rows rows, candidates for a partial index.
+        """
+        with self.pg_pool.cursor() as cur:
+            cur.execute(
+                sql.SQL("""
+                    SELECT source, count(*) AS rows
+                    FROM {}
+                    GROUP BY source
+                    HAVING count(*) >= %s
+                    ORDER BY rows DESC
+                    LIMIT %s;
+                """).format(sql.Identifier(collection.lower())),
+                (min_rows, limit)
+            )
+            return self._fetch_records(cur)
+
+    @staticmethod
+    def _partition_name(collection: str, key: str) -> str:
+        return f"{collection}_p_{hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]}"
+
+    def _is_partition_of(self, partition: str, collection: str) -> bool:
+        with self.pg_pool.cursor() as cur:
+            cur.execute(
+                """
+                SELECT EXISTS (
+                    SELECT 1 FROM pg_inherits
+                    WHERE inhrelid = to_regclass(%s) AND inhparent = to_regclass(%s)
+                );
+                """,
+                (f"{self.schema}.{partition}", f"{self.schema}.{collection}")
+            )
+            return bool(cur.fetchone()[0])
+
+    def ensure_partition(self, collection: str, key: str):
+        """
+        Creates the LIST partition of a source / tenant of a partitioned collection.
+
+        The partition is created as a plain table and then attached: ATTACH PARTITION
+        only takes a SHARE UPDATE EXCLUSIVE lock on the collection, so searches keep
+        running (CREATE TABLE ... PARTITION OF would block them).
+        """
+        meta = self.get_collection_meta(collection)
+        if not meta.list_partitioned or (meta.name, key) in self._partitions:
+            return
+
+        partition = self._partition_name(meta.name, key)
+        if not self._is_partition_of(partition, meta.name):
+            try:
+                with self.pg_pool.cursor() as cur:
+                    cur.execute(
+                        sql.SQL("""
+                            CREATE TABLE IF NOT EXISTS {part}
+                            (LIKE {tbl} INCLUDING DEFAULTS INCLUDING GENERATED INCLUDING CONSTRAINTS);
+                        """).format(part=sql.Identifier(partition), tbl=sql.Identifier(meta.name))
+                    )
+                    # The ANN and source indexes of the collection are created on the (empty) partition.
+                    cur.execute(
+                        sql.SQL("ALTER TABLE {} ATTACH PARTITION {} FOR VALUES IN ({});").format(
+                            sql.Identifier(meta.name),
+                            sql.Identifier(partition),
+                            sql.Literal(key),
+                        )
+                    )
+                logger.info(f"Created partition '{partition}' of '{meta.name}' for '{key}'")
+            except psycopg.Error:
+                # Another worker attached it first.
+                if not self._is_partition_of(partition, meta.name):
+                    raise
+        self._partitions.add((meta.name, key))
+
+    def drop_partition(self, collection: str, key: str) -> int:
+        """
+        Removes every row of a source / tenant of a LIST partitioned collection by
+        dropping its partition: no dead tuples and no index entries left behind.
+
+        The partition is detached concurrently (PostgreSQL >= 14), searches on the
+        other partitions are not blocked.
+
+        Returns:
+            int: Number of rows dropped, 0 if the source / tenant has no partition
+        """
+        meta = self.get_collection_meta(collection)
+        if not meta.list_partitioned:
+            raise ValueError(f"Collection '{meta.name}' is not LIST partitioned")
+
+        partition = self._partition_name(meta.name, key)
+        self._partitions.discard((meta.name, key))
+        if not self.table_exists(partition, primary=True):
+            return 0
+
+        with self.pg_pool.cursor() as cur:
+            cur.execute(sql.SQL("SELECT count(*) FROM {}").format(sql.Identifier(partition)))
+            rows = int(cur.fetchone()[0])
+
+            if self._is_partition_of(partition, meta.name):
+                cur.execute("SHOW server_version_num;")
+                concurrently = int(cur.fetchone()[0]) >= 140000
+                cur.execute(sql.SQL("ALTER TABLE {} DETACH PARTITION {} {};").format(
+                    sql.Identifier(meta.name),
+                    sql.Identifier(partition),
+                    sql.SQL("CONCURRENTLY") if concurrently else sql.SQL(""),
+                ))
+            cur.execute(sql.SQL("DROP TABLE IF EXISTS {};").format(sql.Identifier(partition)))
+
+        logger.info(f"Dropped partition '{partition}' of '{meta.name}' ({rows} rows of '{key}')")
+        return rows
 
     def drop_table(self, table_name: str) -> bool:
         """
         
         """
 
-        if not self.table_exists(table_name):
+        if not self.table_exists(table_name, primary=True):
             print(f"Cannot delete a table {table_name} that doesn't exist.")
             return False
 
@@ -186,17 +1228,36 @@ class PgVectorStore:
                     tbl
                 )
             )
-            return True
+
+        self._ensure_meta_table()
+        with self.pg_pool.cursor() as cur:
+            cur.execute(
+                sql.SQL("DELETE FROM {} WHERE name = %s;").format(sql.Identifier(META_TABLE)),
+                (table_name,)
+            )
+        _META_CACHE.pop((self.dsn, self.schema, table_name), None)
+        self._source_indexed.discard(table_name)
+        self._partitions = {entry for entry in self._partitions if entry[0] != table_name}
+        self.clear_search_tuning(table_name)
+        return True
         
     def list_tables(self) -> List[str]:
         """
-        
+        Lists the collections of the schema (internal knowhub_* tables are excluded).
         """
-        with self.pg_pool.cursor() as cur:
+        return self._read(self._list_tables)
+
+    def _list_tables(self, pool: PgPoolConnector) -> List[str]:
+        with pool.cursor() as cur:
+            # Partitions of partitioned collections are not collections.
             cur.execute("""
-                SELECT table_name
-                FROM information_schema.tables
-                WHERE table_schema = %s;
+                SELECT c.relname
+                FROM pg_class c
+                JOIN pg_namespace n ON n.oid = c.relnamespace
+                WHERE n.nspname = %s
+                  AND c.relkind IN ('r', 'p')
+                  AND NOT c.relispartition
+                  AND c.relname NOT LIKE 'knowhub\\_%%';
             """, (self.schema,))
             tables = [row[0] for row in cur.fetchall()]
         return tables
@@ -222,12 +1283,16 @@ class PgVectorStore:
 
         if source is None or source.strip() == "":
             raise ValueError("Source must be a non-empty string.")
-        if not self.table_exists(table_name):
+        if not self.table_exists(table_name, primary=True):
             raise ValueError(f"Table {table_name} does not exist.")
         
         table_name = table_name.lower()
         tbl = sql.Identifier(table_name)
 
+        meta = self.get_collection_meta(table_name)
+        if meta.list_partitioned and meta.partition_by == "source":
+            return self.drop_partition(table_name, source)
+
         with self.pg_pool.cursor() as cur:
             cur.execute(
                 sql.SQL("""
@@ -238,6 +1303,8 @@ class PgVectorStore:
                 (source,)
             )
             deleted_count = cur.rowcount
+
+        self.drop_source_index(table_name, source)
         return deleted_count
 
     def delete_rows_by_skillsets(self):
@@ -246,8 +1313,9 @@ class PgVectorStore:
     def insert_chunks(
             self,
             collection: str,
-            docs: List[Document],
+            docs: List["Document"],
             batch_size: int = 10,
+            tenant: Optional[str] = None, # Tenant of the documents (required by tenant partitioned collections)
     ) -> int:
         """
         Inserts chunks into the collection after first checking if the sources already exist.
@@ -260,13 +1328,22 @@ class PgVectorStore:
         print(f"Preparing {len(docs)} chunks for insertion into the collection '{collection}'")
 
         # Verify that the collection exists
-        if not self.table_exists(collection):
+        if not self.table_exists(collection, primary=True):
             print(f"Collection '{collection}' does not exist, creating it...")
             if not self.create_vector_collection(collection, dim=1024, index_type="hnsw"):
                 raise RuntimeError(f"Unable to create the collection '{collection}'")
 
+        self.ensure_source_index(collection)
+
+        meta = self.get_collection_meta(collection)
+        if meta.partition_by == "tenant" and not tenant:
+            raise ValueError(f"Collection '{meta.name}' is partitioned by tenant, a tenant is required")
+        if meta.partition_by != "tenant":
+            tenant = None
+
         # Prepare the data
-        texts, metadatas, embeddings = self.pg_utils.prepare_chunks(docs)
+        with stage("embed", texts=len(docs)):
+            texts, metadatas, embeddings = self.pg_utils.prepare_chunks(docs)
         
         if not texts:
             print("No valid text found after preparation")
@@ -288,34 +1365,40 @@ class PgVectorStore:
         print(f"Grouped into {len(sources_groups)} sources: {list(sources_groups.keys())}")
 
         # Check for existing sources
-        existing_sources = self._check_existing_sources(collection, list(sources_groups.keys()))
+        existing_sources = self._check_existing_sources(collection, list(sources_groups.keys()), tenant=tenant)
         
         # Insert only new sources + in batch
         total_inserted = 0
-        for source, chunks in sources_groups.items():
-            if source in existing_sources:
-                print(f"Source '{source}' already exists, skipping {len(chunks)} chunks")
-                continue
-
-            for i in range(0, len(chunks), batch_size):
-                batch_chunks = chunks[i:i + batch_size]
-                print(f"Inserting batch of {len(batch_chunks)} chunks for source '{source}'")
-                try:
-                    total_inserted += self._insert_chunks_for_source(collection, source, batch_chunks)
-                except Exception as e:
-                    print(f"Error inserting chunks for source '{source}': {e}")
+        with stage("insert") as insert_stage:
+            for source, chunks in sources_groups.items():
+                if source in existing_sources:
+                    print(f"Source '{source}' already exists, skipping {len(chunks)} chunks")
                     continue
 
+                if meta.list_partitioned:
+                    self.ensure_partition(collection, tenant if meta.partition_by == "tenant" else source)
+
+                for i in range(0, len(chunks), batch_size):
+                    batch_chunks = chunks[i:i + batch_size]
+                    print(f"Inserting batch of {len(batch_chunks)} chunks for source '{source}'")
+                    try:
+                        total_inserted += self._insert_chunks_for_source(collection, source, batch_chunks, tenant=tenant)
+                    except Exception as e:
+                        print(f"Error inserting chunks for source '{source}': {e}")
+                        continue
+            insert_stage["rows"] = total_inserted
+
         print(f"Insertion complete: {total_inserted} chunks inserted in total")
         return total_inserted
 
-    def _check_existing_sources(self, collection: str, sources: List[str]) -> set:
+    def _check_existing_sources(self, collection: str, sources: List[str], tenant: Optional[str] = None) -> set:
         """
         Checks which sources already exist in the collection.
         
         Args:
             collection: Name of the collection (table)
             sources: List of sources to check
+            tenant: Only checks the sources of this tenant (tenant partitioned collections)
             
         Returns:
             Set of sources that already exist
@@ -327,14 +1410,17 @@ class PgVectorStore:
         table_identifier = sql.Identifier(collection)
         
         # Use ANY to check multiple sources in a single query
+        tenant_filter = sql.SQL("AND tenant = %s") if tenant is not None else sql.SQL("")
+        params = (sources, tenant) if tenant is not None else (sources,)
+
         with self.pg_pool.cursor() as cur:
             cur.execute(
                 sql.SQL("""
                     SELECT DISTINCT source 
                     FROM {} 
-                    WHERE source = ANY(%s)
-                """).format(table_identifier),
-                (sources,)
+                    WHERE source = ANY(%s) {}
+                """).format(table_identifier, tenant_filter),
+                params
             )
             existing = {row[0] for row in cur.fetchall()}
             
@@ -343,7 +1429,12 @@ class PgVectorStore:
         
         return existing
 
-    def _insert_chunks_for_source(self, collection: str, source: str, chunks: List[Dict]) -> int:
+    def _insert_chunks_for_source(self,
+                                  collection: str,
+                                  source: str,
+                                  chunks: List[Dict],
+                                  tenant: Optional[str] = None,
+                                  ) -> int:
         """
         Inserts all chunks for a given source into the collection.
         
@@ -351,17 +1442,30 @@ class PgVectorStore:
             collection: Name of the collection (table)
             source: Name of the source file
             chunks: List of chunks with text, metadata, embedding from the source file
+            tenant: Tenant of the source (tenant partitioned collections only)
             
         Returns:
             Number of chunks inserted
         """
         collection = collection.lower()
         table_identifier = sql.Identifier(collection)
+        meta = self.get_collection_meta(collection)
         
+        vector_columns = [sql.SQL("embedding")]
+        if meta.short_dim is not None:
+            vector_columns.append(sql.SQL("embedding_short"))
+        tenant_column = sql.SQL(", tenant") if tenant is not None else sql.SQL("")
+
         insert_query = sql.SQL("""
-            INSERT INTO {} (embedding, text, source, page, title, author, url)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-        """).format(table_identifier)
+            INSERT INTO {} ({}, text, source, page, title, author, url{})
+            VALUES ({}, %s, %s, %s, %s, %s, %s{})
+        """).format(
+            table_identifier,
+            sql.SQL(", ").join(vector_columns),
+            tenant_column,
+            sql.SQL(", ").join([meta.insert_placeholder()] * len(vector_columns)),
+            sql.SQL(", %s") if tenant is not None else sql.SQL(""),
+        )
         
         inserted_count = 0
         with self.pg_pool.cursor() as cur:
@@ -371,14 +1475,19 @@ class PgVectorStore:
                     embedding_vector = Vector(chunk['embedding'])
                     text = chunk['text']
 
+                    vectors = (embedding_vector,)
+                    if meta.short_dim is not None:
+                        vectors += (Vector(truncate_embedding(chunk['embedding'], meta.short_dim)),)
+
                     cur.execute(insert_query, (
-                        embedding_vector,
+                        *vectors,
                         text,
                         source,
                         metadata.get('page', 0),
                         metadata.get('title'),
                         metadata.get('author'),
-                        metadata.get('url')
+                        metadata.get('url'),
+                        *((tenant,) if tenant is not None else ())
                     ))
                     inserted_count += 1
                 except Exception as e:
@@ -386,93 +1495,492 @@ class PgVectorStore:
                     continue
             return inserted_count
 
+    def _knn_sql(self,
+                 meta: CollectionMeta,
+                 qvec: sql.Composable, # SQL expression of the query vector (a parameter or a column)
+                 with_sources: bool = False, # Filter on source = ANY(%(sources)s)
+                 with_threshold: bool = False,
+                 qvec_short: Optional[sql.Composable] = None, # SQL expression of the short query vector (short_dim collections)
+                 strategy: str = "ann", # "ann", "iterative", "exact" or "partial" (see _filter_strategy)
+                 partial_sources: Optional[List[str]] = None, # Sources searched through their partial index ("partial")
+                 extra_filters: Optional[List[sql.Composable]] = None,
+                 ) -> sql.Composed:
+        """
+        Builds the k-NN query of a collection for its storage mode and filter strategy.
+
+        Single-stage modes order directly by the cosine distance. Two-stage modes
+        (bit, or a short_dim prefix vector) fetch %(candidates)s rows through the
+        reduced index, then rescore them with the full vectors and keep the %(k)s best.
+
+        "exact" orders the filtered rows by their exact distance without the ANN index,
+        "partial" runs one query per source (each matching its partial index) and merges
+        them, "iterative" re-sorts the rows of a relaxed_order iterative index scan.
+        """
+        cols = sql.SQL("id, text, source, page, skillsets, title, author, url, creation_date")
+        table_identifier = sql.Identifier(meta.name)
+        exact = meta.exact_distance(qvec)
+
+        if strategy == "partial":
+            # Literal predicates, so that the planner can prove each partial index applies.
+            parts = [
+                sql.SQL("({})").format(self._knn_sql(
+                    meta,
+                    qvec,
+                    with_threshold=with_threshold,
+                    qvec_short=qvec_short,
+                    extra_filters=[sql.SQL("source = {}").format(sql.Literal(source))] + (extra_filters or []),
+                ))
+                for source in partial_sources or []
+            ]
+            return sql.SQL("""
+                SELECT *
+                FROM ({parts}) AS parts
+                ORDER BY distance
+                LIMIT %(k)s
+            """).format(parts=sql.SQL(" UNION ALL ").join(parts))
+
+        filters = [sql.SQL("source = ANY(%(sources)s)")] if with_sources else []
+        filters += extra_filters or []
+        where_sql = sql.SQL("WHERE ") + sql.SQL(" AND ").join(filters) if filters else sql.SQL("")
+
+        if strategy == "exact" or meta.two_stage:
+            outer_where = sql.SQL("WHERE {} <= %(threshold)s").format(exact) if with_threshold else sql.SQL("")
+
+            if strategy == "exact":
+                # OFFSET 0 keeps the subquery from being flattened: the rows come from the
+                # source index (or a scan), never from an ANN index that would drop some of them.
+                inner = sql.SQL("""
+                    SELECT {cols}, embedding
+                    FROM {table}
+                    {where}
+                    OFFSET 0
+                """).format(cols=cols, table=table_identifier, where=where_sql)
+            else:
+                inner = sql.SQL("""
+                    SELECT {cols}, embedding
+                    FROM {table}
+                    {where}
+                    ORDER BY {ann_order}
+                    LIMIT %(candidates)s
+                """).format(
+                    cols=cols,
+                    table=table_identifier,
+                    where=where_sql,
+                    ann_order=meta.ann_order(qvec, qvec_short),
+                )
+
+            return sql.SQL("""
+                SELECT {cols}, {exact} AS distance
+                FROM ({inner}) AS candidates
+                {outer_where}
+                ORDER BY distance
+                LIMIT %(k)s
+            """).format(
+                cols=cols,
+                exact=exact,
+                inner=inner,
+                outer_where=outer_where,
+            )
+
+        if with_threshold:
+            filters = filters + [sql.SQL("{} <= %(threshold)s").format(exact)]
+            where_sql = sql.SQL("WHERE ") + sql.SQL(" AND ").join(filters)
+
+        query = sql.SQL("""
+            SELECT {cols}, {exact} AS distance
+            FROM {table}
+            {where}
+            ORDER BY {ann_order}
+            LIMIT %(k)s
+        """).format(
+            cols=cols,
+            exact=exact,
+            table=table_identifier,
+            where=where_sql,
+            ann_order=meta.ann_order(qvec, qvec_short),
+        )
+
+        if strategy == "iterative":
+            # relaxed_order scans may return rows slightly out of order.
+            query = sql.SQL("SELECT * FROM ({}) AS relaxed ORDER BY distance").format(query)
+        return query
+
+    def _estimate_filtered_rows(self,
+                                collection: str,
+                                sources: List[str],
+                                pool: Optional[PgPoolConnector] = None,
+                                ) -> int:
+        """
+        Planner estimate of the number of rows of the given sources (no scan of the table).
+        """
+        with (pool or self.pg_pool).cursor() as cur:
+            cur.execute(
+                sql.SQL("EXPLAIN (FORMAT JSON) SELECT 1 FROM {} WHERE source = ANY(%s)").format(
+                    sql.Identifier(collection.lower())
+                ),
+                (sources,)
+            )
+            plan = cur.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    def _filter_strategy(self,
+                         meta: CollectionMeta,
+                         sources: Optional[List[str]],
+                         pool: Optional[PgPoolConnector] = None, # Pool the search runs on
+                         ) -> str:
+        """
+        Chooses how a source-filtered search runs, from the selectivity of the filter.
+
+        - "ann": no filter.
+        - "partial": every source has its own partial ANN index (hot sources).
+        - "exact": the filter matches few rows (or there is no ANN index yet), they are
+          read through the source index and ordered by exact distance.
+        - "iterative": pgvector >= 0.8 iterative index scan, the index keeps being
+          scanned until enough rows pass the filter.
+        - "ann" otherwise (older pgvector): filtered ANN, completed by an exact search
+          when it returns fewer than k rows.
+        """
+        if not sources:
+            return "ann"
+        if not meta.index_ready:
+            return "exact"
+
+        partial_indexes = meta.options.get("partial_indexes") or {}
+        if len(sources) <= MAX_PARTIAL_UNION and all(source in partial_indexes for source in sources):
+            return "partial"
+
+        exact_scan_max_rows = int(meta.options.get("exact_scan_max_rows") or EXACT_SCAN_MAX_ROWS)
+        try:
+            if self._estimate_filtered_rows(meta.name, sources, pool) <= exact_scan_max_rows:
+                return "exact"
+        except Exception as e:
+            logger.warning(f"Could not estimate the selectivity of the source filter on '{meta.name}': {e}")
+
+        if meta.list_partitioned and meta.partition_by == "source":
+            # Pruned to the partitions of the sources: every row of their indexes passes the filter.
+            return "ann"
+        if self.vector_version() >= (0, 8, 0):
+            return "iterative"
+        return "ann"
+
+    @staticmethod
+    def _needs_exact_fallback(strategy: str,
+                              filtered: bool,
+                              threshold: Optional[float],
+                              results: List[Dict[str, Any]],
+                              k: int,
+                              ) -> bool:
+        """
+        True if a filtered ANN search returned fewer than k rows.
+
+        Without a threshold, fewer than k rows means the index scan stopped before
+        enough rows passed the filter (ef_search / probes exhausted), unless the
+        filter really matches fewer than k rows: the exact search tells them apart.
+        """
+        return filtered and threshold is None and strategy != "exact" and len(results) < k
+
+    def _exact_fallback_sql(self,
+                            meta: CollectionMeta,
+                            qvec: sql.Composable,
+                            with_sources: bool,
+                            extra_filters: List[sql.Composable],
+                            ) -> sql.Composed:
+        return self._knn_sql(meta, qvec, with_sources=with_sources, strategy="exact", extra_filters=extra_filters)
+
+    @staticmethod
+    def _tenant_filters(meta: CollectionMeta, tenant: Optional[str]) -> List[sql.Composable]:
+        """
+        Filter on the tenant of a tenant partitioned collection (prunes the other tenants' partitions).
+        """
+        if tenant is None:
+            return []
+        if meta.partition_by != "tenant":
+            raise ValueError(f"Collection '{meta.name}' is not partitioned by tenant")
+        return [sql.SQL("tenant = %(tenant)s")]
+
+    def _candidate_limit(self, meta: CollectionMeta, k: int) -> int:
+        """
+        Number of ANN candidates rescored with the full vectors (two-stage modes only).
+        """
+        if not meta.two_stage:
+            return k
+        factor = int(meta.options.get("candidate_factor", 10))
+        return max(k * factor, 40)
+
+    def _set_search_params(self,
+                           cur,
+                           meta: CollectionMeta,
+                           ef_search: Optional[int],
+                           candidates: int,
+                           k: Optional[int] = None,
+                           probes: Optional[int] = None,
+                           strategy: str = "ann",
+                           ):
+        """
+        Sets the index search parameters for the current transaction.
+
+        ef_search / probes left to None come from the tuning of the collection for k,
+        or from the defaults (DEFAULT_EF_SEARCH, probes derived from the recall target).
+        The "iterative" filter strategy also enables the pgvector >= 0.8 iterative scans.
+        """
+        k = k or candidates
+
+        if meta.index_type == "hnsw":
+            if ef_search is None:
+                ef_search = self._tuned_value(meta, "ef_search", k) or DEFAULT_EF_SEARCH
+            # HNSW returns at most ef_search rows, it must cover the candidates to rescore.
+            ef = min(max(int(ef_search), candidates), 1000)
+            cur.execute(sql.SQL("SET LOCAL hnsw.ef_search = {}").format(sql.Literal(ef)))
+
+        if meta.index_type == "ivfflat" and meta.index_ready:
+            if probes is None:
+                probes = self._tuned_value(meta, "probes", k) or meta.probes()
+            if probes is not None:
+                cur.execute(sql.SQL("SET LOCAL ivfflat.probes = {}").format(sql.Literal(int(probes))))
+
+        if strategy == "iterative":
+            cur.execute(sql.SQL("SET LOCAL {} = relaxed_order").format(
+                sql.SQL("hnsw.iterative_scan" if meta.index_type == "hnsw" else "ivfflat.iterative_scan")
+            ))
+            if meta.options.get("max_scan_tuples") and meta.index_type == "hnsw":
+                cur.execute(sql.SQL("SET LOCAL hnsw.max_scan_tuples = {}").format(
+                    sql.Literal(int(meta.options["max_scan_tuples"]))
+                ))
+
+    @staticmethod
+    def _fetch_records(cur) -> List[Dict[str, Any]]:
+        rows = cur.fetchall()
+        colnames = [desc.name for desc in cur.description]
+
+        results: List[Dict[str, Any]] = []
+        for row in rows:
+            rec = dict(zip(colnames, row))
+            if rec.get("distance") is not None:
+                rec["distance"] = float(rec["distance"])
+            results.append(rec)
+        return results
+
     def read_embeddings(self, 
                         table: str, # Name of the collection (table).
                         prompt: str, # Prompt to be embedded.
                         k: int = 16, # Number of nearest chunks to return
-                        ef_search: Optional[int] = 150, # HNSW : Number of candidates considered during search (improves accuracy)
+                        ef_search: Optional[int] = None, # HNSW : Number of candidates considered during search (improves accuracy), None for the tuned value
                         sources: Optional[List[str]] = None,
-                        threshold: Optional[float] = None # Maximum distance threshold (filters out results with distance > threshold)
+                        threshold: Optional[float] = None, # Maximum cosine distance (filters out results with distance > threshold)
+                        query_vector: Optional[List[float]] = None, # Precomputed embedding of the prompt (skips the embedding call)
+                        probes: Optional[int] = None, # IVFFlat : Number of lists searched, None for the tuned value
+                        tenant: Optional[str] = None, # Tenant of a tenant partitioned collection
+                        min_lsn: Optional[str] = None, # Read-your-writes: WAL position the replica must have replayed
                         ):
         """
         Retrieves the k nearest embeddings to the given prompt from the specified table.
+
+        The operator and the rescoring step are picked from the collection storage mode,
+        the returned distance is always the cosine distance to the full query vector.
         
         Args:
             table (str): Name of the collection (table).
             prompt (str): Prompt to be embedded.
-            embed_func: Embedding function to use.
             k (int): Number of nearest chunks to return.
-            ef_search (Optional[int]): HNSW ef_search parameter.
+            ef_search (Optional[int]): HNSW ef_search parameter, defaults to the value tuned for the collection and k.
             sources (Optional[List[str]]): Optional list of sources to filter by.
-            threshold (Optional[float]): Maximum distance threshold. Results with distance > threshold are excluded.
+            threshold (Optional[float]): Maximum cosine distance. Results with distance > threshold are excluded.
+            query_vector (Optional[List[float]]): Embedding of the prompt if it was already computed.
+            probes (Optional[int]): IVFFlat probes, defaults to the tuned value or the recall target of the collection.
+            tenant (Optional[str]): Only searches the rows of this tenant (collections partitioned by tenant).
+            min_lsn (Optional[str]): Runs on a replica that has replayed this WAL position (or the primary).
         
         Returns:
             List[Dict[str, Any]]: List of dictionaries containing the retrieved rows with their distances.
         """
 
-        table_identifier = sql.Identifier(table.lower())
+        meta = self.get_collection_meta(table)
 
-        qvec = Vector(self.pg_utils.embed([prompt])[0])
-        select_sql = sql.SQL("id, text, source, page, skillsets, title, author, url, creation_date, embedding <-> %s AS distance")
+        if query_vector is None:
+            query_vector = self.pg_utils.embed([prompt])[0]
 
-        # Build query with optional WHERE clause for sources and threshold
-        where_clauses = []
-        if sources is not None and len(sources) > 0:
-            where_clauses.append(sql.SQL("source = ANY(%s)"))
-        if threshold is not None:
-            where_clauses.append(sql.SQL("embedding <-> %s <= %s")) # First %s is query vector, second is threshold
-        
-        if where_clauses:
-            where_sql = sql.SQL(" AND ").join(where_clauses)
-            query = sql.SQL("""
-                SELECT {cols}
-                FROM {table}
-                WHERE {where}
-                ORDER BY embedding <-> %s 
-                LIMIT %s
-            """).format(cols=select_sql, table=table_identifier, where=where_sql)
-            
-            query_params = [qvec] # User query and other parameters
-            if sources is not None and len(sources) > 0:
-                query_params.append(sources)
-            if threshold is not None:
-                query_params.extend([qvec, threshold])
-            query_params.extend([qvec, k])
-            query_params = tuple(query_params)
-        else: # Nearest neighbor search without filtering (no WHERE clause)
-            query = sql.SQL("""
-                SELECT {cols}
-                FROM {table}
-                ORDER BY embedding <-> %s 
-                LIMIT %s
-            """).format(cols=select_sql, table=table_identifier)
-            query_params = (qvec, qvec, k)
+        sources = list(sources) if sources else None
+        tenant_filters = self._tenant_filters(meta, tenant)
 
-        results: List[Dict[str, Any]] = []
+        def search(pool: PgPoolConnector) -> List[Dict[str, Any]]:
+            strategy = self._filter_strategy(meta, sources, pool)
 
-        with self.pg_pool.cursor() as cur:
-            if ef_search is not None:
-                cur.execute(sql.SQL("SET hnsw.ef_search = {}").format(sql.Literal(int(ef_search))))
-            
-            cur.execute(query, query_params)
-            rows = cur.fetchall()
-            colnames = [desc.name for desc in cur.description]
-            for row in rows:
-                rec = dict(zip(colnames, row))
-                if rec.get("distance") is not None:
-                    rec["distance"] = float(rec["distance"])
-                results.append(rec)
-        
-        return results 
+            query = self._knn_sql(
+                meta,
+                sql.SQL("%(qvec)s::vector"),
+                with_sources=sources is not None,
+                with_threshold=threshold is not None,
+                qvec_short=sql.SQL("%(qvec_short)s::vector"),
+                strategy=strategy,
+                partial_sources=sources,
+                extra_filters=tenant_filters,
+            )
+            candidates = self._candidate_limit(meta, k)
+            params = {
+                "qvec": Vector(query_vector),
+                "qvec_short": Vector(truncate_embedding(query_vector, meta.short_dim)) if meta.short_dim else None,
+                "sources": sources,
+                "tenant": tenant,
+                "threshold": threshold,
+                "k": k,
+                "candidates": candidates,
+            }
+            filtered = sources is not None or tenant is not None
+
+            with pool.transaction() as cur:
+                self._set_search_params(cur, meta, ef_search, candidates, k=k, probes=probes, strategy=strategy)
+                cur.execute(query, params)
+                results = self._fetch_records(cur)
+
+                if self._needs_exact_fallback(strategy, filtered, threshold, results, k):
+                    # The filtered ANN search ran out of candidates: the exact search returns all k.
+                    cur.execute(
+                        self._exact_fallback_sql(meta, sql.SQL("%(qvec)s::vector"), sources is not None, tenant_filters),
+                        params
+                    )
+                    results = self._fetch_records(cur)
+            return results
+
+        with span("pgvector.read_embeddings", collection=meta.name, k=k, filtered=bool(sources or tenant)) as attrs:
+            with timed(VECTOR_QUERY_SECONDS, collection=meta.name, kind="ann"):
+                results = self._read(search, min_lsn=min_lsn)
+            attrs["rows"] = len(results)
+            return results
     
+    def read_embeddings_batch(self,
+                              table: str, # Name of the collection (table).
+                              prompts: List[str], # Prompts to be embedded.
+                              k: int = 16, # Number of nearest chunks to return per prompt
+                              ef_search: Optional[int] = None,
+                              sources: Optional[List[str]] = None,
+                              threshold: Optional[float] = None,
+                              query_vectors: Optional[List[List[float]]] = None, # Precomputed embeddings of the prompts
+                              query_batch_size: int = 128, # Number of queries searched per SQL statement
+                              tenant: Optional[str] = None,
+                              min_lsn: Optional[str] = None,
+                              ) -> List[List[Dict[str, Any]]]:
+        """
+        Retrieves the k nearest embeddings for many prompts at once.
+
+        All prompts are embedded with batched calls, then the ANN searches run as a
+        LATERAL join over the unnested query vectors, so each SQL statement serves
+        query_batch_size queries on a single pooled connection.
+
+        Args:
+            table (str): Name of the collection (table).
+            prompts (List[str]): Prompts to search for.
+            k (int): Number of nearest chunks to return per prompt.
+            ef_search (Optional[int]): HNSW ef_search parameter.
+            sources (Optional[List[str]]): Optional list of sources to filter by.
+            threshold (Optional[float]): Maximum cosine distance.
+            query_vectors (Optional[List[List[float]]]): Embeddings of the prompts if already computed.
+            query_batch_size (int): Number of queries per SQL round trip.
+            tenant (Optional[str]): Only searches the rows of this tenant (collections partitioned by tenant).
+            min_lsn (Optional[str]): Runs on a replica that has replayed this WAL position (or the primary).
+
+        Returns:
+            List[List[Dict[str, Any]]]: One result list per prompt, in the same order as prompts.
+        """
+        if not prompts:
+            return []
+
+        if query_vectors is None:
+            query_vectors = self.pg_utils.embed_batched(prompts)
+
+        if len(query_vectors) != len(prompts):
+            raise ValueError("query_vectors must contain one embedding per prompt.")
+
+        meta = self.get_collection_meta(table)
+
+        sources = list(sources) if sources else None
+        tenant_filters = self._tenant_filters(meta, tenant)
+
+        def search(pool: PgPoolConnector) -> List[List[Dict[str, Any]]]:
+            strategy = self._filter_strategy(meta, sources, pool)
+
+            knn = self._knn_sql(
+                meta,
+                sql.SQL("q.qvec"),
+                with_sources=sources is not None,
+                with_threshold=threshold is not None,
+                qvec_short=sql.SQL("q.qvec_short"),
+                strategy=strategy,
+                partial_sources=sources,
+                extra_filters=tenant_filters,
+            )
+            candidates = self._candidate_limit(meta, k)
+
+            # Vectors are sent as text and cast server side, the CTE is materialized so each
+            # one is parsed once and the lateral subquery gets a plain vector to order by.
+            query = sql.SQL("""
+                WITH q AS MATERIALIZED (
+                    SELECT (t.ord - 1)::int AS qidx, t.v::vector AS qvec, t.vs::vector AS qvec_short
+                    FROM unnest(%(qvecs)s::text[], %(qvecs_short)s::text[]) WITH ORDINALITY AS t(v, vs, ord)
+                )
+                SELECT q.qidx, r.*
+                FROM q
+                CROSS JOIN LATERAL ({knn}) r
+                ORDER BY q.qidx, r.distance
+            """).format(knn=knn)
+
+            results: List[List[Dict[str, Any]]] = [[] for _ in prompts]
+
+            with pool.transaction() as cur:
+                self._set_search_params(cur, meta, ef_search, candidates, k=k, strategy=strategy)
+
+                for start in range(0, len(query_vectors), query_batch_size):
+                    batch = query_vectors[start:start + query_batch_size]
+                    params = {
+                        "qvecs": [self._vector_literal(v) for v in batch],
+                        "qvecs_short": [
+                            self._vector_literal(truncate_embedding(v, meta.short_dim)) if meta.short_dim else None
+                            for v in batch
+                        ],
+                        "sources": sources,
+                        "tenant": tenant,
+                        "threshold": threshold,
+                        "k": k,
+                        "candidates": candidates,
+                    }
+                    cur.execute(query, params)
+
+                    for rec in self._fetch_records(cur):
+                        qidx = start + rec.pop("qidx")
+                        results[qidx].append(rec)
+
+                fallback = None
+                filtered = sources is not None or tenant is not None
+                for qidx, rows in enumerate(results):
+                    if self._needs_exact_fallback(strategy, filtered, threshold, rows, k):
+                        fallback = fallback or self._exact_fallback_sql(
+                            meta, sql.SQL("%(qvec)s::vector"), sources is not None, tenant_filters
+                        )
+                        cur.execute(fallback, {"qvec": Vector(query_vectors[qidx]), "sources": sources, "tenant": tenant, "k": k})
+                        results[qidx] = self._fetch_records(cur)
+            return results
+
+        with timed(VECTOR_QUERY_SECONDS, collection=meta.name, kind="ann_batch"):
+            return self._read(search, min_lsn=min_lsn)
+
+    @staticmethod
+    def _vector_literal(vector: List[float]) -> str:
+        """
+        Formats an embedding as a pgvector text literal ('[x1,x2,...]').
+        """
+        return "[" + ",".join(repr(float(x)) for x in vector) + "]"
+
     def read_hybrid(self,
                     table: str,
                     prompt: str,
-                    embed_func,
+                    embed_func=None,
                     k: int = 16,
-                    ef_search: Optional[int] = 150,
+                    ef_search: Optional[int] = None,
                     rrf_k: int = 60,
-                    top_k: Optional[int] = None
+                    top_k: Optional[int] = None,
+                    query_vector: Optional[List[float]] = None,
+                    min_lsn: Optional[str] = None,
                     ) -> List[Dict[str, Any]]:
         """
         Performs hybrid search combining vector similarity and full-text search using 
@@ -481,19 +1989,35 @@ class PgVectorStore:
         Args:
             table (str): Name of the collection (table).
             prompt (str): Search query text.
-            embed_func: Function to embed the prompt into a vector.
+            embed_func: Unused, kept for backward compatibility.
             k (int): Number of results to retrieve from each method.
             ef_search (Optional[int]): HNSW ef_search parameter.
             rrf_k (int): RRF constant (typically 60). Higher values give more weight to lower ranks.
             top_k (Optional[int]): Number of final results to return after RRF. If None, returns k results.
+            query_vector (Optional[List[float]]): Embedding of the prompt if it was already computed.
+            min_lsn (Optional[str]): Both searches run on replicas that have replayed this WAL position (or the primary).
             
         Returns:
             List[Dict[str, Any]]: List of deduplicated and re-ranked results with RRF scores.
         """
         # Get results from both methods
-        vector_results = self.read_embeddings(table, prompt, embed_func, k, ef_search) 
-        fts_results = self.read_fts(table, prompt, k)
+        vector_results = self.read_embeddings(table, prompt, k=k, ef_search=ef_search, query_vector=query_vector, min_lsn=min_lsn)
+        fts_results = self.read_fts(table, prompt, k, min_lsn=min_lsn)
         
+        # Use top_k if specified, otherwise use k
+        final_k = top_k if top_k is not None else k
+
+        return self.rrf_merge(vector_results, fts_results, rrf_k=rrf_k, top_k=final_k)
+
+    @staticmethod
+    def rrf_merge(vector_results: List[Dict[str, Any]],
+                  fts_results: List[Dict[str, Any]],
+                  rrf_k: int = 60,
+                  top_k: int = 16,
+                  ) -> List[Dict[str, Any]]:
+        """
+        Merges vector and full-text results with Reciprocal Rank Fusion.
+        """
         # RRF scoring: score = sum(1 / (rank + k)) for each retrieval method
         rrf_scores: Dict[int, float] = {}
         doc_data: Dict[int, Dict[str, Any]] = {}
@@ -521,11 +2045,8 @@ class PgVectorStore:
         # Sort by RRF score and add to results
         sorted_doc_ids = sorted(rrf_scores.keys(), key=lambda x: rrf_scores[x], reverse=True)
         
-        # Use top_k if specified, otherwise use k
-        final_k = top_k if top_k is not None else k
-        
         results = []
-        for doc_id in sorted_doc_ids[:final_k]:
+        for doc_id in sorted_doc_ids[:top_k]:
             doc = doc_data[doc_id]
             doc["rrf_score"] = rrf_scores[doc_id]
             results.append(doc)
@@ -535,7 +2056,8 @@ class PgVectorStore:
     def read_fts(self, 
                  table: str, # Name of the collection (table).
                  prompt: str, # Prompt to be embedded.
-                 k: int = 16 # Number of nearest chunks to return
+                 k: int = 16, # Number of nearest chunks to return
+                 min_lsn: Optional[str] = None, # Read-your-writes: WAL position the replica must have replayed
                 ) -> List[Dict[str, Any]]:
         """
         Implementation of Full-Text Search.
@@ -559,19 +2081,23 @@ class PgVectorStore:
             LIMIT %(k)s;
         """).format(table=sql.Identifier(table.lower()))
 
-        results: List[Dict[str, Any]] = []
+        def search(pool: PgPoolConnector) -> List[Dict[str, Any]]:
+            results: List[Dict[str, Any]] = []
 
-        with self.pg_pool.cursor() as cur:
-            cur.execute(query, {"q": prompt, "k": k})
-            rows = cur.fetchall()
-            colnames = [desc.name for desc in cur.description]
-            for row in rows:
-                rec = dict(zip(colnames, row))
-                if rec.get("fts_rank") is not None:
-                    rec["fts_rank"] = float(rec["fts_rank"])
-                results.append(rec)
+            with pool.cursor() as cur:
+                cur.execute(query, {"q": prompt, "k": k})
+                rows = cur.fetchall()
+                colnames = [desc.name for desc in cur.description]
+                for row in rows:
+                    rec = dict(zip(colnames, row))
+                    if rec.get("fts_rank") is not None:
+                        rec["fts_rank"] = float(rec["fts_rank"])
+                    results.append(rec)
 
-        return results
+            return results
+
+        with timed(VECTOR_QUERY_SECONDS, collection=table.lower(), kind="fts"):
+            return self._read(search, min_lsn=min_lsn)
 
 if __name__ == "__main__":
     load_dotenv()
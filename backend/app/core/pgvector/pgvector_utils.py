@@ -1,4 +1,5 @@
 from typing import Any, Callable, List, Optional, Tuple, Dict
+import math
 import time
 import logging
 
@@ -6,35 +7,86 @@ import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
+from app.config.embedding_settings import embedding_settings
+from app.core.tracing import inject_headers, span
+
 logger = logging.getLogger(__name__)
 
+
+def truncate_embedding(vector: List[float], dim: int) -> List[float]:
+    """
+    Keeps the first dim values of an embedding and re-normalizes them to unit length.
+
+    Qwen3-Embedding is trained Matryoshka-style, so the prefix of its vectors is
+    itself a usable (lower resolution) embedding.
+    """
+    prefix = [float(x) for x in vector[:dim]]
+    norm = math.sqrt(sum(x * x for x in prefix))
+    if norm == 0.0:
+        return prefix
+    return [x / norm for x in prefix]
+
+
+def default_embed_endpoint() -> str:
+    """
+    Embedding service if one is deployed, otherwise the embed route of the API.
+    """
+    if embedding_settings.EMBEDDING_SERVICE_URL:
+        return embedding_settings.EMBEDDING_SERVICE_URL.rstrip("/") + "/embed"
+    return "http://api:8000/api/v1/ingest/embed"
+
+
+def _embed_session() -> requests.Session:
+    """
+    HTTP session retrying the answers of a busy embedding service: 503 when its bulk
+    backlog is full and 429, after the Retry-After they carry (exponential backoff without one).
+    """
+    retry = Retry(
+        total=embedding_settings.EMBED_CLIENT_MAX_RETRIES,
+        status_forcelist=(429, 503),
+        allowed_methods=frozenset({"POST"}), # Embedding the same texts twice is harmless
+        backoff_factor=1.0,
+        respect_retry_after_header=True,
+        raise_on_status=False, # The last answer goes through raise_for_status()
+    )
+    session = requests.Session()
+    adapter = HTTPAdapter(max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
 class PgVectorUtils:
-    def __init__(self, embed_endpoint="http://api:8000/api/v1/ingest/embed"):
-        self.embed_endpoint = embed_endpoint
-        
+    def __init__(self, embed_endpoint: Optional[str] = None):
+        self.embed_endpoint = embed_endpoint or default_embed_endpoint()
+        self.session = _embed_session()
 
-    def embed(self, texts: List[str]) -> List[List[float]]:
+    def embed(self, texts: List[str], priority: str = "interactive") -> List[List[float]]:
         """
         Computes embeddings for a list of texts via the embedding API.
         
         Args:
             texts: List of texts to embed
+            priority: "interactive" for queries, "bulk" for ingestion (served after the queries)
             
         Returns:
             List of embedding vectors
             
         Raises:
-            RuntimeError: If the embedding service is not accessible
+            RuntimeError: If the embedding service is not accessible (or still busy after the retries)
         """
         if not texts:
             return []
 
         try:
-            response = requests.post(
-                self.embed_endpoint,
-                json={"texts": texts},
-                timeout=120
-            )
+            with span("embed.request", texts=len(texts), priority=priority, endpoint=self.embed_endpoint):
+                # The embedding service continues the trace of the caller.
+                response = self.session.post(
+                    self.embed_endpoint,
+                    json={"texts": texts, "priority": priority},
+                    headers=inject_headers(),
+                    timeout=120
+                )
             response.raise_for_status()
             data = response.json()
 
@@ -45,6 +97,22 @@ class PgVectorUtils:
 
         except requests.exceptions.RequestException as e:
             raise RuntimeError(f"Error while calling the embedding service: {e}")
+
+    def embed_batched(self, texts: List[str], batch_size: int = 256, priority: str = "interactive") -> List[List[float]]:
+        """
+        Computes embeddings for many texts with one embedding call per batch_size texts.
+
+        Args:
+            texts: List of texts to embed
+            batch_size: Number of texts sent per call to the embedding API
+
+        Returns:
+            List of embedding vectors, in the same order as texts
+        """
+        embeddings: List[List[float]] = []
+        for i in range(0, len(texts), batch_size):
+            embeddings.extend(self.embed(texts[i:i + batch_size], priority=priority))
+        return embeddings
     
     def prepare_chunks(
             self,
@@ -73,7 +141,11 @@ class PgVectorUtils:
             metadatas.append(meta)
         print(f"Computing embeddings for {len(texts)} texts")
 
-        embeddings: List[List[float]] = self.embed(texts) if texts else []
+        embeddings: List[List[float]] = self.embed_batched(
+            texts,
+            batch_size=embedding_settings.EMBED_CLIENT_BATCH_SIZE,
+            priority="bulk",
+        )
 
         if embeddings:
             print(f"Got embeddings: {len(embeddings)} vectors of size {len(embeddings[0])}")
@@ -0,0 +1,248 @@
+import argparse
+import json
+import logging
+import statistics
+import time
+
+from psycopg import sql
+from pgvector.psycopg import Vector
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.core.pgvector.pgvector import PgVectorStore
+
+logger = logging.getLogger(__name__)
+
+
+def sample_query_vectors(
+    store: PgVectorStore,
+    table: str,
+    sample_size: int = 100,
+) -> List[Tuple[int, List[float]]]:
+    """
+    Picks stored vectors at random to use them as queries.
+
+    Returns:
+        List of (id, vector) tuples
+    """
+    with store.pg_pool.cursor() as cur:
+        cur.execute(
+            sql.SQL("""
+                SELECT id, embedding::vector
+                FROM {tbl}
+                ORDER BY random()
+                LIMIT %s;
+            """).format(tbl=sql.Identifier(table.lower())),
+            (sample_size,)
+        )
+        return [(row[0], [float(x) for x in row[1]]) for row in cur.fetchall()]
+
+
+def exact_neighbors(
+    store: PgVectorStore,
+    table: str,
+    query_vector: List[float],
+    k: int,
+    sources: Optional[List[str]] = None,
+    exclude_id: Optional[int] = None,
+) -> List[int]:
+    """
+    Brute-force k nearest neighbours (cosine distance on the full vectors), used as ground truth.
+
+    exclude_id leaves out the row the query vector was sampled from (held-out query).
+    """
+    filters = []
+    if sources:
+        filters.append(sql.SQL("source = ANY(%(sources)s)"))
+    if exclude_id is not None:
+        filters.append(sql.SQL("id <> %(exclude_id)s"))
+    where_sql = sql.SQL("WHERE ") + sql.SQL(" AND ").join(filters) if filters else sql.SQL("")
+    query = sql.SQL("""
+        SELECT id
+        FROM {tbl}
+        {where}
+        ORDER BY embedding::vector <=> %(qvec)s::vector
+        LIMIT %(k)s;
+    """).format(tbl=sql.Identifier(table.lower()), where=where_sql)
+
+    with store.pg_pool.transaction() as cur:
+        # Never let the planner answer with the ANN index.
+        cur.execute("SET LOCAL enable_indexscan = off;")
+        cur.execute(query, {"qvec": Vector(query_vector), "sources": sources, "exclude_id": exclude_id, "k": k})
+        return [row[0] for row in cur.fetchall()]
+
+
+def recall_at_k(approx_ids: Sequence[int], exact_ids: Sequence[int]) -> float:
+    if not exact_ids:
+        return 1.0
+    return len(set(approx_ids) & set(exact_ids)) / len(exact_ids)
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def measure_recall(
+    store: PgVectorStore,
+    table: str,
+    queries: List[List[float]],
+    ground_truth: List[List[int]],
+    k: int,
+    query_ids: Optional[List[int]] = None,
+    **read_kwargs: Any,
+) -> Dict[str, float]:
+    """
+    Runs read_embeddings for every query and compares the results with the ground truth.
+
+    With query_ids (held-out queries sampled from the table), k + 1 rows are read
+    and the query row itself is left out of the results.
+
+    Returns:
+        Mean recall@k and latency percentiles (ms)
+    """
+    recalls, latencies = [], []
+
+    for i, (qvec, truth) in enumerate(zip(queries, ground_truth)):
+        query_id = query_ids[i] if query_ids is not None else None
+        fetch_k = k + 1 if query_id is not None else k
+
+        start = time.perf_counter()
+        rows = store.read_embeddings(table=table, prompt="", k=fetch_k, query_vector=qvec, **read_kwargs)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        ids = [r["id"] for r in rows if r["id"] != query_id][:k]
+        recalls.append(recall_at_k(ids, truth))
+
+    return {
+        "recall": statistics.mean(recalls) if recalls else 0.0,
+        "p50_ms": _percentile(latencies, 50),
+        "p95_ms": _percentile(latencies, 95),
+        "mean_ms": statistics.mean(latencies) if latencies else 0.0,
+    }
+
+
+def storage_mode_report(
+    store: PgVectorStore,
+    table: str,
+    modes: Sequence[str] = ("vector", "halfvec", "bit"),
+    k: int = 10,
+    sample_size: int = 100,
+    ef_search: int = 150,
+    short_dim: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Compares recall@k and latency of the storage modes on a copy of a collection.
+
+    Each mode gets a scratch copy of the collection ("<table>__<mode>_report", same
+    ids, same index parameters), measured against the exact neighbours computed on
+    the original table, then dropped. With short_dim, the copies index the short
+    prefix vectors instead (the copy needs pgvector >= 0.7 to truncate them in SQL).
+
+    Returns:
+        One report entry per mode
+    """
+    meta = store.get_collection_meta(table)
+    samples = sample_query_vectors(store, table, sample_size)
+    queries = [vec for _, vec in samples]
+    ground_truth = [exact_neighbors(store, table, vec, k) for vec in queries]
+
+    report = []
+    for mode in modes:
+        scratch = f"{meta.name}__{mode}_report"
+        if store.table_exists(scratch):
+            store.drop_table(scratch)
+
+        try:
+            if short_dim and store.vector_version() < (0, 7, 0):
+                raise ValueError("short_dim copies require pgvector >= 0.7.0")
+            store.create_vector_collection(
+                scratch,
+                index_type=None,
+                dim=meta.dim,
+                storage=mode,
+                short_dim=short_dim,
+            )
+        except ValueError as e:
+            logger.warning(f"Skipping storage mode '{mode}': {e}")
+            report.append({"storage": mode, "error": str(e)})
+            continue
+
+        try:
+            scratch_meta = store.get_collection_meta(scratch)
+            short_cols, short_select = sql.SQL(""), sql.SQL("")
+            if short_dim:
+                short_cols = sql.SQL("embedding_short, ")
+                short_select = sql.SQL("l2_normalize(subvector(embedding::vector, 1, {})), ").format(sql.Literal(int(short_dim)))
+
+            with store.pg_pool.cursor() as cur:
+                cur.execute(
+                    sql.SQL("""
+                        INSERT INTO {dst} (id, embedding, {short_cols}text, source, page, title, author, url)
+                        SELECT id, embedding::vector, {short_select}text, source, page, title, author, url
+                        FROM {src};
+                    """).format(
+                        dst=sql.Identifier(scratch),
+                        src=sql.Identifier(meta.name),
+                        short_cols=short_cols,
+                        short_select=short_select,
+                    )
+                )
+
+            # Build the index once the data is loaded, with the same parameters as the original.
+            scratch_meta.index_type = meta.index_type or "hnsw"
+            scratch_meta.index_params = dict(meta.index_params)
+            build_start = time.perf_counter()
+            with store.pg_pool.cursor() as cur:
+                cur.execute(store._index_sql(scratch_meta, index_name=f"{scratch}_vec_idx"))
+                cur.execute("SELECT pg_relation_size(%s::regclass);", (f"{scratch}_vec_idx",))
+                index_bytes = cur.fetchone()[0]
+            build_s = time.perf_counter() - build_start
+            store._save_collection_meta(scratch_meta)
+
+            stats = measure_recall(store, scratch, queries, ground_truth, k, ef_search=ef_search)
+            report.append({
+                "storage": mode,
+                "short_dim": short_dim,
+                "k": k,
+                "queries": len(queries),
+                "index_mb": round(index_bytes / (1024 * 1024), 2),
+                "index_build_s": round(build_s, 2),
+                **{key: round(value, 4) for key, value in stats.items()},
+            })
+        finally:
+            store.drop_table(scratch)
+
+    return report
+
+
+if __name__ == "__main__":
+    from app.config.config import PGVECTOR_DSN
+
+    parser = argparse.ArgumentParser(description="Recall vs latency report of the vector storage modes.")
+    parser.add_argument("collection")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--sample-size", type=int, default=100)
+    parser.add_argument("--ef-search", type=int, default=150)
+    parser.add_argument("--modes", nargs="+", default=["vector", "halfvec", "bit"])
+    parser.add_argument("--short-dim", type=int, default=None)
+    args = parser.parse_args()
+
+    pgvector_store = PgVectorStore(PGVECTOR_DSN)
+    try:
+        print(json.dumps(
+            storage_mode_report(
+                pgvector_store,
+                args.collection,
+                modes=args.modes,
+                k=args.k,
+                sample_size=args.sample_size,
+                ef_search=args.ef_search,
+                short_dim=args.short_dim,
+            ),
+            indent=2,
+        ))
+    finally:
+        pgvector_store.pg_pool.disconnect()
@@ -0,0 +1,163 @@
+import logging
+import random
+import time
+
+import psycopg
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.pgvector.pgpool_connector import PgPoolConnector
+
+logger = logging.getLogger(__name__)
+
+HEALTH_CHECK_INTERVAL_SECONDS = 5.0
+HEALTH_CHECK_TIMEOUT_SECONDS = 2
+LSN_POLL_INTERVAL_SECONDS = 0.02
+
+# Shared by every router of the process (stores are created per request / per job):
+# dsn -> (checked_at, healthy, replication lag in seconds)
+_HEALTH: Dict[str, Tuple[float, bool, Optional[float]]] = {}
+
+
+class ReplicaRouter:
+    """
+    Spreads read-only queries over the streaming replicas of the primary.
+
+    Replicas are health-checked at most every HEALTH_CHECK_INTERVAL_SECONDS (a
+    replica is healthy if it answers, is in recovery and lags less than
+    max_lag_seconds), reads go to a random healthy one and fall back to the
+    primary when there is none.
+
+    Read-your-writes: a writer records the WAL position of its write
+    (current_lsn()) and the reader passes it as min_lsn, only a replica that
+    has replayed it (waiting at most lsn_wait_ms) or the primary serve the read.
+    """
+
+    def __init__(self,
+                 primary: PgPoolConnector,
+                 replica_dsns: List[str],
+                 max_lag_seconds: float = 5.0, # Replicas lagging more are left out
+                 lsn_wait_ms: int = 500, # Maximum wait for a replica to replay min_lsn
+                 max_size: int = 10, # Connections per replica pool
+                 ):
+        self.primary = primary
+        self.replica_dsns = [dsn for dsn in replica_dsns if dsn]
+        self.max_lag_seconds = max_lag_seconds
+        self.lsn_wait_ms = lsn_wait_ms
+        # Connected on first use, a store often never reads from most replicas.
+        self._pools: Dict[str, PgPoolConnector] = {
+            dsn: PgPoolConnector(dsn, min_size=1, max_size=max_size) for dsn in self.replica_dsns
+        }
+
+    def _check(self, dsn: str) -> Tuple[bool, Optional[float]]:
+        """
+        Checks a replica on a short-lived connection (not taken from its pool, so an
+        unreachable replica costs one connect timeout per check interval).
+        """
+        try:
+            with psycopg.connect(dsn, connect_timeout=HEALTH_CHECK_TIMEOUT_SECONDS, autocommit=True) as conn:
+                row = conn.execute("""
+                    SELECT
+                        pg_is_in_recovery(),
+                        CASE
+                            WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                            ELSE extract(epoch FROM now() - pg_last_xact_replay_timestamp())
+                        END;
+                """).fetchone()
+        except psycopg.Error as e:
+            logger.warning(f"Replica {self._label(dsn)} is unreachable: {e}")
+            return False, None
+
+        in_recovery, lag = row
+        lag = float(lag) if lag is not None else 0.0
+        if not in_recovery:
+            # Promoted replica: it no longer follows the primary.
+            logger.warning(f"Replica {self._label(dsn)} is not in recovery, leaving it out")
+            return False, lag
+        if lag > self.max_lag_seconds:
+            logger.warning(f"Replica {self._label(dsn)} lags {lag:.1f}s behind the primary")
+            return False, lag
+        return True, lag
+
+    def _healthy(self, dsn: str) -> bool:
+        cached = _HEALTH.get(dsn)
+        if cached and time.monotonic() - cached[0] < HEALTH_CHECK_INTERVAL_SECONDS:
+            return cached[1]
+
+        healthy, lag = self._check(dsn)
+        _HEALTH[dsn] = (time.monotonic(), healthy, lag)
+        return healthy
+
+    def mark_unhealthy(self, pool: PgPoolConnector):
+        """
+        Leaves a replica out until its next health check (after a failed query).
+        """
+        _HEALTH[pool.dsn] = (time.monotonic(), False, None)
+
+    @staticmethod
+    def _label(dsn: str) -> str:
+        # Never log credentials.
+        return dsn.rsplit("@", 1)[-1]
+
+    def current_lsn(self) -> str:
+        """
+        Current WAL position of the primary, to pass as min_lsn to the reads that must see the writes done so far.
+        """
+        with self.primary.cursor() as cur:
+            cur.execute("SELECT pg_current_wal_lsn()::text;")
+            return cur.fetchone()[0]
+
+    def _replayed(self, pool: PgPoolConnector, min_lsn: str) -> bool:
+        with pool.cursor() as cur:
+            cur.execute("SELECT pg_last_wal_replay_lsn() >= %s::pg_lsn;", (min_lsn,))
+            return bool(cur.fetchone()[0])
+
+    def pick(self, min_lsn: Optional[str] = None) -> PgPoolConnector:
+        """
+        Pool to run a read on.
+
+        Args:
+            min_lsn: WAL position the read must see (read-your-writes), None for any healthy replica
+
+        Returns:
+            A healthy replica pool, or the primary pool
+        """
+        candidates = [dsn for dsn in self.replica_dsns if self._healthy(dsn)]
+        if not candidates:
+            return self.primary
+        random.shuffle(candidates)
+
+        if min_lsn is None:
+            return self._pools[candidates[0]]
+
+        deadline = time.monotonic() + self.lsn_wait_ms / 1000.0
+        while True:
+            for dsn in candidates:
+                pool = self._pools[dsn]
+                try:
+                    if self._replayed(pool, min_lsn):
+                        return pool
+                except psycopg.OperationalError:
+                    self.mark_unhealthy(pool)
+            if time.monotonic() >= deadline:
+                logger.info(f"No replica has replayed {min_lsn} after {self.lsn_wait_ms}ms, reading from the primary")
+                return self.primary
+            time.sleep(LSN_POLL_INTERVAL_SECONDS)
+
+    def status(self) -> List[Dict[str, Any]]:
+        """
+        Health of every replica (checks the stale ones).
+        """
+        status = []
+        for dsn in self.replica_dsns:
+            healthy = self._healthy(dsn)
+            status.append({
+                "replica": self._label(dsn),
+                "healthy": healthy,
+                "lag_seconds": _HEALTH[dsn][2],
+            })
+        return status
+
+    def disconnect(self):
+        for pool in self._pools.values():
+            pool.disconnect()
@@ -0,0 +1,371 @@
+import contextvars
+import hashlib
+import logging
+import time
+
+from psycopg import sql
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, TypeVar
+
+from app.core.pgvector.pgvector import PgVectorStore
+from app.core.pgvector.pgvector_utils import PgVectorUtils
+from app.core.pgvector.collection_meta import CollectionMeta
+from app.core.pgvector.tuning import tune_collection
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def shard_index(source: str, shards: int) -> int:
+    """
+    Shard of a source: sha1 based, so that every process places a source on the same node.
+    """
+    digest = hashlib.sha1((source or "unknown").encode("utf-8")).hexdigest()
+    return int(digest[:16], 16) % shards
+
+
+class ShardedPgVectorStore:
+    """
+    Collections spread over several Postgres nodes.
+
+    Each node holds a full collection table (same layout and ANN index) with the
+    chunks of the sources hashed to it. Writes go to the node of their source,
+    searches run concurrently on every node (or only on the nodes of the filtered
+    sources) and the per-node top-k are merged.
+
+    Ids stay unique across nodes: the id sequence of node i (out of N) yields
+    i + 1, i + 1 + N, i + 1 + 2N, ... The number of nodes of a collection is
+    therefore fixed at its creation.
+    """
+
+    def __init__(self,
+                 shard_dsns: List[str],
+                 schema: str = "public",
+                 allow_partial: bool = False, # Answers from the available shards if one fails (otherwise raises)
+                 ):
+        if not shard_dsns:
+            raise ValueError("At least one shard DSN is required")
+
+        self.shards = [PgVectorStore(dsn, schema=schema) for dsn in shard_dsns]
+        self.allow_partial = allow_partial
+
+        # Queries are embedded once here, not once per shard.
+        self.pg_utils = PgVectorUtils()
+        for shard in self.shards:
+            shard.pg_utils = self.pg_utils
+
+        self._executor = ThreadPoolExecutor(max_workers=len(self.shards), thread_name_prefix="pgshard")
+        # Latency of each shard during the last fan-out call: [{"shard", "ms", "rows", "error"}, ...]
+        self.last_shard_timings: List[Dict[str, Any]] = []
+
+    @property
+    def replicas(self):
+        # Same interface as PgVectorStore, shards have no read replicas.
+        return None
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        for shard in self.shards:
+            shard.close()
+
+    def shard_for(self, source: str) -> int:
+        return shard_index(source, len(self.shards))
+
+    def _fan_out(self,
+                 run: Callable[[PgVectorStore], T],
+                 shard_ids: Optional[List[int]] = None, # Shards to query, all of them by default
+                 partial: Optional[bool] = None, # Overrides allow_partial (False for DDL, every shard must apply it)
+                 ) -> List[T]:
+        """
+        Runs run(shard) concurrently on the shards and records the latency of each one.
+
+        Returns:
+            The results of the shards that answered, in shard order
+        """
+        shard_ids = list(range(len(self.shards))) if shard_ids is None else shard_ids
+        partial = self.allow_partial if partial is None else partial
+        # The shard threads see the context of the caller (current ingest stage recorder, ...).
+        context = contextvars.copy_context()
+
+        def timed(shard_id: int):
+            start = time.perf_counter()
+            try:
+                result = context.copy().run(run, self.shards[shard_id])
+                return shard_id, result, (time.perf_counter() - start) * 1000, None
+            except Exception as e:
+                return shard_id, None, (time.perf_counter() - start) * 1000, e
+
+        timings, results = [], []
+        for shard_id, result, ms, error in self._executor.map(timed, shard_ids):
+            timings.append({
+                "shard": shard_id,
+                "ms": round(ms, 2),
+                "rows": len(result) if isinstance(result, list) else None,
+                "error": str(error) if error else None,
+            })
+            if error is not None:
+                if not partial:
+                    self.last_shard_timings = timings
+                    raise error
+                logger.error(f"Shard {shard_id} failed, answering without it: {error}")
+                continue
+            results.append(result)
+
+        self.last_shard_timings = timings
+        return results
+
+    # Collections
+
+    def create_vector_collection(self, collection_name: str, **kwargs: Any) -> bool:
+        """
+        Creates the collection on every shard (see PgVectorStore.create_vector_collection for the options).
+
+        Returns:
+            bool: True if it was created on at least one shard
+        """
+        created = self._fan_out(lambda shard: shard.create_vector_collection(collection_name, **kwargs), partial=False)
+        for shard_id, shard in enumerate(self.shards):
+            self._interleave_ids(shard, collection_name, shard_id)
+        return any(created)
+
+    def _interleave_ids(self, shard: PgVectorStore, collection: str, shard_id: int):
+        with shard.pg_pool.cursor() as cur:
+            cur.execute("SELECT pg_get_serial_sequence(%s, 'id');", (f"{shard.schema}.{collection.lower()}",))
+            sequence = cur.fetchone()[0]
+            # pg_get_serial_sequence returns the quoted, schema qualified name.
+            cur.execute(sql.SQL("SELECT is_called FROM {};").format(sql.SQL(sequence)))
+            if cur.fetchone()[0]:
+                return # Already holds rows, the ids were interleaved when it was created.
+            cur.execute(
+                sql.SQL("ALTER SEQUENCE {} INCREMENT BY {} RESTART WITH {};").format(
+                    sql.SQL(sequence),
+                    sql.Literal(len(self.shards)),
+                    sql.Literal(shard_id + 1),
+                )
+            )
+
+    def table_exists(self, table_name: str, primary: bool = False, min_lsn: Optional[str] = None) -> bool:
+        # min_lsn is accepted for the PgVectorStore interface, the shards have no replicas to wait for.
+        return all(self._fan_out(lambda shard: shard.table_exists(table_name, primary=primary)))
+
+    def list_tables(self) -> List[str]:
+        tables = self._fan_out(lambda shard: shard.list_tables())
+        return sorted(set.intersection(*(set(t) for t in tables))) if tables else []
+
+    def drop_table(self, table_name: str) -> bool:
+        return any(self._fan_out(lambda shard: shard.drop_table(table_name)))
+
+    def get_collection_meta(self, collection: str) -> CollectionMeta:
+        return self.shards[0].get_collection_meta(collection)
+
+    def count_rows(self, collection: str) -> int:
+        return sum(self._fan_out(lambda shard: shard.count_rows(collection)))
+
+    def build_vector_index(self, collection: str, **kwargs: Any) -> Dict[str, Any]:
+        """
+        Builds the deferred ANN index on every shard, concurrently (see PgVectorStore.build_vector_index).
+        """
+        results = self._fan_out(lambda shard: shard.build_vector_index(collection, **kwargs), partial=False)
+        return {
+            **results[0],
+            "build_seconds": max(result["build_seconds"] for result in results),
+            "index_bytes": sum(result["index_bytes"] for result in results),
+            "shards": results,
+        }
+
+    def get_index_build_progress(self, collection: str) -> Optional[Dict[str, Any]]:
+        """
+        Progress of the least advanced shard still building an index, with the progress of each shard
+        under "shards". None if no shard is building one.
+        """
+        per_shard = self._fan_out(lambda shard: shard.get_index_build_progress(collection), partial=False)
+        building = [dict(progress, shard=shard_id) for shard_id, progress in enumerate(per_shard) if progress]
+        if not building:
+            return None
+        slowest = min(building, key=lambda progress: progress["percent"] or 0.0)
+        return {**slowest, "shards": building}
+
+    def reindex_collection(self, collection: str, **kwargs: Any) -> Dict[str, Any]:
+        """
+        Rebuilds the ANN index of every shard online (see PgVectorStore.reindex_collection).
+
+        Each shard checks the recall of its own new index and swaps, rejects or reverts it
+        on its own. The status is the one of the shards when they all agree, "mixed"
+        otherwise (the shards then hold different indexes, see "shards").
+        """
+        results = self._fan_out(lambda shard: shard.reindex_collection(collection, **kwargs), partial=False)
+        statuses = {result["status"] for result in results}
+        return {
+            "collection": collection.lower(),
+            "status": statuses.pop() if len(statuses) == 1 else "mixed",
+            "shards": results,
+        }
+
+    def tune_search(self, collection: str, **kwargs: Any) -> List[Dict[str, Any]]:
+        """
+        Tunes ef_search / probes of every shard on its own rows (see tuning.tune_collection),
+        each shard then searches with its own values.
+        """
+        per_shard = self._fan_out(lambda shard: tune_collection(shard, collection, **kwargs), partial=False)
+        return [dict(entry, shard=shard_id) for shard_id, entries in enumerate(per_shard) for entry in entries]
+
+    def get_search_tuning(self, collection: str) -> List[Dict[str, Any]]:
+        per_shard = self._fan_out(lambda shard: shard.get_search_tuning(collection), partial=False)
+        return [dict(entry, shard=shard_id) for shard_id, entries in enumerate(per_shard) for entry in entries]
+
+    def hot_sources(self, collection: str, min_rows: int = 50000, limit: int = 20) -> List[Dict[str, Any]]:
+        # A source lives on a single shard, its row count there is its total.
+        per_shard = self._fan_out(lambda shard: shard.hot_sources(collection, min_rows=min_rows, limit=limit))
+        rows = [entry for entries in per_shard for entry in entries]
+        return sorted(rows, key=lambda entry: entry["rows"], reverse=True)[:limit]
+
+    def create_source_index(self, collection: str, source: str, **kwargs: Any) -> Dict[str, Any]:
+        shard_id = self.shard_for(source)
+        return {**self.shards[shard_id].create_source_index(collection, source, **kwargs), "shard": shard_id}
+
+    def drop_source_index(self, collection: str, source: str) -> bool:
+        return self.shards[self.shard_for(source)].drop_source_index(collection, source)
+
+    def drop_partition(self, collection: str, key: str) -> int:
+        # Tenant partitions exist on every shard, source partitions on the shard of the source (0 rows elsewhere).
+        return sum(self._fan_out(lambda shard: shard.drop_partition(collection, key), partial=False))
+
+    def ivfflat_training_plan(self, collection: str, **kwargs: Any) -> Optional[Dict[str, Any]]:
+        # IVFFlat (re)training is planned for a single node, sharded collections build and reindex
+        # explicitly (POST /collections/{name}/index and /reindex run on every shard).
+        return None
+
+    def current_wal_lsn(self) -> Optional[str]:
+        # No replicas behind the shards, nothing to wait for.
+        return None
+
+    # Writes
+
+    def insert_chunks(self,
+                      collection: str,
+                      docs: List["Document"],
+                      batch_size: int = 10,
+                      tenant: Optional[str] = None,
+                      ) -> int:
+        """
+        Inserts chunks on the shard of their source, the shards are written concurrently.
+        """
+        if not docs:
+            return 0
+        # Created on every shard first, a shard creating it on its own would not interleave the ids.
+        if not self.table_exists(collection, primary=True):
+            if not self.create_vector_collection(collection, dim=1024, index_type="hnsw"):
+                raise RuntimeError(f"Unable to create the collection '{collection}'")
+
+        by_shard: Dict[int, List["Document"]] = {}
+        for doc in docs:
+            source = (doc.metadata or {}).get("file_name", "unknown")
+            by_shard.setdefault(self.shard_for(source), []).append(doc)
+
+        inserted = self._fan_out(
+            lambda shard: shard.insert_chunks(
+                collection,
+                by_shard[self.shards.index(shard)],
+                batch_size=batch_size,
+                tenant=tenant,
+            ),
+            shard_ids=sorted(by_shard),
+        )
+        return sum(inserted)
+
+    def delete_rows_by_source(self, table_name: str, source: str) -> int:
+        return self.shards[self.shard_for(source)].delete_rows_by_source(table_name, source)
+
+    # Reads
+
+    def _read_shards(self, sources: Optional[List[str]]) -> Optional[List[int]]:
+        # A source filter only needs the shards holding these sources.
+        if not sources:
+            return None
+        return sorted({self.shard_for(source) for source in sources})
+
+    def read_embeddings(self,
+                        table: str,
+                        prompt: str,
+                        k: int = 16,
+                        query_vector: Optional[List[float]] = None,
+                        sources: Optional[List[str]] = None,
+                        **kwargs: Any, # ef_search, threshold, probes, tenant, min_lsn (see PgVectorStore.read_embeddings)
+                        ) -> List[Dict[str, Any]]:
+        """
+        k nearest chunks over all the shards: every shard returns its k nearest, the k closest overall are kept.
+        """
+        if query_vector is None:
+            query_vector = self.pg_utils.embed([prompt])[0]
+
+        per_shard = self._fan_out(
+            lambda shard: shard.read_embeddings(
+                table,
+                prompt,
+                k=k,
+                query_vector=query_vector,
+                sources=sources,
+                **kwargs,
+            ),
+            shard_ids=self._read_shards(sources),
+        )
+        rows = [row for shard_rows in per_shard for row in shard_rows]
+        return sorted(rows, key=lambda row: row["distance"])[:k]
+
+    def read_embeddings_batch(self,
+                              table: str,
+                              prompts: List[str],
+                              k: int = 16,
+                              query_vectors: Optional[List[List[float]]] = None,
+                              sources: Optional[List[str]] = None,
+                              **kwargs: Any,
+                              ) -> List[List[Dict[str, Any]]]:
+        if not prompts:
+            return []
+        if query_vectors is None:
+            query_vectors = self.pg_utils.embed_batched(prompts)
+
+        per_shard = self._fan_out(
+            lambda shard: shard.read_embeddings_batch(
+                table,
+                prompts,
+                k=k,
+                query_vectors=query_vectors,
+                sources=sources,
+                **kwargs,
+            ),
+            shard_ids=self._read_shards(sources),
+        )
+        return [
+            sorted((row for shard_results in per_shard for row in shard_results[qidx]), key=lambda row: row["distance"])[:k]
+            for qidx in range(len(prompts))
+        ]
+
+    def read_fts(self, table: str, prompt: str, k: int = 16, **kwargs: Any) -> List[Dict[str, Any]]:
+        """
+        Full-text search over all the shards (ts_rank_cd only depends on the chunk, ranks of different shards compare).
+        """
+        per_shard = self._fan_out(lambda shard: shard.read_fts(table, prompt, k, **kwargs))
+        rows = [row for shard_rows in per_shard for row in shard_rows]
+        return sorted(rows, key=lambda row: row.get("fts_rank") or 0.0, reverse=True)[:k]
+
+    def read_hybrid(self,
+                    table: str,
+                    prompt: str,
+                    embed_func=None,
+                    k: int = 16,
+                    ef_search: Optional[int] = None,
+                    rrf_k: int = 60,
+                    top_k: Optional[int] = None,
+                    query_vector: Optional[List[float]] = None,
+                    **kwargs: Any,
+                    ) -> List[Dict[str, Any]]:
+        vector_results = self.read_embeddings(table, prompt, k=k, ef_search=ef_search, query_vector=query_vector, **kwargs)
+        vector_timings = self.last_shard_timings
+        fts_results = self.read_fts(table, prompt, k, **kwargs)
+        self.last_shard_timings = vector_timings + self.last_shard_timings
+        return PgVectorStore.rrf_merge(vector_results, fts_results, rrf_k=rrf_k, top_k=top_k if top_k is not None else k)
@@ -0,0 +1,137 @@
+import argparse
+import json
+import logging
+
+from typing import Any, Dict, List, Optional, Sequence
+
+from app.core.pgvector.pgvector import PgVectorStore
+from app.core.pgvector.recall import sample_query_vectors, exact_neighbors, measure_recall
+
+logger = logging.getLogger(__name__)
+
+EF_SEARCH_GRID = (16, 24, 32, 40, 64, 100, 150, 200, 300, 400, 600, 800, 1000)
+
+
+def _probes_grid(lists: int) -> List[int]:
+    grid, probes = [], 1
+    while probes < lists:
+        grid.append(probes)
+        probes *= 2
+    grid.append(lists)
+    return grid
+
+
+def tune_collection(
+    store: PgVectorStore,
+    collection: str,
+    ks: Sequence[int] = (10,),
+    recall_target: Optional[float] = None,
+    sample_size: int = 100,
+    grid: Optional[Sequence[int]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Finds, for each k, the cheapest search parameter of a collection meeting a recall target.
+
+    Stored vectors are sampled as held-out queries (their own row is left out of the
+    ground truth and of the results). recall@k is measured against exact search for
+    increasing values of hnsw.ef_search (or ivfflat.probes), and the first value
+    meeting the target is stored in the tuning table. read_embeddings then uses it
+    whenever ef_search / probes is not given.
+
+    Args:
+        store: Vector store
+        collection: Collection to tune
+        ks: Values of k to tune for
+        recall_target: Recall@k to reach, defaults to the recall target of the collection
+        sample_size: Number of held-out queries
+        grid: Values to try, in increasing order of cost
+
+    Returns:
+        One entry per k, with the chosen value and its recall and latency
+    """
+    meta = store.get_collection_meta(collection)
+    if not meta.index_ready:
+        raise ValueError(f"Collection '{meta.name}' has no ANN index to tune")
+
+    recall_target = recall_target or meta.recall_target
+
+    if meta.index_type == "hnsw":
+        param = "ef_search"
+        grid = list(grid or EF_SEARCH_GRID)
+    else:
+        param = "probes"
+        grid = list(grid or _probes_grid(int(meta.index_params.get("lists") or 1)))
+
+    rows = store.count_rows(meta.name)
+    samples = sample_query_vectors(store, meta.name, sample_size)
+    query_ids = [qid for qid, _ in samples]
+    queries = [vec for _, vec in samples]
+
+    results = []
+    for k in sorted(set(ks)):
+        ground_truth = [exact_neighbors(store, meta.name, vec, k, exclude_id=qid) for qid, vec in samples]
+
+        chosen = None
+        for value in grid:
+            if param == "ef_search" and value < k:
+                continue # HNSW never returns more than ef_search rows
+            stats = measure_recall(store, meta.name, queries, ground_truth, k, query_ids=query_ids, **{param: value})
+            logger.info(f"Tuning '{meta.name}' k={k}: {param}={value} recall={stats['recall']:.3f} p50={stats['p50_ms']:.1f}ms")
+            chosen = (value, stats)
+            if stats["recall"] >= recall_target:
+                break
+
+        if chosen is None:
+            continue
+
+        value, stats = chosen
+        if stats["recall"] < recall_target:
+            logger.warning(f"Tuning '{meta.name}' k={k}: recall target {recall_target} not reached, using {param}={value}")
+
+        store.save_search_tuning(
+            meta.name,
+            k=k,
+            param=param,
+            value=value,
+            recall=stats["recall"],
+            recall_target=recall_target,
+            p50_ms=stats["p50_ms"],
+            rows=rows,
+        )
+        results.append({
+            "k": k,
+            "param": param,
+            "value": value,
+            "recall": round(stats["recall"], 4),
+            "recall_target": recall_target,
+            "p50_ms": round(stats["p50_ms"], 2),
+            "met": stats["recall"] >= recall_target,
+        })
+
+    return results
+
+
+if __name__ == "__main__":
+    from app.config.config import PGVECTOR_DSN
+
+    parser = argparse.ArgumentParser(description="Tunes ef_search / probes of a collection for a recall target.")
+    parser.add_argument("collection")
+    parser.add_argument("--k", type=int, nargs="+", default=[10])
+    parser.add_argument("--recall-target", type=float, default=None)
+    parser.add_argument("--sample-size", type=int, default=100)
+    args = parser.parse_args()
+
+    pgvector_store = PgVectorStore(PGVECTOR_DSN)
+    try:
+        print(json.dumps(
+            tune_collection(
+                pgvector_store,
+                args.collection,
+                ks=args.k,
+                recall_target=args.recall_target,
+                sample_size=args.sample_size,
+            ),
+            indent=2,
+        ))
+    finally:
+        pgvector_store.pg_pool.disconnect()
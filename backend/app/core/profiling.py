@@ -0,0 +1,242 @@
+import io
+import logging
+import os
+import pstats
+import tempfile
+import time
+import uuid
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+
+import dramatiq
+
+from app.config.config import PROFILE_TOP_FUNCTIONS, PROFILER, PROFILING_ENABLED
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "X-Profile"  # Request header asking for a profile ("1", "true")
+PROFILE_ID_HEADER = "X-Profile-Id"  # Response header: id of the request profile
+MESSAGE_OPTION = "profile"  # Dramatiq message option: True, or the id the profile is stored under
+PROFILE_PREFIX = "profiles"
+
+# Profile id of the API request running in this context (jobs it enqueues are profiled too).
+_request_profile: ContextVar[Optional[str]] = ContextVar("request_profile", default=None)
+# Profile id of the Dramatiq job running in this context (jobs it enqueues are stored under it).
+_job_profile: ContextVar[Optional[str]] = ContextVar("job_profile", default=None)
+
+
+def _use_pyinstrument() -> bool:
+    if PROFILER == "cprofile":
+        return False
+    try:
+        import pyinstrument  # noqa: F401
+        return True
+    except ImportError:
+        if PROFILER == "pyinstrument":
+            logger.warning("pyinstrument is not installed, profiling with cProfile")
+        return False
+
+
+class Profile:
+    """
+    Profile of one request or job, stored in MinIO under profiles/<profile_id>/<name>.
+
+    Sampling (pyinstrument) when installed, since its overhead does not depend on the
+    number of calls, otherwise deterministic (cProfile). Two objects are written: the
+    raw profile (<name>.prof for pstats / snakeviz, <name>.html for pyinstrument) and
+    <name>.txt, a text summary of the PROFILE_TOP_FUNCTIONS most expensive functions.
+
+    Only the thread that started the profile is profiled.
+    """
+
+    def __init__(self, profile_id: str, name: str):
+        self.profile_id = profile_id
+        self.name = name
+        self.backend = "pyinstrument" if _use_pyinstrument() else "cprofile"
+        self._profiler = None
+        self._wall_start = 0.0
+        self.wall_seconds = 0.0
+
+    def start(self) -> bool:
+        """
+        Returns:
+            bool: False if the profiler could not be started (another one is active in this process)
+        """
+        try:
+            if self.backend == "pyinstrument":
+                from pyinstrument import Profiler
+                self._profiler = Profiler(async_mode="disabled")
+                self._profiler.start()
+            else:
+                import cProfile
+                self._profiler = cProfile.Profile()
+                self._profiler.enable()
+        except (RuntimeError, ValueError) as e:
+            # Python >= 3.12 allows a single cProfile at a time per process.
+            logger.warning(f"Profiling of {self.name} ({self.profile_id}) skipped: {e}")
+            self._profiler = None
+            return False
+        self._wall_start = time.perf_counter()
+        return True
+
+    def stop(self):
+        if self._profiler is None:
+            return
+        self.wall_seconds = time.perf_counter() - self._wall_start
+        if self.backend == "cprofile":
+            self._profiler.disable()
+        else:
+            self._profiler.stop()
+
+    def summary(self) -> str:
+        header = f"{self.name} ({self.profile_id}) - {self.backend} - wall {self.wall_seconds * 1000:.1f} ms\n\n"
+        if self.backend == "pyinstrument":
+            return header + self._profiler.output_text(unicode=True, color=False)
+        stream = io.StringIO()
+        stats = pstats.Stats(self._profiler, stream=stream)
+        stats.strip_dirs().sort_stats(pstats.SortKey.CUMULATIVE).print_stats(PROFILE_TOP_FUNCTIONS)
+        return header + stream.getvalue()
+
+    def artifact(self) -> bytes:
+        if self.backend == "pyinstrument":
+            return self._profiler.output_html().encode("utf-8")
+        # pstats dump format, loaded with pstats.Stats(path) or snakeviz.
+        with tempfile.TemporaryDirectory(prefix="profile_") as tmpdir:
+            path = os.path.join(tmpdir, "profile.prof")
+            self._profiler.dump_stats(path)
+            with open(path, "rb") as f:
+                return f.read()
+
+    def save(self) -> Optional[str]:
+        """
+        Uploads the profile and its summary, a storage failure never fails the profiled work.
+
+        Returns:
+            Optional[str]: Key prefix of the profile in the bucket, None if nothing was stored
+        """
+        if self._profiler is None:
+            return None
+        from app.core.minio_client import get_minio_client
+
+        prefix = f"{PROFILE_PREFIX}/{self.profile_id}/{self.name}"
+        extension = "html" if self.backend == "pyinstrument" else "prof"
+        try:
+            client = get_minio_client()
+            client.put_bytes(f"{prefix}.{extension}", self.artifact(),
+                             content_type="text/html" if extension == "html" else "application/octet-stream")
+            client.put_bytes(f"{prefix}.txt", self.summary().encode("utf-8"), content_type="text/plain")
+        except Exception as e:
+            logger.error(f"Error storing the profile {prefix}: {str(e)}")
+            return None
+        logger.info(f"Profile of {self.name} stored at {prefix}.{{{extension},txt}} ({self.wall_seconds * 1000:.1f} ms)")
+        return prefix
+
+
+@contextmanager
+def profiled(profile_id: str, name: str) -> Iterator[Profile]:
+    """
+    Profiles the block and stores the result (see Profile).
+    """
+    profile = Profile(profile_id, name)
+    started = profile.start()
+    try:
+        yield profile
+    finally:
+        if started:
+            profile.stop()
+            profile.save()
+
+
+@contextmanager
+def profile_request(name: str) -> Iterator[Optional[Profile]]:
+    """
+    Profiles the block if the current API request asked for it (X-Profile header).
+
+    Used inside the handlers themselves: sync handlers run in a thread pool, a
+    profiler started by the HTTP middleware would only see the event loop.
+    """
+    profile_id = _request_profile.get()
+    if profile_id is None:
+        yield None
+        return
+    with profiled(profile_id, name) as profile:
+        yield profile
+
+
+async def _profile_requests(request, call_next):
+    if request.headers.get(PROFILE_HEADER, "").lower() not in ("1", "true", "yes"):
+        return await call_next(request)
+
+    profile_id = uuid.uuid4().hex
+    token = _request_profile.set(profile_id)
+    try:
+        response = await call_next(request)
+    finally:
+        _request_profile.reset(token)
+    response.headers[PROFILE_ID_HEADER] = profile_id
+    return response
+
+
+def enable_request_profiling(app):
+    """
+    Honors the X-Profile header on the requests of a FastAPI app (PROFILING_ENABLED only).
+
+    The handlers wrapped in profile_request() store their profile under
+    profiles/<X-Profile-Id>/, the jobs enqueued by the request are sent with the
+    profile option and stored under profiles/<job_id>/.
+    """
+    if PROFILING_ENABLED:
+        app.middleware("http")(_profile_requests)
+
+
+class ProfilingMiddleware(dramatiq.Middleware):
+    """
+    Runs the jobs sent with the profile option under a profiler (PROFILING_ENABLED only).
+
+        ingest_document.send_with_options(kwargs={...}, profile=True)
+
+    The profile is stored under profiles/<job_id>/<actor_name>. The jobs enqueued
+    by a profiled job inherit the option and are stored under the same id, so the
+    profile of an upload holds both validate_and_promote and ingest_document.
+    """
+
+    def __init__(self):
+        self._active: Dict[str, Any] = {}
+
+    @property
+    def actor_options(self):
+        return {MESSAGE_OPTION}
+
+    def before_enqueue(self, broker, message, delay):
+        if MESSAGE_OPTION in message.options:
+            return
+        job_profile = _job_profile.get()
+        if job_profile is not None:
+            message.options[MESSAGE_OPTION] = job_profile
+        elif _request_profile.get() is not None:
+            message.options[MESSAGE_OPTION] = True
+
+    def before_process_message(self, broker, message):
+        requested = message.options.get(MESSAGE_OPTION)
+        if not PROFILING_ENABLED or not requested:
+            return
+        profile_id = requested if isinstance(requested, str) else message.message_id
+        profile = Profile(profile_id, message.actor_name)
+        if not profile.start():
+            return
+        token = _job_profile.set(profile_id)
+        self._active[message.message_id] = (profile, token)
+
+    def after_process_message(self, broker, message, *, result=None, exception=None):
+        active = self._active.pop(message.message_id, None)
+        if active is None:
+            return
+        profile, token = active
+        profile.stop()
+        _job_profile.reset(token)
+        profile.save()
+
+    def after_skip_message(self, broker, message):
+        self.after_process_message(broker, message)
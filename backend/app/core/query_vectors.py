@@ -0,0 +1,58 @@
+import json
+import logging
+
+from typing import List, Optional
+
+from app.core.redis_config import redis_client
+
+logger = logging.getLogger(__name__)
+
+QVEC_PREFIX = "knowhub:qvec"
+QVEC_TTL_SECONDS = 300
+
+
+def _key(job_id: str) -> str:
+    return f"{QVEC_PREFIX}:{job_id}"
+
+
+def publish_query_vector(job_id: str, vector: Optional[List[float]]):
+    """
+    Hands the query embedding computed by the API over to the worker of job_id.
+
+    Args:
+        job_id: Generation job waiting for the vector
+        vector: Query embedding, or None if the embedding failed (the worker then
+                falls back to the embedding service right away instead of waiting)
+    """
+    key = _key(job_id)
+    payload = json.dumps(vector) if vector is not None else ""
+
+    pipe = redis_client.pipeline()
+    pipe.rpush(key, payload)
+    pipe.expire(key, QVEC_TTL_SECONDS)
+    pipe.execute()
+
+
+def wait_query_vector(job_id: str, timeout_seconds: float = 2.0) -> Optional[List[float]]:
+    """
+    Waits for the query embedding published by the API for job_id.
+
+    Args:
+        job_id: Generation job id
+        timeout_seconds: Maximum time to wait for the vector
+
+    Returns:
+        The query embedding, or None if it is not available in time
+    """
+    try:
+        item = redis_client.blpop(_key(job_id), timeout=timeout_seconds)
+    except Exception as e:
+        logger.error(f"Error waiting for query vector of job {job_id}: {str(e)}")
+        return None
+
+    if not item:
+        logger.warning(f"Query vector for job {job_id} not available after {timeout_seconds}s")
+        return None
+
+    _, payload = item
+    return json.loads(payload) if payload else None
@@ -2,7 +2,7 @@ import torch
 import torch.nn.functional as F
 from transformers import AutoTokenizer, AutoModel
 
-from typing import List
+from typing import List, Optional
 
 
 class QwenEmbedder:
@@ -62,9 +62,12 @@ class QwenEmbedder:
             batch_size = last_hidden_states.shape[0]
             return last_hidden_states[torch.arange(batch_size, device=last_hidden_states.device), seq_lengths]
 
-    def embed(self, texts: List[str], max_length: int = 1024) -> List[List[float]]:
+    def embed(self, texts: List[str], max_length: int = 1024, dim: Optional[int] = None) -> List[List[float]]:
         """
         Generates embeddings for a list of texts with memory optimizations.
+
+        dim truncates the embeddings to their first dim values (Matryoshka-style, e.g. 256)
+        before the normalization, None keeps the full hidden size.
         """
         with torch.inference_mode():
             # We translate texts first to tokens
@@ -78,6 +81,8 @@ class QwenEmbedder:
 
             outputs = self.model(**inputs)
             embeddings = self._last_token_pool(outputs.last_hidden_state, inputs["attention_mask"]) # We get the embeddings of the last token
+            if dim is not None:
+                embeddings = embeddings[:, :dim] # Reduced output dimension, the prefix is re-normalized below
             embeddings = F.normalize(embeddings, p=2, dim=1)  # Normalize the embeddings to unit length (L2 norm)
 
             return embeddings.cpu().float() 
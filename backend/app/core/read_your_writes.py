@@ -0,0 +1,57 @@
+import logging
+
+from typing import Optional
+
+from app.core.redis_config import redis_client
+
+logger = logging.getLogger(__name__)
+
+WRITE_LSN_PREFIX = "knowhub:write-lsn"
+
+# Keeps the highest of the stored and the new LSN ("X/Y", two hex numbers): ingest
+# workers of the same collection may finish out of order.
+_RECORD_SCRIPT = """
+local current = redis.call("GET", KEYS[1])
+if current then
+    local c_hi, c_lo = string.match(current, "(%x+)/(%x+)")
+    local n_hi, n_lo = string.match(ARGV[1], "(%x+)/(%x+)")
+    c_hi, c_lo, n_hi, n_lo = tonumber(c_hi, 16), tonumber(c_lo, 16), tonumber(n_hi, 16), tonumber(n_lo, 16)
+    if c_hi > n_hi or (c_hi == n_hi and c_lo >= n_lo) then
+        redis.call("EXPIRE", KEYS[1], ARGV[2])
+        return 0
+    end
+end
+redis.call("SET", KEYS[1], ARGV[1], "EX", ARGV[2])
+return 1
+"""
+
+
+def _key(collection: str) -> str:
+    return f"{WRITE_LSN_PREFIX}:{collection.lower()}"
+
+
+def record_write(collection: str, lsn: Optional[str], ttl_seconds: int):
+    """
+    Remembers the WAL position of the last write into a collection.
+
+    For ttl_seconds, the reads of the collection only go to replicas that have
+    replayed it (long enough for any replica within the lag limit to catch up).
+    """
+    if not lsn or ttl_seconds <= 0:
+        return
+    try:
+        redis_client.eval(_RECORD_SCRIPT, 1, _key(collection), lsn, int(ttl_seconds))
+    except Exception as e:
+        # Worst case the next reads may not see the new documents for the replication lag.
+        logger.warning(f"Could not record the write LSN of '{collection}': {e}")
+
+
+def required_lsn(collection: str) -> Optional[str]:
+    """
+    WAL position the reads of a collection must see, None if it was not written recently.
+    """
+    try:
+        return redis_client.get(_key(collection))
+    except Exception as e:
+        logger.warning(f"Could not read the write LSN of '{collection}': {e}")
+        return None
@@ -0,0 +1,157 @@
+import logging
+from typing import Any, Dict, List, Optional
+
+from app.config.retrieval_settings import retrieval_settings
+
+logger = logging.getLogger(__name__)
+
+
+class CrossEncoderReranker:
+    """
+    Cross-encoder reranker running on CPU.
+
+    Scores (query, chunk) pairs jointly, which is much more precise than the
+    vector distance but too slow to run on a whole collection. It is meant to
+    reorder a small candidate set coming from the ANN search.
+
+    The fastest available backend is picked at load time:
+        - onnx: ONNX Runtime through optimum (if installed)
+        - int8: torch dynamic int8 quantization of the Linear layers
+        - fp32: plain torch model
+    """
+
+    def __init__(
+        self,
+        model_name: str = retrieval_settings.RERANK_MODEL,
+        backend: str = retrieval_settings.RERANK_BACKEND,
+        batch_size: int = retrieval_settings.RERANK_BATCH_SIZE,
+        max_length: int = retrieval_settings.RERANK_MAX_LENGTH,
+        num_threads: int = retrieval_settings.RERANK_NUM_THREADS,
+    ):
+        # Torch and transformers are imported here so that workers which never rerank don't pay for them.
+        import torch
+        from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.max_length = max_length
+
+        if num_threads and num_threads > 0:
+            torch.set_num_threads(num_threads)
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name, use_fast=True)
+        self.model = None
+        self.backend = None
+
+        if backend in ("auto", "onnx"):
+            try:
+                from optimum.onnxruntime import ORTModelForSequenceClassification
+
+                self.model = ORTModelForSequenceClassification.from_pretrained(model_name, export=True)
+                self.backend = "onnx"
+            except ImportError:
+                if backend == "onnx":
+                    raise
+                logger.info("optimum[onnxruntime] not installed, falling back to torch for reranking")
+            except Exception as e:
+                # Export or load failure (unsupported op, read-only model cache, ...): auto still has int8.
+                if backend == "onnx":
+                    raise
+                logger.warning(f"ONNX reranker unavailable ({str(e)}), falling back to torch int8", exc_info=True)
+
+        if self.model is None:
+            model = AutoModelForSequenceClassification.from_pretrained(model_name).to("cpu")
+            model.eval()
+
+            if backend in ("auto", "int8"):
+                model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+                self.backend = "int8"
+            else:
+                self.backend = "fp32"
+
+            self.model = model
+
+        logger.info(f"CrossEncoderReranker ready (model={model_name}, backend={self.backend})")
+
+    def score(self, query: str, texts: List[str]) -> List[float]:
+        """
+        Computes a relevance score for each text against the query.
+
+        Args:
+            query: User query
+            texts: Candidate texts
+
+        Returns:
+            One score per text (higher is more relevant)
+        """
+        import torch
+
+        scores: List[float] = []
+
+        with torch.inference_mode():
+            for i in range(0, len(texts), self.batch_size):
+                batch = texts[i:i + self.batch_size]
+                inputs = self.tokenizer(
+                    [query] * len(batch),
+                    batch,
+                    padding=True,
+                    truncation="only_second",  # Never cut the query, only the chunk.
+                    max_length=self.max_length,
+                    return_tensors="pt",
+                )
+                logits = self.model(**inputs).logits
+
+                # Most cross-encoders output a single relevance logit, binary classifiers output two.
+                if logits.shape[-1] == 1:
+                    batch_scores = logits.squeeze(-1)
+                else:
+                    batch_scores = logits[:, -1]
+
+                scores.extend(float(s) for s in batch_scores)
+
+        return scores
+
+    def rerank(
+        self,
+        query: str,
+        chunks: List[Dict[str, Any]],
+        top_n: int,
+    ) -> List[Dict[str, Any]]:
+        """
+        Reorders retrieved chunks by cross-encoder score and keeps the best ones.
+
+        Args:
+            query: User query
+            chunks: Chunks returned by the vector search
+            top_n: Number of chunks to keep
+
+        Returns:
+            The top_n chunks, each with a "rerank_score" field
+        """
+        if not chunks:
+            return []
+
+        scores = self.score(query, [chunk.get("text", "") for chunk in chunks])
+
+        reranked = []
+        for chunk, score in zip(chunks, scores):
+            rec = dict(chunk)
+            rec["rerank_score"] = score
+            reranked.append(rec)
+
+        reranked.sort(key=lambda c: c["rerank_score"], reverse=True)
+        return reranked[:top_n]
+
+
+_reranker: Optional[CrossEncoderReranker] = None
+
+
+def get_reranker() -> CrossEncoderReranker:
+    """
+    Initializes and returns a singleton instance of CrossEncoderReranker.
+    """
+    global _reranker
+    if _reranker is None:
+        logger.info("Initializing CrossEncoderReranker...")
+        _reranker = CrossEncoderReranker()
+    return _reranker
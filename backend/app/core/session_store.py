@@ -0,0 +1,348 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from psycopg import sql
+from psycopg.types.json import Jsonb
+
+from app.config.config import (
+    PGVECTOR_DSN,
+    SESSION_SINK,
+    SESSION_FLUSH_INTERVAL_SECONDS,
+    SESSION_ROTATE_MAX_BYTES,
+)
+from app.config.paths import SESSIONS_DIR
+from app.core.pgvector.pgpool_connector import PgPoolConnector
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_ts(value: str) -> datetime:
+    ts = datetime.fromisoformat(value)
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+def _as_utc(value: datetime) -> datetime:
+    # Naive datetimes are UTC, aware ones are converted (file names are UTC hours).
+    return value.astimezone(timezone.utc) if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+class SessionSink(ABC):
+    """
+    Append-only store for generation sessions.
+
+    write() only enqueues the record: a background thread batches the records and
+    flushes them, so the generation path never waits on disk or database I/O.
+    A batch that fails to be written is retried at the next flushes, and only
+    dropped after max_attempts failures.
+    """
+
+    def __init__(
+        self,
+        flush_interval: float = SESSION_FLUSH_INTERVAL_SECONDS,
+        max_batch: int = 500,
+        max_queue: int = 10000,
+        max_attempts: int = 5,
+    ):
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_attempts = max_attempts
+        self._retry: List[Dict[str, Any]] = [] # Batch of the last failed flush, written before the queue
+        self._failures = 0
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name=f"{type(self).__name__}-flusher", daemon=True)
+        self._thread.start()
+
+    def write(self, record: Dict[str, Any]) -> None:
+        """
+        Enqueues a session record. Drops it (with a warning) if the buffer is full.
+        """
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            logger.warning(f"Session buffer full, dropping session {record.get('job_id')}")
+
+    def flush(self) -> None:
+        """
+        Writes every buffered record now.
+        """
+        with self._flush_lock:
+            while True:
+                batch = self._retry or self._drain()
+                if not batch:
+                    return
+                try:
+                    self._write_batch(batch)
+                except Exception as e:
+                    self._failures += 1
+                    if self._failures >= self.max_attempts:
+                        logger.error(
+                            f"Dropping {len(batch)} session(s) after {self._failures} failed flushes: {str(e)}",
+                            exc_info=True,
+                        )
+                        self._retry, self._failures = [], 0
+                    else:
+                        logger.warning(
+                            f"Error flushing {len(batch)} session(s) (attempt {self._failures}/{self.max_attempts}), "
+                            f"retrying at the next flush: {str(e)}"
+                        )
+                        self._retry = batch
+                    return
+                self._retry, self._failures = [], 0
+
+    def close(self) -> None:
+        self._stop.set()
+        self._thread.join(timeout=self.flush_interval + 5)
+        self.flush()
+
+    def _drain(self) -> List[Dict[str, Any]]:
+        batch = []
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    @abstractmethod
+    def _write_batch(self, records: List[Dict[str, Any]]) -> None:
+        pass
+
+    @abstractmethod
+    def read_sessions(
+        self,
+        start: datetime,
+        end: datetime,
+        collection: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Returns the sessions with start <= timestamp < end, oldest first.
+        """
+        pass
+
+
+class JsonlSessionSink(SessionSink):
+    """
+    Writes sessions as JSON lines in hourly files, rotated by size.
+
+    File names are sessions-<YYYYMMDD>T<HH>-<pid>-<part>.jsonl: one writer per
+    process, so several workers never interleave lines in the same file.
+    """
+
+    def __init__(self, directory: Path = SESSIONS_DIR, max_bytes: int = SESSION_ROTATE_MAX_BYTES, **kwargs):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._part = 0
+        self._hour: Optional[str] = None
+        super().__init__(**kwargs)
+
+    def _current_file(self, hour: str) -> Path:
+        if hour != self._hour:
+            self._hour = hour
+            self._part = 0
+
+        path = self.directory / f"sessions-{hour}-{os.getpid()}-{self._part:03d}.jsonl"
+        while path.exists() and path.stat().st_size >= self.max_bytes:
+            self._part += 1
+            path = self.directory / f"sessions-{hour}-{os.getpid()}-{self._part:03d}.jsonl"
+        return path
+
+    def _write_batch(self, records: List[Dict[str, Any]]) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        path = self._current_file(datetime.now(timezone.utc).strftime("%Y%m%dT%H"))
+        lines = "".join(json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in records)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+        logger.debug(f"Flushed {len(records)} session(s) to {path}")
+
+    def _files_between(self, start: datetime, end: datetime) -> Iterator[Path]:
+        if not self.directory.exists():
+            return
+
+        # Files are named by flush time, never earlier than the records they hold: a record
+        # of the window can be in a file of a later hour (buffered, or retried after a failed
+        # flush), but never in one of an earlier hour.
+        first_hour = start.strftime("%Y%m%dT%H")
+        last_hour = (end + timedelta(hours=1)).strftime("%Y%m%dT%H")
+
+        for path in sorted(self.directory.glob("sessions-*.jsonl")):
+            hour = path.name.split("-")[1]
+            if first_hour <= hour <= last_hour:
+                yield path
+
+    def read_sessions(
+        self,
+        start: datetime,
+        end: datetime,
+        collection: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        start, end = _as_utc(start), _as_utc(end)
+        self.flush()
+
+        sessions = []
+        for path in self._files_between(start, end):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    ts = _parse_ts(record["timestamp"])
+                    if not (start <= ts < end):
+                        continue
+                    if collection is not None and record.get("collection") != collection:
+                        continue
+                    sessions.append(record)
+
+        sessions.sort(key=lambda r: r["timestamp"])
+        return sessions
+
+
+class PostgresSessionSink(SessionSink):
+    """
+    Writes sessions into a Postgres table with one multi-row INSERT per batch.
+    """
+
+    def __init__(self, dsn: str = PGVECTOR_DSN, table: str = "knowhub_sessions", **kwargs):
+        self.table = table
+        self.pg_pool = PgPoolConnector(dsn, min_size=1, max_size=2, enable_vector=False)
+        self.pg_pool.connect()
+        self._ensure_table()
+        super().__init__(**kwargs)
+
+    def _ensure_table(self):
+        tbl = sql.Identifier(self.table)
+        with self.pg_pool.cursor() as cur:
+            cur.execute(sql.SQL("""
+                CREATE TABLE IF NOT EXISTS {tbl} (
+                    id BIGSERIAL PRIMARY KEY,
+                    job_id TEXT NOT NULL,
+                    created_at TIMESTAMPTZ NOT NULL,
+                    collection TEXT,
+                    query TEXT,
+                    answer TEXT,
+                    sources JSONB,
+                    metadata JSONB
+                );
+            """).format(tbl=tbl))
+            # BRIN is tiny and a perfect fit for an append-only, time-ordered table.
+            cur.execute(sql.SQL("""
+                CREATE INDEX IF NOT EXISTS {idx} ON {tbl} USING brin (created_at);
+            """).format(idx=sql.Identifier(f"{self.table}_created_at_idx"), tbl=tbl))
+
+    def _write_batch(self, records: List[Dict[str, Any]]) -> None:
+        query = sql.SQL("""
+            INSERT INTO {tbl} (job_id, created_at, collection, query, answer, sources, metadata)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """).format(tbl=sql.Identifier(self.table))
+
+        rows = [
+            (
+                r.get("job_id"),
+                _parse_ts(r["timestamp"]),
+                r.get("collection"),
+                r.get("query"),
+                r.get("answer"),
+                Jsonb(r.get("sources") or []),
+                Jsonb(r.get("metadata") or {}),
+            )
+            for r in records
+        ]
+
+        with self.pg_pool.cursor() as cur:
+            cur.executemany(query, rows)
+
+    def read_sessions(
+        self,
+        start: datetime,
+        end: datetime,
+        collection: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        self.flush()
+
+        where = sql.SQL("created_at >= %s AND created_at < %s")
+        params: List[Any] = [_as_utc(start), _as_utc(end)]
+        if collection is not None:
+            where = where + sql.SQL(" AND collection = %s")
+            params.append(collection)
+
+        query = sql.SQL("""
+            SELECT job_id, created_at, collection, query, answer, sources, metadata
+            FROM {tbl}
+            WHERE {where}
+            ORDER BY created_at
+        """).format(tbl=sql.Identifier(self.table), where=where)
+
+        sessions = []
+        with self.pg_pool.cursor() as cur:
+            cur.execute(query, params)
+            for job_id, created_at, coll, q, answer, sources, metadata in cur.fetchall():
+                sessions.append({
+                    "job_id": job_id,
+                    "timestamp": created_at.isoformat(),
+                    "query": q,
+                    "answer": answer,
+                    "collection": coll,
+                    "sources": sources,
+                    "metadata": metadata,
+                })
+        return sessions
+
+
+SINKS = {
+    "jsonl": JsonlSessionSink,
+    "postgres": PostgresSessionSink,
+}
+
+_sink: Optional[SessionSink] = None
+_sink_lock = threading.Lock()
+
+
+def get_session_sink() -> SessionSink:
+    """
+    Returns the session sink of this process, created from SESSION_SINK on first use.
+    """
+    global _sink
+    if _sink is None:
+        with _sink_lock:
+            if _sink is None:
+                sink_cls = SINKS.get(SESSION_SINK.lower())
+                if sink_cls is None:
+                    raise ValueError(f"Unsupported session sink: {SESSION_SINK}")
+                _sink = sink_cls()
+                atexit.register(_sink.close)
+    return _sink
+
+
+def read_sessions(
+    start: datetime,
+    end: datetime,
+    collection: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Reads the sessions recorded between start (included) and end (excluded).
+
+    Args:
+        start: Beginning of the time range
+        end: End of the time range
+        collection: Optional collection filter
+
+    Returns:
+        Session records, oldest first
+    """
+    return get_session_sink().read_sessions(start, end, collection=collection)
@@ -0,0 +1,263 @@
+import logging
+import threading
+
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import dramatiq
+
+from app.config.config import (
+    TRACING_EXPORTER,
+    TRACING_FILE,
+    TRACING_OTLP_ENDPOINT,
+    TRACING_SAMPLE_RATIO,
+)
+
+logger = logging.getLogger(__name__)
+
+try:
+    from opentelemetry import context as otel_context
+    from opentelemetry import propagate, trace
+    from opentelemetry.trace import SpanKind, Status, StatusCode
+except ImportError:  # Optional: without it every span is a no-op and nothing is propagated.
+    trace = None
+
+TRACER_NAME = "knowhub"
+MESSAGE_OPTION = "trace_context"  # Dramatiq message option carrying the traceparent of the enqueuer
+
+_initialized = False
+_init_lock = threading.Lock()
+
+
+def _clean(attributes: Dict[str, Any]) -> Dict[str, Any]:
+    # Span attributes only take str, bool, int, float (or lists of them), None is dropped.
+    return {
+        key: value if isinstance(value, (str, bool, int, float, list, tuple)) else str(value)
+        for key, value in attributes.items() if value is not None
+    }
+
+
+def _file_exporter(path: str):
+    from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+
+    class JsonLinesSpanExporter(SpanExporter):
+        """
+        One JSON span per line, for tests and local debugging without a collector.
+        """
+
+        def __init__(self, path: str):
+            self.path = path
+            self._lock = threading.Lock()
+
+        def export(self, spans):
+            with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                for span in spans:
+                    f.write(span.to_json(indent=None) + "\n")
+            return SpanExportResult.SUCCESS
+
+        def shutdown(self):
+            pass
+
+    return JsonLinesSpanExporter(path)
+
+
+def init_tracing(service_name: str) -> bool:
+    """
+    Installs the tracer provider of the process (once), exporting to TRACING_EXPORTER.
+
+    "otlp" batches the spans to the collector at TRACING_OTLP_ENDPOINT (OTLP/HTTP),
+    "file" appends them to TRACING_FILE as they end. Traces are sampled at
+    TRACING_SAMPLE_RATIO, a span started from a propagated context keeps the
+    decision of its parent so a trace is either complete or absent.
+
+    Returns:
+        bool: True if spans are exported by this process
+    """
+    global _initialized
+
+    if trace is None or TRACING_EXPORTER not in ("otlp", "file"):
+        return False
+
+    with _init_lock:
+        if _initialized:
+            return True
+
+        try:
+            from opentelemetry.sdk.resources import Resource
+            from opentelemetry.sdk.trace import TracerProvider
+            from opentelemetry.sdk.trace.export import BatchSpanProcessor, SimpleSpanProcessor
+            from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+        except ImportError:
+            logger.warning("opentelemetry-sdk is not installed, tracing disabled")
+            return False
+
+        provider = TracerProvider(
+            resource=Resource.create({"service.name": service_name}),
+            sampler=ParentBased(TraceIdRatioBased(TRACING_SAMPLE_RATIO)),
+        )
+
+        if TRACING_EXPORTER == "otlp":
+            try:
+                from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+            except ImportError:
+                logger.warning("opentelemetry-exporter-otlp-proto-http is not installed, tracing disabled")
+                return False
+            provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(endpoint=TRACING_OTLP_ENDPOINT)))
+            target = TRACING_OTLP_ENDPOINT
+        else:
+            # Written as each span ends, a test can read the file right after the traced call.
+            provider.add_span_processor(SimpleSpanProcessor(_file_exporter(TRACING_FILE)))
+            target = TRACING_FILE
+
+        trace.set_tracer_provider(provider)
+        _initialized = True
+
+    logger.info(f"Tracing of {service_name} exported to {target} (sample ratio {TRACING_SAMPLE_RATIO})")
+    return True
+
+
+def shutdown_tracing():
+    """
+    Flushes the spans still buffered (process exit).
+    """
+    if trace is None or not _initialized:
+        return
+    provider = trace.get_tracer_provider()
+    if hasattr(provider, "shutdown"):
+        provider.shutdown()
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Traces a block as a child of the current span: `with span("llm.stream", model=m) as attrs: ...; attrs["tokens"] = n`.
+
+    The attributes set on the yielded dict are added to the span when the block
+    ends, an exception raised by the block is recorded on it. Without OpenTelemetry
+    the block just runs.
+    """
+    attrs: Dict[str, Any] = dict(attributes)
+    if trace is None:
+        yield attrs
+        return
+
+    tracer = trace.get_tracer(TRACER_NAME)
+    with tracer.start_as_current_span(name) as current:
+        try:
+            yield attrs
+        finally:
+            if current.is_recording():
+                current.set_attributes(_clean(attrs))
+
+
+def inject_headers(headers: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """
+    Adds the traceparent (and tracestate) of the current span to headers, for an outgoing HTTP call.
+    """
+    headers = dict(headers or {})
+    if trace is not None:
+        propagate.inject(headers)
+    return headers
+
+
+def instrument_app(app):
+    """
+    Server spans for the requests of a FastAPI app, children of the caller's span
+    when the request carries a traceparent header.
+
+    FastAPI 0.143.1 creates them natively (fastapi.telemetry, configured with
+    FastAPI(telemetry=...)) once a tracer provider is set, the middleware below is
+    only added when the app has no native tracing (older releases, or tracing=False).
+    """
+    if trace is None or _native_tracing(app):
+        return
+    app.middleware("http")(_trace_requests)
+
+
+def _native_tracing(app) -> bool:
+    # The telemetry config of FastAPI(telemetry=...), absent before native telemetry.
+    config = getattr(app, "_telemetry", None)
+    return isinstance(config, dict) and bool(config.get("tracing"))
+
+
+async def _trace_requests(request, call_next):
+    # Streaming responses (SSE) are timed up to their first byte, the stream itself is traced on the worker side.
+    tracer = trace.get_tracer(TRACER_NAME)
+    parent = propagate.extract(dict(request.headers))
+    with tracer.start_as_current_span(
+        f"{request.method} {request.url.path}",
+        context=parent,
+        kind=SpanKind.SERVER,
+        attributes={"http.method": request.method, "http.target": request.url.path},
+    ) as current:
+        response = await call_next(request)
+        route = request.scope.get("route")
+        if route is not None and getattr(route, "path", None):
+            # Route template rather than the path, /stream/{job_id} groups the requests of every job.
+            current.update_name(f"{request.method} {route.path}")
+            current.set_attribute("http.route", route.path)
+        current.set_attribute("http.status_code", response.status_code)
+        if response.status_code >= 500:
+            current.set_status(Status(StatusCode.ERROR))
+        return response
+
+
+class TracingMiddleware(dramatiq.Middleware):
+    """
+    Carries the trace of the enqueuer over to the worker running the job.
+
+    The traceparent of the span current when a job is sent is stored in its
+    message options (trace_context), the worker starts a consumer span from it
+    around the actor, so that the API request, the job and everything the job
+    calls (embedding service, Postgres, LLM) belong to one trace.
+    """
+
+    def __init__(self, service_name: str = "knowhub-worker"):
+        self.service_name = service_name
+        self._active: Dict[str, Tuple[Any, Any]] = {}
+
+    def after_process_boot(self, broker):
+        init_tracing(self.service_name)
+
+    def before_worker_shutdown(self, broker, worker):
+        shutdown_tracing()
+
+    def before_enqueue(self, broker, message, delay):
+        if trace is None:
+            return
+        carrier: Dict[str, str] = {}
+        propagate.inject(carrier)
+        if carrier:
+            message.options[MESSAGE_OPTION] = carrier
+
+    def before_process_message(self, broker, message):
+        if trace is None:
+            return
+        parent = propagate.extract(message.options.get(MESSAGE_OPTION) or {})
+        current = trace.get_tracer(TRACER_NAME).start_span(
+            f"dramatiq {message.actor_name}",
+            context=parent,
+            kind=SpanKind.CONSUMER,
+            attributes={
+                "messaging.system": "dramatiq",
+                "messaging.destination": message.queue_name,
+                "messaging.message_id": message.message_id,
+                "dramatiq.retries": message.options.get("retries", 0),
+            },
+        )
+        token = otel_context.attach(trace.set_span_in_context(current, parent))
+        self._active[message.message_id] = (current, token)
+
+    def after_process_message(self, broker, message, *, result=None, exception=None):
+        active = self._active.pop(message.message_id, None)
+        if active is None:
+            return
+        current, token = active
+        if exception is not None:
+            current.record_exception(exception)
+            current.set_status(Status(StatusCode.ERROR, str(exception)))
+        current.end()
+        otel_context.detach(token)
+
+    def after_skip_message(self, broker, message):
+        self.after_process_message(broker, message)
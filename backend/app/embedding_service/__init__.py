@@ -0,0 +1,6 @@
+"""
+Standalone embedding service: the embedding model served by a pool of processes
+behind a priority queue, so that API pods don't embed in their request workers.
+
+Run with `python -m app.embedding_service`.
+"""
@@ -0,0 +1,12 @@
+import uvicorn
+
+from app.config.embedding_settings import embedding_settings
+
+if __name__ == "__main__":
+    # A single server process: the parallelism comes from the model pool behind it.
+    uvicorn.run(
+        "app.embedding_service.server:app",
+        host="0.0.0.0",
+        port=embedding_settings.EMBED_SERVICE_PORT,
+        workers=1,
+    )
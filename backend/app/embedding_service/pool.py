@@ -0,0 +1,207 @@
+import itertools
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+
+from concurrent.futures import Future
+from typing import Any, List, Optional, Tuple
+
+from app.core.metrics import EMBED_BATCH_SECONDS, EMBED_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Lower value first: an interactive query waits at most for the batch each process is running.
+PRIORITIES = {"interactive": 0, "bulk": 10}
+
+RESTART_DELAY_SECONDS = 5.0
+
+
+class QueueFullError(Exception):
+    pass
+
+
+def _worker_main(conn, model_name: str, num_threads: int):
+    """
+    Model-serving process: loads the embedder once, then embeds the batches sent on conn.
+    """
+    import torch
+
+    if num_threads > 0:
+        # Pinned so that the processes don't oversubscribe the CPUs.
+        torch.set_num_threads(num_threads)
+
+    from app.core.qwen_embedder import QwenEmbedder
+
+    try:
+        embedder = QwenEmbedder(model_name)
+    except Exception as e:
+        conn.send(("error", f"Model loading failed: {e}"))
+        return
+    conn.send(("ready", None))
+
+    while True:
+        try:
+            texts, max_length, dim = conn.recv()
+        except EOFError:
+            return # The service is shutting down.
+
+        try:
+            vectors = embedder.embed(texts, max_length=max_length, dim=dim)
+            conn.send(("ok", vectors.tolist() if hasattr(vectors, "tolist") else vectors))
+        except Exception as e:
+            conn.send(("error", str(e)))
+        finally:
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+
+
+class EmbeddingPool:
+    """
+    N processes each holding a copy of the model, fed from one priority queue.
+
+    Requests are split into batches of batch_size texts, every batch is queued
+    with the priority of its request and the next idle process takes the most
+    urgent one. A large ingest batch thus never holds an interactive query for
+    longer than one model call.
+    """
+
+    def __init__(self,
+                 model_name: str,
+                 workers: int = 2,
+                 threads_per_worker: int = 0, # 0: the CPUs are split between the workers
+                 batch_size: int = 8,
+                 max_queued_batches: int = 2000,
+                 ):
+        self.model_name = model_name
+        self.workers = max(1, workers)
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // self.workers)
+        self.batch_size = max(1, batch_size)
+        self.max_queued_batches = max_queued_batches
+
+        # Spawned, not forked: torch and CUDA don't survive a fork of a threaded parent.
+        self._ctx = multiprocessing.get_context("spawn")
+        self._queue: "queue.PriorityQueue[Tuple[int, int, Any]]" = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._ready = [False] * self.workers
+        self._stopping = threading.Event()
+        self._processes: List[Optional[multiprocessing.Process]] = [None] * self.workers
+        self._dispatchers: List[threading.Thread] = []
+
+    def start(self):
+        logger.info(
+            f"Starting {self.workers} embedding process(es) with {self.threads_per_worker} thread(s) each "
+            f"(model {self.model_name})"
+        )
+        for idx in range(self.workers):
+            thread = threading.Thread(target=self._dispatch, args=(idx,), name=f"embed-dispatch-{idx}", daemon=True)
+            thread.start()
+            self._dispatchers.append(thread)
+
+    def stop(self):
+        self._stopping.set()
+        for _ in self._dispatchers:
+            self._queue.put((-1, next(self._seq), None)) # Wakes up the dispatchers
+        for process in self._processes:
+            if process is not None and process.is_alive():
+                process.terminate()
+
+    @property
+    def ready_workers(self) -> int:
+        return sum(self._ready)
+
+    @property
+    def queued_batches(self) -> int:
+        return self._queue.qsize()
+
+    def _spawn(self, idx: int):
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(child_conn, self.model_name, self.threads_per_worker),
+            name=f"embed-worker-{idx}",
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        self._processes[idx] = process
+        return process, parent_conn
+
+    def _dispatch(self, idx: int):
+        """
+        Feeds process idx from the queue, one batch at a time. Restarts the process if it dies.
+        """
+        while not self._stopping.is_set():
+            process, conn = self._spawn(idx)
+            try:
+                status, payload = conn.recv()
+            except EOFError:
+                status, payload = "error", "process exited while loading the model"
+            if status != "ready":
+                logger.error(f"Embedding worker {idx}: {payload}, restarting in {RESTART_DELAY_SECONDS}s")
+                process.join(timeout=1)
+                self._stopping.wait(RESTART_DELAY_SECONDS)
+                continue
+
+            self._ready[idx] = True
+            logger.info(f"Embedding worker {idx} ready (pid {process.pid})")
+            try:
+                self._serve(conn)
+            except (EOFError, OSError) as e:
+                logger.error(f"Embedding worker {idx} died, restarting it: {e}")
+            finally:
+                self._ready[idx] = False
+                conn.close()
+
+    def _serve(self, conn):
+        while True:
+            _, _, job = self._queue.get()
+            if job is None:
+                return
+            texts, max_length, dim, future = job
+            if not future.set_running_or_notify_cancel():
+                continue # The client went away.
+            start = time.perf_counter()
+            try:
+                conn.send((texts, max_length, dim))
+                status, payload = conn.recv()
+            except (EOFError, OSError) as e:
+                future.set_exception(RuntimeError(f"Embedding worker died: {e}"))
+                raise
+            EMBED_BATCH_SECONDS.labels(where="service").observe(time.perf_counter() - start)
+            EMBED_BATCH_SIZE.labels(where="service").observe(len(texts))
+            if status == "ok":
+                future.set_result(payload)
+            else:
+                future.set_exception(RuntimeError(payload))
+
+    def submit(self,
+               texts: List[str],
+               max_length: int = 1024,
+               dim: Optional[int] = None,
+               priority: str = "bulk",
+               ) -> List[Future]:
+        """
+        Queues the texts as batches.
+
+        Returns:
+            One future per batch, each resolving to the embeddings of its texts
+
+        Raises:
+            QueueFullError: If a bulk request arrives while the backlog is full
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority '{priority}', expected one of {list(PRIORITIES)}")
+
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if priority == "bulk" and self.queued_batches + len(batches) > self.max_queued_batches:
+            raise QueueFullError(f"{self.queued_batches} batches already queued")
+
+        futures = []
+        for batch in batches:
+            future: Future = Future()
+            self._queue.put((PRIORITIES[priority], next(self._seq), (batch, max_length, dim, future)))
+            futures.append(future)
+        return futures
@@ -0,0 +1,108 @@
+import asyncio
+import logging
+
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from app.config.embedding_settings import embedding_settings
+from app.core.logging_utils import init_logging
+from app.core.metrics import metrics_response
+from app.core.tracing import init_tracing, shutdown_tracing, span, instrument_app
+from app.embedding_service.pool import EmbeddingPool, QueueFullError
+
+logger = logging.getLogger(__name__)
+
+pool: Optional[EmbeddingPool] = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global pool
+    init_logging()
+    init_tracing("knowhub-embedder")
+    pool = EmbeddingPool(
+        embedding_settings.EMBED_MODEL,
+        workers=embedding_settings.EMBED_WORKERS,
+        threads_per_worker=embedding_settings.EMBED_THREADS_PER_WORKER,
+        batch_size=embedding_settings.EMBED_BATCH_SIZE,
+        max_queued_batches=embedding_settings.EMBED_MAX_QUEUED_BATCHES,
+    )
+    # The models load in the background, /readyz reports when they can serve.
+    pool.start()
+    try:
+        yield
+    finally:
+        pool.stop()
+        shutdown_tracing()
+
+
+app = FastAPI(title="KnowHub Embedding Service", version="0.1.0", lifespan=lifespan)
+instrument_app(app)
+
+
+class EmbedRequest(BaseModel):
+    texts: List[str]
+    max_length: int = 1024
+    dim: Optional[int] = None  # Truncated (Matryoshka) output dimension, e.g. 256
+    priority: str = "bulk"  # "interactive" (queries) goes ahead of "bulk" (ingestion)
+
+class EmbedResponse(BaseModel):
+    embeddings: List[List[float]]
+
+
+@app.post("/embed", response_model=EmbedResponse)
+async def embed(req: EmbedRequest):
+    """
+    Embeds the texts with the model pool, batches of higher priority requests are served first.
+    """
+    if not req.texts:
+        return EmbedResponse(embeddings=[])
+    if pool is None or pool.ready_workers == 0:
+        raise HTTPException(status_code=503, detail="No embedding worker is ready")
+
+    try:
+        futures = pool.submit(req.texts, max_length=req.max_length, dim=req.dim, priority=req.priority)
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=f"Embedding queue is full: {e}", headers={"Retry-After": "5"})
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    try:
+        with span("embed.pool", texts=len(req.texts), batches=len(futures), priority=req.priority):
+            results = await asyncio.gather(*(asyncio.wrap_future(future) for future in futures))
+    except asyncio.CancelledError:
+        # Client disconnected: the batches not started yet are dropped.
+        for future in futures:
+            future.cancel()
+        raise
+    except Exception as e:
+        logger.error(f"Error during embedding computation: {e}")
+        raise HTTPException(status_code=500, detail=f"Error during embedding computation: {str(e)}")
+
+    return EmbedResponse(embeddings=[vector for batch in results for vector in batch])
+
+
+app.add_api_route("/metrics", metrics_response, methods=["GET"], include_in_schema=False)
+
+
+@app.get("/healthz")
+def healthz():
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+def readyz():
+    """
+    Ready once at least one process has loaded the model.
+    """
+    ready = pool.ready_workers if pool is not None else 0
+    body = {
+        "ready_workers": ready,
+        "workers": pool.workers if pool is not None else 0,
+        "queued_batches": pool.queued_batches if pool is not None else 0,
+    }
+    return JSONResponse(status_code=200 if ready else 503, content=body)
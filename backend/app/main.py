@@ -1,10 +1,35 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 
 from app.api.v1.router import api_router
+from app.api.v1.routes.health import close_replica_router
 from app.core.logging_utils import init_logging
+from app.core.metrics import metrics_response
+from app.core.tracing import init_tracing, shutdown_tracing, instrument_app
+from app.core.profiling import enable_request_profiling
+from app.config.config import PRELOAD_EMBEDDER
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_logging()
+    # Replicas serving /embed can load the model before taking traffic, the others
+    # never pay for torch (MinIO and Postgres clients are created on first use too).
+    if PRELOAD_EMBEDDER:
+        from app.api.v1.routes.embed import get_embedder
+        await run_in_threadpool(get_embedder)
+    init_tracing("knowhub-api")
+    try:
+        yield
+    finally:
+        close_replica_router()
+        shutdown_tracing()
 
-app = FastAPI(title="KnowHub API", version="0.1.0")
+
+app = FastAPI(title="KnowHub API", version="0.1.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -13,10 +38,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+instrument_app(app)
+enable_request_profiling(app)
 
-
-@app.on_event("startup")
-async def startup_event():
-    init_logging()
-
-app.include_router(api_router, prefix="/api/v1")
\ No newline at end of file
+app.include_router(api_router, prefix="/api/v1")
+app.add_api_route("/metrics", metrics_response, methods=["GET"], include_in_schema=False)
@@ -1,7 +1,7 @@
 import logging
 
 from contextlib import contextmanager
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from pathlib import Path
 
 from app.pipeline.loader import DocumentLoader
@@ -9,17 +9,29 @@ from app.pipeline.normalize import DocumentNormalizer
 from app.pipeline.splitter import DocumentSplitter
 
 from app.core.pgvector.pgvector import PgVectorStore
-from app.config.config import PGVECTOR_DSN
+from app.core.pgvector.pgvector_utils import PgVectorUtils
+from app.core.pgvector.factory import get_vector_store
+from app.core.ingest_stages import stage
+from app.config.config import (
+    VECTOR_STORAGE,
+    VECTOR_SHORT_DIM,
+    VECTOR_PARTITION_BY,
+    VECTOR_HASH_PARTITIONS,
+    IVFFLAT_MIN_TRAIN_ROWS,
+    IVFFLAT_RETRAIN_GROWTH,
+)
 
 logger = logging.getLogger(__name__)
 
 class IngestPipeline:
     def __init__(self, 
                  loader: DocumentLoader,
-                 dsn: str = PGVECTOR_DSN
+                 dsn: Optional[str] = None, # None: store of the deployment (single primary or shards)
+                 pg_utils: Optional[PgVectorUtils] = None, # Embedding client of the store (with dsn only)
                  ):
         self.loader = loader
         self.dsn = dsn
+        self.pg_utils = pg_utils
 
     @contextmanager
     def _get_vectorstore(self):
@@ -27,11 +39,11 @@ class IngestPipeline:
         Context manager to get a PgVectorStore connection
         and free it after use.
         """
-        store = PgVectorStore(dsn=self.dsn)
+        store = PgVectorStore(dsn=self.dsn, pg_utils=self.pg_utils) if self.dsn else get_vector_store()
         try:
             yield store
         finally:
-            store.pg_pool.disconnect() # We close the connection pool.
+            store.close() # We close the connection pools.
 
 
     def ingest(
@@ -39,6 +51,7 @@ class IngestPipeline:
         file_paths: List[str | Path],
         doc_id: str,
         collection: str,
+        tenant: Optional[str] = None,
     ) -> Dict[str, Any]:
         """
         
@@ -47,7 +60,9 @@ class IngestPipeline:
         paths = [Path(p) for p in file_paths]
 
         # Read and load documents
-        loaded_docs = self.loader.load_documents(paths)
+        with stage("load", files=len(paths)) as load_stage:
+            loaded_docs = self.loader.load_documents(paths)
+            load_stage["documents"] = len(loaded_docs)
         logger.info("Ingest: loaded %d document(s)", len(loaded_docs))
 
         if not loaded_docs:
@@ -60,12 +75,15 @@ class IngestPipeline:
 
         # Normalize document text
         normalizer = DocumentNormalizer()
-        normalized_docs = normalizer.normalize(loaded_docs)
+        with stage("normalize", documents=len(loaded_docs)):
+            normalized_docs = normalizer.normalize(loaded_docs)
         logger.info("Ingest: normalized %d document(s)", len(normalized_docs))
 
         # Split documents into smaller chunks
         splitter = DocumentSplitter()
-        split_docs = splitter.split(normalized_docs)
+        with stage("split", documents=len(normalized_docs)) as split_stage:
+            split_docs = splitter.split(normalized_docs)
+            split_stage["chunks"] = len(split_docs)
         logger.info("Ingest: split into %d chunk(s)", len(split_docs))
 
         # Store chunks into PgVector
@@ -73,12 +91,27 @@ class IngestPipeline:
             if not pgvector_store.table_exists(collection):
                 pgvector_store.create_vector_collection(
                                                         collection_name=collection,
-                                                        index_type="hnsw"
+                                                        index_type="hnsw",
+                                                        storage=VECTOR_STORAGE,
+                                                        short_dim=VECTOR_SHORT_DIM,
+                                                        partition_by=VECTOR_PARTITION_BY,
+                                                        hash_partitions=VECTOR_HASH_PARTITIONS
                                                     )
 
             pgvector_store.insert_chunks(
                                         collection=collection, 
-                                        docs=split_docs
+                                        docs=split_docs,
+                                        tenant=tenant
+                                        )
+
+            # Reads from the replicas wait for this position to see the new chunks.
+            write_lsn = pgvector_store.current_wal_lsn()
+
+            # IVFFlat collections: train the index once there is enough data, retrain when it grew a lot.
+            index_plan = pgvector_store.ivfflat_training_plan(
+                                        collection,
+                                        min_rows=IVFFLAT_MIN_TRAIN_ROWS,
+                                        growth_factor=IVFFLAT_RETRAIN_GROWTH
                                         )
 
         return {
@@ -86,6 +119,8 @@ class IngestPipeline:
             "collection": collection,
             "documents": normalized_docs,
             "chunks_count": len(split_docs),
+            "index_plan": index_plan,
+            "write_lsn": write_lsn,
         }
 
 
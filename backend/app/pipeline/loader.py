@@ -3,6 +3,7 @@ import pdfplumber
 
 
 from app.core.hash_utils import compute_sha256
+from app.core.ingest_stages import stage
 from app.pipeline.pdf_table_extractor import extract_tables_from_pdf
 from app.pipeline.docx_table_extractor import DocxTableExtractor
 
@@ -92,17 +93,20 @@ class DocumentLoader:
         Returns (text_docs, table_docs)
         """
         # Extract tables and bboxes in a single pass
-        table_docs, table_bboxes = extract_tables_from_pdf(
-            pdf_path=file_path,
-            flavor=self.table_extraction_flavor,
-            pages="all",
-            min_accuracy=self.min_table_accuracy,
-        )
+        with stage("camelot") as camelot_stage:
+            table_docs, table_bboxes = extract_tables_from_pdf(
+                pdf_path=file_path,
+                flavor=self.table_extraction_flavor,
+                pages="all",
+                min_accuracy=self.min_table_accuracy,
+            )
+            camelot_stage["tables"] = len(table_docs)
         
         docs = []
         
         try:
-            with pdfplumber.open(file_path) as pdf:
+            with stage("pdfplumber") as pdfplumber_stage, pdfplumber.open(file_path) as pdf:
+                pdfplumber_stage["pages"] = len(pdf.pages)
                 for page_num, page in enumerate(pdf.pages, start=1):
                     # Get the table bounding boxes for this page
                     page_table_bboxes = table_bboxes.get(page_num, [])
@@ -220,7 +224,8 @@ class DocumentLoader:
                 if table_docs:
                     logger.info(f"Extracted {len(table_docs)} table(s) from {p.name}")
 
-                file_hash = compute_sha256(p)
+                with stage("hash", bytes=p.stat().st_size):
+                    file_hash = compute_sha256(p)
 
                 enriched_docs: List[Document] = []
                 
@@ -1,9 +1,15 @@
 import os, dramatiq
 
 from dramatiq.brokers.redis import RedisBroker
+from dramatiq.middleware import CurrentMessage
 from dramatiq.results import Results
 from dramatiq.results.backends import RedisBackend
 
+from app.core.metrics import MetricsMiddleware
+from app.core.tracing import TracingMiddleware
+from app.core.profiling import ProfilingMiddleware
+from app.config.config import WORKER_METRICS_PORT
+
 password = os.getenv("REDIS_PASSWORD", "")
 host = os.getenv("REDIS_HOST", "redis")
 port = os.getenv("REDIS_PORT", "6379")
@@ -14,6 +20,10 @@ results_backend = RedisBackend(url=REDIS_URL)
 
 broker = RedisBroker(url=REDIS_URL)
 broker.add_middleware(Results(backend=results_backend))
+broker.add_middleware(CurrentMessage())
+broker.add_middleware(MetricsMiddleware(port=WORKER_METRICS_PORT))
+broker.add_middleware(TracingMiddleware())
+broker.add_middleware(ProfilingMiddleware())
 dramatiq.set_broker(broker)
 
 print("[Worker] Broker + Results middleware initialized")
@@ -21,4 +31,5 @@ print("[Worker] Broker + Results middleware initialized")
 # Actors
 
 from .ingest import ingest_document, validate_and_promote
-from .generate import generate_answer
\ No newline at end of file
+from .generate import generate_answer
+from .collections import build_collection_index, reindex_collection, tune_collection_search
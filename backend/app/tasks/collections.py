@@ -0,0 +1,278 @@
+import logging
+
+import dramatiq
+
+from functools import partial
+
+from typing import Any, Dict, List, Optional
+
+from app.core.pgvector.factory import get_vector_store
+from app.core.pgvector.sharded_store import ShardedPgVectorStore
+from app.core.pgvector.tuning import tune_collection
+from app.core.redis_config import redis_client
+from app.config.config import (
+    INDEX_BUILD_MAINTENANCE_WORK_MEM,
+    INDEX_BUILD_PARALLEL_WORKERS,
+    SEARCH_TUNING_KS,
+)
+
+logger = logging.getLogger(__name__)
+
+INDEX_JOB_PREFIX = "knowhub:index-job"
+INDEX_JOB_TTL_SECONDS = 24 * 60 * 60
+
+
+def _index_job_key(collection: str) -> str:
+    return f"{INDEX_JOB_PREFIX}:{collection.lower()}"
+
+
+def _release_index_job(collection: str):
+    try:
+        redis_client.delete(_index_job_key(collection))
+    except Exception as e:
+        logger.error(f"Error releasing index job key of '{collection}': {str(e)}")
+
+
+def schedule_index_job(collection: str, plan: Optional[Dict[str, Any]]) -> Optional[str]:
+    """
+    Enqueues the IVFFlat (re)training planned by PgVectorStore.ivfflat_training_plan().
+
+    Only one index job per collection is enqueued at a time: ingest jobs finishing
+    together would otherwise all ask for the same build.
+
+    Returns:
+        The job id, or None if nothing was enqueued
+    """
+    if not plan:
+        return None
+
+    key = _index_job_key(collection)
+    if not redis_client.set(key, plan["action"], nx=True, ex=INDEX_JOB_TTL_SECONDS):
+        logger.info(f"An index job is already scheduled for '{collection}', skipping {plan['action']}")
+        return None
+
+    try:
+        if plan["action"] == "build":
+            msg = build_collection_index.send(collection=collection.lower())
+        else:
+            msg = reindex_collection.send(collection=collection.lower()) # lists are recomputed from the row count
+    except Exception:
+        redis_client.delete(key)
+        raise
+
+    logger.info(f"Scheduled IVFFlat {plan['action']} of '{collection}' ({plan['rows']} rows, {plan['lists']} lists): {msg.message_id}")
+    return msg.message_id
+
+
+@dramatiq.actor(
+    store_results=True,
+    max_retries=0, # A failed build is better investigated than blindly retried
+    queue_name="collections",
+    time_limit=24 * 60 * 60 * 1000, # Index builds on large collections take hours, not minutes
+)
+def build_collection_index(
+    collection: str,
+    maintenance_work_mem: Optional[str] = None,
+    parallel_workers: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Builds the deferred ANN index of a bulk-loaded collection.
+
+    Args:
+        collection: Collection created with defer_index=True
+        maintenance_work_mem: Memory for the build (defaults to INDEX_BUILD_MAINTENANCE_WORK_MEM)
+        parallel_workers: Parallel maintenance workers (defaults to INDEX_BUILD_PARALLEL_WORKERS)
+
+    Returns:
+        Dictionary with the index name, build time and size
+    """
+    if parallel_workers is None and INDEX_BUILD_PARALLEL_WORKERS >= 0:
+        parallel_workers = INDEX_BUILD_PARALLEL_WORKERS
+
+    logger.info(f"Building ANN index of collection '{collection}'")
+
+    store = get_vector_store()
+    try:
+        if not store.table_exists(collection):
+            return {
+                "status": "error",
+                "error": f"Collection '{collection}' does not exist.",
+                "collection": collection,
+            }
+
+        result = store.build_vector_index(
+            collection,
+            maintenance_work_mem=maintenance_work_mem or INDEX_BUILD_MAINTENANCE_WORK_MEM,
+            parallel_workers=parallel_workers,
+        )
+
+        # Search parameters are tuned for a given index, tune the new one.
+        tune_msg = tune_collection_search.send(collection=collection)
+        return {"status": "success", "tune_job_id": tune_msg.message_id, **result}
+    finally:
+        store.close()
+        _release_index_job(collection)
+
+
+@dramatiq.actor(
+    store_results=True,
+    max_retries=0,
+    queue_name="collections",
+    time_limit=24 * 60 * 60 * 1000,
+)
+def reindex_collection(
+    collection: str,
+    index_type: Optional[str] = None,
+    index_params: Optional[Dict[str, Any]] = None,
+    min_recall: float = 0.9,
+    sample_size: int = 50,
+    maintenance_work_mem: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Rebuilds the ANN index of a collection online with new parameters (or another index type).
+
+    Args:
+        collection: Collection to reindex
+        index_type: "hnsw" or "ivfflat", None keeps the current type
+        index_params: New index parameters, e.g. {"m": 16, "ef_construction": 200} or {"lists": 500}
+        min_recall: Minimum recall@10 of the new index on sample queries, otherwise the old index is kept
+        sample_size: Number of sample queries of the recall check
+        maintenance_work_mem: Memory for the build (defaults to INDEX_BUILD_MAINTENANCE_WORK_MEM)
+
+    Returns:
+        Dictionary with the swap status and the recall of the old and new index
+    """
+    logger.info(f"Reindexing collection '{collection}' ({index_type}, {index_params})")
+
+    store = get_vector_store()
+    try:
+        if not store.table_exists(collection):
+            return {
+                "status": "error",
+                "error": f"Collection '{collection}' does not exist.",
+                "collection": collection,
+            }
+
+        result = store.reindex_collection(
+            collection,
+            index_type=index_type,
+            index_params=index_params,
+            min_recall=min_recall,
+            sample_size=sample_size,
+            maintenance_work_mem=maintenance_work_mem or INDEX_BUILD_MAINTENANCE_WORK_MEM,
+        )
+
+        if result.get("status") in ("swapped", "mixed"): # mixed: some shards swapped
+            result["tune_job_id"] = tune_collection_search.send(collection=collection).message_id
+        return result
+    finally:
+        store.close()
+        _release_index_job(collection)
+
+
+@dramatiq.actor(
+    store_results=True,
+    max_retries=1,
+    queue_name="collections",
+    time_limit=2 * 60 * 60 * 1000,
+)
+def tune_collection_search(
+    collection: str,
+    ks: Optional[List[int]] = None,
+    recall_target: Optional[float] = None,
+    sample_size: int = 100,
+) -> Dict[str, Any]:
+    """
+    Tunes ef_search (HNSW) or probes (IVFFlat) of a collection for a recall target.
+
+    Args:
+        collection: Collection to tune
+        ks: Values of k to tune for (defaults to SEARCH_TUNING_KS)
+        recall_target: Recall@k to reach (defaults to the recall target of the collection)
+        sample_size: Number of held-out queries
+
+    Returns:
+        Dictionary with the tuned value per k
+    """
+    logger.info(f"Tuning search parameters of collection '{collection}'")
+
+    store = get_vector_store()
+    try:
+        if not store.table_exists(collection):
+            return {
+                "status": "error",
+                "error": f"Collection '{collection}' does not exist.",
+                "collection": collection,
+            }
+
+        # Sharded collections are tuned shard by shard, each one searches with its own values.
+        tune = store.tune_search if isinstance(store, ShardedPgVectorStore) else partial(tune_collection, store)
+        tuning = tune(
+            collection,
+            ks=ks or SEARCH_TUNING_KS,
+            recall_target=recall_target,
+            sample_size=sample_size,
+        )
+        return {"status": "success", "collection": collection, "tuning": tuning}
+    finally:
+        store.close()
+
+
+@dramatiq.actor(
+    store_results=True,
+    max_retries=0,
+    queue_name="collections",
+    time_limit=24 * 60 * 60 * 1000,
+)
+def build_source_indexes(
+    collection: str,
+    sources: Optional[List[str]] = None,
+    min_rows: int = 50000,
+    maintenance_work_mem: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Builds partial ANN indexes for the hot sources of a collection.
+
+    Args:
+        collection: Collection to index
+        sources: Sources to index, None for every source with at least min_rows rows
+        min_rows: Minimum number of rows of a hot source (when sources is None)
+        maintenance_work_mem: Memory for the builds (defaults to INDEX_BUILD_MAINTENANCE_WORK_MEM)
+
+    Returns:
+        Dictionary with one entry per built index
+    """
+    store = get_vector_store()
+    try:
+        if not store.table_exists(collection):
+            return {
+                "status": "error",
+                "error": f"Collection '{collection}' does not exist.",
+                "collection": collection,
+            }
+
+        if sources is None:
+            sources = [entry["source"] for entry in store.hot_sources(collection, min_rows=min_rows)]
+
+        logger.info(f"Building partial indexes of '{collection}' for {len(sources)} sources")
+
+        indexes, errors = [], []
+        for source in sources:
+            try:
+                indexes.append(store.create_source_index(
+                    collection,
+                    source,
+                    maintenance_work_mem=maintenance_work_mem or INDEX_BUILD_MAINTENANCE_WORK_MEM,
+                ))
+            except Exception as e:
+                logger.error(f"Partial index of '{collection}' for '{source}' failed: {e}", exc_info=True)
+                errors.append({"source": source, "error": str(e)})
+
+        return {
+            "status": "success" if not errors else "partial",
+            "collection": collection,
+            "indexes": indexes,
+            "errors": errors,
+        }
+    finally:
+        store.close()
@@ -4,45 +4,64 @@ import json
 import time 
 import os
 
-from typing import Dict, Any, List, Optional
-from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import datetime, timezone
 
+from dramatiq.middleware import CurrentMessage
 from dramatiq.results import Results
 from dramatiq.results.backends import RedisBackend
 
 from app.core.pgvector.pgvector import PgVectorStore
-from app.config.config import PGVECTOR_DSN
-from app.config.paths import SESSIONS_DIR
+from app.core.pgvector.factory import get_vector_store
 from app.core.redis_config import redis_client
+from app.core import job_coalescing
+from app.core.read_your_writes import required_lsn
+from app.core.query_vectors import wait_query_vector
+from app.core.session_store import get_session_sink
+from app.core.metrics import LLM_GENERATION_SECONDS, LLM_TOKENS_PER_SECOND, LLM_TTFT_SECONDS, timed
+from app.core.tracing import span
 
 STREAM_PREFIX = "knowhub:stream"
 STREAM_TTL_SECONDS = 3600
+QVEC_WAIT_SECONDS = 2.0  # How long a worker waits for the query vector computed by the API.
 
 from app.core.generator.llmprovider import LLMFactory
 from app.core.promptbuilder import PromptBuilder, PromptType
 from app.config.llm_settings import llm_settings
+from app.config.retrieval_settings import retrieval_settings
+from app.core.reranker import get_reranker
 
 logger = logging.getLogger(__name__)
 
 results_backend = RedisBackend(client=redis_client)
 
+def _open_store() -> PgVectorStore:
+    """
+    Store of the generation jobs, its retrieval reads go to the replicas if there are some
+    (ingestion and index builds keep the primary busy), or fan out to the shards.
+    """
+    return get_vector_store(read_replicas=True)
+
 def _build_context(chunks: List[Dict[str, Any]]) -> str:
     """
     Builds context from retrieved chunks.
     """
-    context_parts = []
-    
-    for i, chunk in enumerate(chunks, 1):
-        text = chunk.get('text', '')
-        source = chunk.get('source', 'Unknown')
-        page = chunk.get('page', 'N/A')
-        distance = chunk.get('distance', 0.0)
-        
-        context_parts.append(
-            f"[Chunk number {i} - {source} (page {page}) - distance: {distance:.3f}]\n{text}\n"
-        )
-    
-    return "\n---\n".join(context_parts)
+    with span("generate.build_context", chunks=len(chunks)) as attrs:
+        context_parts = []
+
+        for i, chunk in enumerate(chunks, 1):
+            text = chunk.get('text', '')
+            source = chunk.get('source', 'Unknown')
+            page = chunk.get('page', 'N/A')
+            distance = chunk.get('distance', 0.0)
+
+            context_parts.append(
+                f"[Chunk number {i} - {source} (page {page}) - distance: {distance:.3f}]\n{text}\n"
+            )
+
+        context = "\n---\n".join(context_parts)
+        attrs["chars"] = len(context)
+        return context
 
 def _get_chunk_numbers(retrieved_chunks: List[Dict[str, Any]]) -> Dict[str, List[int]]:
     """
@@ -68,6 +87,67 @@ def _get_unique_source(retrieved_chunks: List[Dict[str, Any]]) -> List[str]:
         sources.add(source)
     return list(sources)
 
+def _retrieve_chunks(
+    store: PgVectorStore,
+    collection: str,
+    query: str,
+    k: int,
+    sources: Optional[List[str]] = None,
+    rerank: Optional[bool] = None,
+    rerank_candidates: Optional[int] = None,
+    query_vector: Optional[List[float]] = None,
+    ef_search: Optional[int] = None,
+    tenant: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], float, float]:
+    """
+    Retrieves the chunks given to the LLM, with an optional cross-encoder rerank stage.
+
+    When reranking, a wider candidate set is fetched from PGVector and only the
+    k best chunks according to the cross-encoder are kept.
+
+    Returns:
+        (chunks, retrieval_time_ms, rerank_time_ms)
+    """
+    if rerank is None:
+        rerank = retrieval_settings.RERANK_ENABLED
+
+    fetch_k = max(k, rerank_candidates or retrieval_settings.RERANK_CANDIDATES) if rerank else k
+
+    # Right after an ingestion of the collection, only replicas that replayed it can answer.
+    min_lsn = required_lsn(collection) if store.replicas is not None else None
+
+    retrieval_start = time.time()
+    chunks = store.read_embeddings(
+        table=collection,
+        prompt=query,
+        k=fetch_k,
+        sources=sources,
+        query_vector=query_vector,
+        ef_search=ef_search, # None: value tuned for the collection and k
+        tenant=tenant,
+        min_lsn=min_lsn,
+    )
+    retrieval_time = (time.time() - retrieval_start) * 1000
+
+    shard_timings = getattr(store, "last_shard_timings", None)
+    if shard_timings:
+        logger.info(f"Retrieval per shard: {shard_timings}")
+
+    rerank_time = 0.0
+    if rerank and chunks:
+        candidates = len(chunks)
+        rerank_start = time.time()
+        try:
+            chunks = get_reranker().rerank(query, chunks, top_n=k)
+        except Exception as e:
+            # The vector order is still a valid answer, we don't fail the generation for it.
+            logger.error(f"Reranking failed, keeping vector order: {str(e)}", exc_info=True)
+            chunks = chunks[:k]
+        rerank_time = (time.time() - rerank_start) * 1000
+        logger.info(f"Reranked {candidates} candidates down to {len(chunks)} chunks in {rerank_time:.2f}ms")
+
+    return chunks, retrieval_time, rerank_time
+
 def _generate_with_llm(
         query: str,
         context: str,
@@ -88,12 +168,15 @@ def _generate_with_llm(
             model=llm_settings.LLM_MODEL,
             temperature=temperature,
             api_key=llm_settings.OPENAI_API_KEY if llm_settings.LLM_PROVIDER == "openai" else llm_settings.ANTHROPIC_API_KEY,
+            base_url=llm_settings.OPENAI_BASE_URL if llm_settings.LLM_PROVIDER == "openai" else None,
         )
 
         logger.info(f"messages for LLM: {messages}")
 
         # Now we have an instance of the choosen provider (by the user).
-        answer = llm.generate_chat(messages=messages)
+        with span("llm.complete", provider=llm_settings.LLM_PROVIDER, model=llm_settings.LLM_MODEL):
+            with timed(LLM_GENERATION_SECONDS, model=llm_settings.LLM_MODEL, mode="complete"):
+                answer = llm.generate_chat(messages=messages)
         
         return answer
     
@@ -124,22 +207,48 @@ def _stream_with_llm(
             model=llm_settings.LLM_MODEL,
             temperature=temperature,
             api_key=llm_settings.OPENAI_API_KEY if llm_settings.LLM_PROVIDER == "openai" else llm_settings.ANTHROPIC_API_KEY,
+            base_url=llm_settings.OPENAI_BASE_URL if llm_settings.LLM_PROVIDER == "openai" else None,
         )
 
         logger.info(f"messages for LLM: {messages}")
 
-        try:
-            for token in llm.stream_chat(messages=messages, max_tokens=max_tokens):
-                yield token
-        except NotImplementedError:
-            answer = llm.generate_chat(messages=messages, max_tokens=max_tokens)
-            yield answer
+        start = time.perf_counter()
+        tokens = 0
+        # The span covers the time spent by the consumer on each token too (publishing it).
+        with span("llm.stream", provider=llm_settings.LLM_PROVIDER, model=llm_settings.LLM_MODEL, max_tokens=max_tokens) as attrs:
+            try:
+                for token in llm.stream_chat(messages=messages, max_tokens=max_tokens):
+                    if tokens == 0:
+                        ttft = time.perf_counter() - start
+                        LLM_TTFT_SECONDS.labels(model=llm_settings.LLM_MODEL).observe(ttft)
+                        attrs["ttft_ms"] = round(ttft * 1000, 2)
+                    tokens += 1 # Streamed chunks, one token each for the OpenAI-compatible providers
+                    yield token
+
+                elapsed = time.perf_counter() - start
+                LLM_GENERATION_SECONDS.labels(model=llm_settings.LLM_MODEL, mode="stream").observe(elapsed)
+                if tokens and elapsed > 0:
+                    LLM_TOKENS_PER_SECOND.labels(model=llm_settings.LLM_MODEL).observe(tokens / elapsed)
+            except NotImplementedError:
+                attrs["fallback"] = "generate_chat"
+                answer = llm.generate_chat(messages=messages, max_tokens=max_tokens)
+                yield answer
+            finally:
+                attrs["tokens"] = tokens
 
     except Exception as e:
         logger.error(f"LLM streaming error: {str(e)}", exc_info=True)
         raise
 
 def _stream_publish(stream_key: str, event_type: str, data: Any):
+    # Tokens are published inside the llm.stream span, one span per token would flood the trace.
+    if event_type == "token":
+        _xadd_event(stream_key, event_type, data)
+        return
+    with span("generate.stream_publish", event=event_type, stream=stream_key):
+        _xadd_event(stream_key, event_type, data)
+
+def _xadd_event(stream_key: str, event_type: str, data: Any):
     payload = json.dumps(data, ensure_ascii=False)
     redis_client.xadd(
         stream_key,
@@ -148,7 +257,22 @@ def _stream_publish(stream_key: str, event_type: str, data: Any):
     redis_client.expire(stream_key, STREAM_TTL_SECONDS)
 
 
-def _save_session_to_json(
+def _release_inflight(coalesce_key: Optional[str], job_id: Optional[str] = None):
+    """
+    Lets new identical requests start their own job once this one is finished.
+    """
+    if not coalesce_key:
+        return
+
+    if job_id is None:
+        message = CurrentMessage.get_current_message()
+        job_id = message.message_id if message else None
+
+    if job_id:
+        job_coalescing.release(coalesce_key, job_id)
+
+
+def _save_session(
     job_id: str,
     query: str,
     answer: str,
@@ -157,27 +281,21 @@ def _save_session_to_json(
     metadata: Dict[str, Any]
 ):
     """
-    Save the session data to a JSON file.
+    Queues the session record for the session sink (flushed in the background).
     """
 
     try:
-        os.makedirs(SESSIONS_DIR, exist_ok=True)
-
         session_data = {
             "job_id": job_id,
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
             "query": query,
             "answer": answer,
             "collection": collection,
             "sources": sources,
             "metadata": metadata
-        }  
+        }
 
-        filepath = os.path.join(SESSIONS_DIR, f"{job_id}.json")
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(session_data, f, ensure_ascii=False, indent=4)
-        
-        logger.info(f"Session data saved to {filepath}")
+        get_session_sink().write(session_data)
     except Exception as e:
         logger.error(f"Error saving session data: {str(e)}", exc_info=True)
 
@@ -194,6 +312,12 @@ def generate_answer_stream(
     sources: Optional[List[str]] = None,
     max_tokens: int = 2048,
     temperature: float = 0.7,
+    rerank: Optional[bool] = None,
+    rerank_candidates: Optional[int] = None,
+    coalesce_key: Optional[str] = None,
+    speculative_embedding: bool = False,
+    ef_search: Optional[int] = None,
+    tenant: Optional[str] = None,
 ):
     stream_key = f"{STREAM_PREFIX}:{job_id}"
 
@@ -205,25 +329,36 @@ def generate_answer_stream(
     )
 
     start_time = time.time()
-    store = PgVectorStore(dsn=PGVECTOR_DSN)
+    store = _open_store()
 
     full_answer = ""
 
     try:
-        if not store.table_exists(collection):
+        # Same replica requirement as the retrieval, a collection just created by an ingestion exists there too.
+        if not store.table_exists(collection, min_lsn=required_lsn(collection) if store.replicas is not None else None):
             error_msg = f"Collection '{collection}' does not exist."
             logger.warning(error_msg)
             _stream_publish(stream_key, "error", {"error": error_msg})
             return
 
-        retrieval_start = time.time()
-        retrieved_chunks = store.read_embeddings(
-            table=collection,
-            prompt=query,
+        # The API started embedding the query when it enqueued the job, pick the vector up
+        # instead of calling the embedding service again (falls back to it if not available).
+        query_vector = None
+        if speculative_embedding:
+            query_vector = wait_query_vector(job_id, timeout_seconds=QVEC_WAIT_SECONDS)
+
+        retrieved_chunks, retrieval_time, rerank_time = _retrieve_chunks(
+            store=store,
+            collection=collection,
+            query=query,
             k=k,
             sources=sources,
+            rerank=rerank,
+            rerank_candidates=rerank_candidates,
+            query_vector=query_vector,
+            ef_search=ef_search,
+            tenant=tenant,
         )
-        retrieval_time = (time.time() - retrieval_start) * 1000
 
         if not retrieved_chunks:
             no_info_msg = "I'm sorry, I couldn't find any relevant information to answer your question."
@@ -241,13 +376,14 @@ def generate_answer_stream(
                     "sources": [],
                     "retrieved_chunks": 0,
                     "retrieval_time_ms": retrieval_time,
+                    "rerank_time_ms": rerank_time,
                     "generation_time_ms": 0,
                     "total_time_ms": (time.time() - start_time) * 1000,
                 },
             )
             
             # We even save if no chunks were retrieved (audit)
-            _save_session_to_json(
+            _save_session(
                 job_id=job_id,
                 query=query,
                 answer=full_answer,
@@ -256,6 +392,7 @@ def generate_answer_stream(
                 metadata={
                     "retrieved_chunks": 0,
                     "retrieval_time_ms": retrieval_time,
+                    "rerank_time_ms": rerank_time,
                     "generation_time_ms": 0,
                     "total_time_ms": (time.time() - start_time) * 1000,
                 }
@@ -282,8 +419,11 @@ def generate_answer_stream(
         metadata = {
             "retrieved_chunks": len(retrieved_chunks),
             "retrieval_time_ms": retrieval_time,
+            "rerank_time_ms": rerank_time,
             "generation_time_ms": generation_time,
             "total_time_ms": total_time,
+            "speculative_embedding_hit": query_vector is not None,
+            "shard_timings": getattr(store, "last_shard_timings", None),
             "chunk_map": chunk_map,
             "temperature": temperature,
             "max_tokens": max_tokens,
@@ -293,7 +433,7 @@ def generate_answer_stream(
         _stream_publish(stream_key, "done", {**metadata, "sources": unique_chunk_sources})
         
         # Sauvegarder la session complète
-        _save_session_to_json(
+        _save_session(
             job_id=job_id,
             query=query,
             answer=full_answer,
@@ -307,7 +447,8 @@ def generate_answer_stream(
         _stream_publish(stream_key, "error", {"error": str(e)})
 
     finally:
-        store.pg_pool.disconnect()
+        store.close()
+        _release_inflight(coalesce_key, job_id)
 
 
 
@@ -320,11 +461,15 @@ def generate_answer(
     query: str,
     collection: str,
     k: int = 10,
-    ef_search: Optional[int] = 150,
+    ef_search: Optional[int] = None,
     sources: Optional[List[str]] = None,
     threshold: Optional[float] = None,
     max_tokens: int = 2048,
     temperature: float = 0.7,
+    rerank: Optional[bool] = None,
+    rerank_candidates: Optional[int] = None,
+    coalesce_key: Optional[str] = None,
+    tenant: Optional[str] = None,
 ) -> Dict[str, Any]:
     """
     RAG generation task: retrieval + generation.
@@ -333,11 +478,15 @@ def generate_answer(
         query: User query
         collection: Collection to search
         k: Number of chunks to retrieve
-        ef_search: HNSW search parameter
+        ef_search: HNSW search parameter, None for the value tuned for the collection
         sources: Filter by sources
         threshold: Similarity threshold
         max_tokens: Max tokens for generation
         temperature: Generation temperature
+        rerank: Rerank a wider candidate set with the cross-encoder (defaults to RERANK_ENABLED)
+        rerank_candidates: Number of candidates retrieved before reranking
+        coalesce_key: Single-flight key released when the job is done (set by the API)
+        tenant: Tenant of a collection partitioned by tenant
         
     Returns:
         Dictionary with answer, sources, and metadata
@@ -350,12 +499,11 @@ def generate_answer(
     try:
         # Step 1: Retrieve relevant chunks from PGVector
         logger.info(f"Step 1/2: Retrieving {k} chunks from '{collection}'")
-        retrieval_start = time.time()
 
-        store = PgVectorStore(dsn=PGVECTOR_DSN)
+        store = _open_store()
 
         try:
-            if not store.table_exists(collection):
+            if not store.table_exists(collection, min_lsn=required_lsn(collection) if store.replicas is not None else None):
                 error_msg = f"Collection '{collection}' does not exist."
                 return {
                     "status": "error",
@@ -364,14 +512,18 @@ def generate_answer(
                 }
             
             # Retrieve relevant chunks
-            retrieved_chunks = store.read_embeddings(
-                table=collection,
-                prompt=query,
+            retrieved_chunks, retrieval_time, rerank_time = _retrieve_chunks(
+                store=store,
+                collection=collection,
+                query=query,
                 k=k,
                 sources=sources,
+                rerank=rerank,
+                rerank_candidates=rerank_candidates,
+                ef_search=ef_search,
+                tenant=tenant,
             )
             
-            retrieval_time = (time.time() - retrieval_start) * 1000
             logger.info(f"Retrieved {len(retrieved_chunks)} chunks in {retrieval_time:.2f}ms")
             logger.info(f"Sources retrieved: {[chunk for chunk in retrieved_chunks]}")
 
@@ -387,6 +539,7 @@ def generate_answer(
                     "sources": [],
                     "retrieved_chunks": 0,
                     "retrieval_time_ms": retrieval_time,
+                    "rerank_time_ms": rerank_time,
                     "generation_time_ms": 0,
                     "total_time_ms": (time.time() - start_time) * 1000
                 }
@@ -417,13 +570,15 @@ def generate_answer(
                 "sources": unique_chunk_sources,
                 "retrieved_chunks": len(retrieved_chunks),
                 "retrieval_time_ms": retrieval_time,
+                "rerank_time_ms": rerank_time,
                 "generation_time_ms": generation_time,
                 "total_time_ms": total_time,
+                "shard_timings": getattr(store, "last_shard_timings", None),
                 "chunk_map": chunk_map
             }
 
         finally:
-            store.pg_pool.disconnect() # Close the session pool
+            store.close() # Close the session pools
 
     except Exception as e:
         logger.error(f"Error during RAG generation: {str(e)}", exc_info=True)
@@ -433,3 +588,6 @@ def generate_answer(
             "query": query
         }
 
+    finally:
+        _release_inflight(coalesce_key)
+
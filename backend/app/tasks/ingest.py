@@ -6,21 +6,22 @@ import tempfile
 from dramatiq.middleware import SkipMessage
 
 from pathlib import Path
+from typing import Optional
 
 from . import results_backend
 
-from app.core.minio_client import MinioClient
-from minio.commonconfig import CopySource
+from app.core.minio_client import get_minio_client
 
 from app.core.hash_utils import verify_sha256
 from app.core.settings import Settings
+from app.core.ingest_stages import StageRecorder, stage
 
-from app.pipeline.ingest_pipeline import IngestPipeline
-from app.pipeline.loader import DocumentLoader
+from .collections import schedule_index_job
+from app.core.read_your_writes import record_write
+from app.config.config import READ_YOUR_WRITES_SECONDS
 
 
 logger = logging.getLogger(__name__)
-minio_client = MinioClient()
 
 
 class IngestError(Exception):
@@ -31,18 +32,27 @@ def validate_and_promote(doc_id: str,
                          s3_key: str, 
                          filename: str, 
                          collection: str, 
-                         checksum_sha256: str
+                         checksum_sha256: str,
+                         tenant: Optional[str] = None
                          ):
-    with tempfile.TemporaryDirectory(prefix="ingest_") as tmpdir:
+    from minio.commonconfig import CopySource
+
+    minio_client = get_minio_client()
+    # Stage timings go to the job result and, live, to the knowhub:ingest:<doc_id> stream.
+    with StageRecorder(doc_id, "validate") as recorder, tempfile.TemporaryDirectory(prefix="ingest_") as tmpdir:
         local = Path(tmpdir) / filename
-        download_path, meta = minio_client.get_file(
-            key=s3_key,
-            dest_path=str(local)
-        )
+        with stage("download") as download_stage:
+            download_path, meta = minio_client.get_file(
+                key=s3_key,
+                dest_path=str(local)
+            )
+            download_stage["bytes"] = meta.get("size")
 
         # Check file type here later.
 
-        if not verify_sha256(download_path, checksum_sha256):
+        with stage("hash", bytes=meta.get("size")):
+            checksum_ok = verify_sha256(download_path, checksum_sha256)
+        if not checksum_ok:
             logger.error(f"Checksum mismatch for doc_id={doc_id}")
 
             minio_client.client.remove_object(minio_client.bucket, s3_key)
@@ -53,12 +63,13 @@ def validate_and_promote(doc_id: str,
         processed_key = s3_key.replace("uploads/", "processed/", 1)
 
         # Copy to processed/ then remove uploads/
-        minio_client.client.copy_object(
-            minio_client.bucket,
-            processed_key,
-            CopySource(minio_client.bucket, s3_key)
-        )
-        minio_client.client.remove_object(minio_client.bucket, s3_key)
+        with stage("promote"):
+            minio_client.client.copy_object(
+                minio_client.bucket,
+                processed_key,
+                CopySource(minio_client.bucket, s3_key)
+            )
+            minio_client.client.remove_object(minio_client.bucket, s3_key)
 
         # Enqueue next step
         next_msg = ingest_document.send(
@@ -66,6 +77,7 @@ def validate_and_promote(doc_id: str,
             s3_key=processed_key,
             filename=filename,
             collection=collection,
+            tenant=tenant,
         )
 
         
@@ -77,13 +89,15 @@ def validate_and_promote(doc_id: str,
             "next_job_id": next_msg.message_id,
             "actor": next_msg.actor_name,
             "meta": {"size": meta.get("size"), "etag": meta.get("etag")},
+            "stages": recorder.stages,
         }
 
 @dramatiq.actor(store_results=True, max_retries=3, queue_name="ingest-process", throws=(IngestError,))
 def ingest_document(doc_id: str, 
                     s3_key: str, 
                     filename: str, 
-                    collection: str
+                    collection: str,
+                    tenant: Optional[str] = None
                     ):
     
     allowed_extensions = Settings.get_allowed_extensions()
@@ -93,16 +107,23 @@ def ingest_document(doc_id: str,
         logger.error(f"File extension not allowed: {filename}")
         raise IngestError(f"File extension not allowed: {filename}")
     
-    with tempfile.TemporaryDirectory(prefix="ingest_") as tmpdir:
+    with StageRecorder(doc_id, "ingest") as recorder, tempfile.TemporaryDirectory(prefix="ingest_") as tmpdir:
         local_path = Path(tmpdir) / filename
         local_path.parent.mkdir(parents=True, exist_ok=True)
 
-        downloaded_path, meta = minio_client.get_file(
-            key=s3_key,
-            dest_path=str(local_path),
-        )
+        with stage("download") as download_stage:
+            downloaded_path, meta = get_minio_client().get_file(
+                key=s3_key,
+                dest_path=str(local_path),
+            )
+            download_stage["bytes"] = meta.get("size")
 
 
+        # The parsing stack (pdfplumber, camelot, langchain loaders) is only loaded by the
+        # workers that process documents, not by the API that enqueues them.
+        from app.pipeline.ingest_pipeline import IngestPipeline
+        from app.pipeline.loader import DocumentLoader
+
         loader = DocumentLoader()
         pipeline = IngestPipeline(
             loader=loader,
@@ -110,15 +131,28 @@ def ingest_document(doc_id: str,
         docs = pipeline.ingest(
             file_paths=[downloaded_path],
             doc_id=doc_id,
-            collection=collection
+            collection=collection,
+            tenant=tenant
         )
 
         # TODO: split -> embeddings -> upsert pgvector here
 
+        record_write(collection, docs.get("write_lsn"), READ_YOUR_WRITES_SECONDS)
+
+        index_job_id = None
+        try:
+            index_job_id = schedule_index_job(collection, docs.get("index_plan"))
+        except Exception as e:
+            # The documents are in, the index job will be planned again by the next ingestion.
+            logger.error(f"Error scheduling the index job of '{collection}': {str(e)}")
+
         return {
             "stage": "indexed",
             "doc_id": doc_id,
             "processed_key": s3_key,
             "pages_loaded": len(docs.get("documents", [])),
             "collection": collection,
+            "index_job_id": index_job_id,
+            "chunks_count": docs.get("chunks_count", 0),
+            "stages": recorder.stages,
         }
\ No newline at end of file
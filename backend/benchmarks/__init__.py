@@ -0,0 +1,3 @@
+"""
+Benchmarks of the ingest and retrieval paths, run from backend/ with `python -m benchmarks.<name>`.
+"""
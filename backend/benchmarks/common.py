@@ -0,0 +1,214 @@
+import hashlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from app.core.ingest_stages import StageRecorder
+from app.core.pgvector.pgvector_utils import PgVectorUtils
+
+
+def fake_embedding(text: str, dim: int) -> List[float]:
+    """
+    Deterministic unit vector of a text (seeded by its sha256), same text same vector on every run.
+    """
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dim)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+class FakeEmbedUtils(PgVectorUtils):
+    """
+    Embedding client returning fake_embedding() vectors: measures everything but the model.
+    """
+
+    def __init__(self, dim: int = 1024):
+        super().__init__(embed_endpoint="fake://")
+        self.dim = dim
+
+    def embed(self, texts: List[str], priority: str = "interactive") -> List[List[float]]:
+        return [fake_embedding(text, self.dim) for text in texts]
+
+
+class LocalEmbedUtils(PgVectorUtils):
+    """
+    Embedding client running the model in the benchmark process (no HTTP hop).
+    """
+
+    def __init__(self):
+        super().__init__(embed_endpoint="local://")
+
+    def embed(self, texts: List[str], priority: str = "interactive") -> List[List[float]]:
+        from app.api.v1.routes.embed import compute_embeddings
+        return compute_embeddings(texts)
+
+
+def get_embed_utils(embedder: str, dim: int = 1024) -> PgVectorUtils:
+    """
+    fake (deterministic vectors), local (model in process) or service (the deployed embedding endpoint).
+    """
+    if embedder == "fake":
+        return FakeEmbedUtils(dim)
+    if embedder == "local":
+        return LocalEmbedUtils()
+    if embedder == "service":
+        return PgVectorUtils()
+    raise ValueError(f"Unknown embedder '{embedder}', expected fake, local or service")
+
+
+def _current_rss_mb() -> Optional[float]:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class RssSampler:
+    """
+    Samples the resident memory of the process every interval seconds in a background thread.
+
+    Gives the peak RSS within any past time window, where ru_maxrss only gives the
+    peak since the process started. Without /proc (macOS, Windows) the windows fall
+    back to ru_maxrss.
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: List[tuple] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+
+    def __enter__(self) -> "RssSampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+    def _run(self):
+        while not self._stop.is_set():
+            rss = _current_rss_mb()
+            if rss is not None:
+                self.samples.append((time.perf_counter(), rss))
+            self._stop.wait(self.interval)
+
+    def peak_between(self, start: float, end: float) -> Optional[float]:
+        window = [rss for t, rss in self.samples if start <= t <= end]
+        current = _current_rss_mb()
+        if current is not None:
+            window.append(current)
+        if not window:
+            # Peak since the process started (KiB on Linux).
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0 if resource is not None else None
+        return max(window)
+
+
+class BenchRecorder(StageRecorder):
+    """
+    StageRecorder that keeps the stages in memory only (no Redis) and adds the
+    peak RSS reached during each stage (stage_peak_rss_mb) from an RssSampler.
+    """
+
+    def __init__(self, name: str, sampler: RssSampler):
+        super().__init__(name, "benchmark", publish=False)
+        self.sampler = sampler
+
+    def add(self, entry: Dict[str, Any]):
+        end = time.perf_counter()
+        peak = self.sampler.peak_between(end - entry["wall_ms"] / 1000.0, end)
+        entry["stage_peak_rss_mb"] = round(peak, 1) if peak is not None else None
+        super().add(entry)
+
+
+def aggregate_stages(stages: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Sums the entries of each stage name (wall, CPU, counts), keeps the highest peak RSS.
+    """
+    totals: Dict[str, Dict[str, Any]] = {}
+    for entry in stages:
+        total = totals.setdefault(entry["stage"], {"calls": 0, "wall_ms": 0.0, "cpu_ms": 0.0, "stage_peak_rss_mb": None})
+        total["calls"] += 1
+        total["wall_ms"] += entry["wall_ms"]
+        total["cpu_ms"] += entry["cpu_ms"]
+        if entry.get("stage_peak_rss_mb") is not None:
+            total["stage_peak_rss_mb"] = max(total["stage_peak_rss_mb"] or 0.0, entry["stage_peak_rss_mb"])
+        for key, value in entry.items():
+            if key in ("stage", "status", "wall_ms", "cpu_ms", "peak_rss_mb", "rss_growth_mb", "stage_peak_rss_mb"):
+                continue
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                total[key] = total.get(key, 0) + value
+    for total in totals.values():
+        total["wall_ms"] = round(total["wall_ms"], 2)
+        total["cpu_ms"] = round(total["cpu_ms"], 2)
+    return totals
+
+
+def per_second(count: Optional[float], wall_ms: float) -> Optional[float]:
+    if not count or wall_ms <= 0:
+        return None
+    return round(count / (wall_ms / 1000.0), 2)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_info(config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    What a result is compared on: commit, machine and benchmark parameters.
+    """
+    return {
+        "commit": _git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "config": config,
+    }
+
+
+def default_output(name: str, results: Dict[str, Any]) -> str:
+    """
+    benchmarks/results/<name>_<short commit>.json, one file per commit to compare.
+    """
+    commit = (results.get("commit") or "local")[:8]
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "results", f"{name}_{commit}.json")
+
+
+def write_results(results: Dict[str, Any], path: str):
+    """
+    Writes the results as JSON to path, or to stdout if path is "-".
+    """
+    payload = json.dumps(results, indent=2, ensure_ascii=False, default=str)
+    if path == "-":
+        print(payload)
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(payload + "\n")
+    print(f"Results written to {path}")
@@ -0,0 +1,212 @@
+"""
+Synthetic documents of controlled size for the ingest benchmark.
+
+Every generator writes `pages` pages worth of text (LINES_PER_PAGE lines of
+WORDS_PER_LINE words drawn from a fixed vocabulary), seeded so that the same
+arguments always produce the same files. PDFs are written by hand (no PDF
+library needed), DOCX with python-docx and PPTX with python-pptx when installed.
+"""
+import random
+
+from pathlib import Path
+from typing import Dict, List
+
+LINES_PER_PAGE = 40
+WORDS_PER_LINE = 12
+TABLE_ROWS = 6
+TABLE_COLS = 4
+
+VOCABULARY = (
+    "invoice contract delivery warranty supplier customer payment schedule amount total "
+    "quarter revenue margin forecast budget report audit compliance policy procedure "
+    "maintenance installation component assembly specification tolerance voltage pressure "
+    "temperature sensor calibration inspection failure incident resolution escalation "
+    "network server database backup storage latency throughput capacity deployment release "
+    "the of and to in for with on by from at as is are was were be this that these those"
+).split()
+
+FORMATS = ("pdf", "pdf_tables", "docx", "pptx", "md")
+
+
+def _sentence(rng: random.Random, words: int = WORDS_PER_LINE) -> str:
+    text = " ".join(rng.choice(VOCABULARY) for _ in range(words))
+    return text[0].upper() + text[1:] + "."
+
+
+def _table(rng: random.Random) -> List[List[str]]:
+    header = ["Item", "Quantity", "Unit price", "Total"]
+    rows = [header]
+    for _ in range(TABLE_ROWS - 1):
+        quantity, price = rng.randint(1, 50), rng.randint(5, 900)
+        rows.append([rng.choice(VOCABULARY).capitalize(), str(quantity), f"{price}.00", f"{quantity * price}.00"])
+    return rows
+
+
+# PDF
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _pdf_page_content(rng: random.Random, with_table: bool) -> bytes:
+    ops = ["BT", "/F1 9 Tf", "11 TL", "50 790 Td"]
+    lines = LINES_PER_PAGE - (TABLE_ROWS + 2 if with_table else 0)
+    for _ in range(lines):
+        ops.append(f"({_pdf_escape(_sentence(rng))}) Tj T*")
+    ops.append("ET")
+
+    if with_table:
+        # Ruled table under the text: every cell border is drawn, which is what camelot's lattice mode detects.
+        left, top, col_w, row_h = 50, 790 - lines * 11 - 20, 120, 16
+        rows = _table(rng)
+        ops.append("0.8 w")
+        for r in range(len(rows) + 1):
+            y = top - r * row_h
+            ops.append(f"{left} {y} m {left + TABLE_COLS * col_w} {y} l S")
+        for c in range(TABLE_COLS + 1):
+            x = left + c * col_w
+            ops.append(f"{x} {top} m {x} {top - len(rows) * row_h} l S")
+        for r, row in enumerate(rows):
+            for c, cell in enumerate(row):
+                ops.append(f"BT /F1 9 Tf {left + c * col_w + 4} {top - (r + 1) * row_h + 5} Td ({_pdf_escape(cell)}) Tj ET")
+
+    return "\n".join(ops).encode("latin-1")
+
+
+def write_pdf(path: Path, pages: int, tables: bool = False, seed: int = 0) -> Path:
+    """
+    A4 PDF of `pages` text pages, each with a ruled table at the bottom if tables.
+    """
+    rng = random.Random(seed)
+    objects: Dict[int, bytes] = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    }
+    kids = []
+    for page in range(pages):
+        page_id, content_id = 4 + 2 * page, 5 + 2 * page
+        content = _pdf_page_content(rng, tables)
+        objects[content_id] = b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream"
+        objects[page_id] = (
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        kids.append(b"%d 0 R" % page_id)
+    objects[2] = b"<< /Type /Pages /Kids [" + b" ".join(kids) + b"] /Count %d >>" % pages
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for obj_id in sorted(objects):
+        offsets[obj_id] = len(out)
+        out += b"%d 0 obj\n" % obj_id + objects[obj_id] + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for obj_id in sorted(objects):
+        out += b"%010d 00000 n \n" % offsets[obj_id]
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+
+    path.write_bytes(bytes(out))
+    return path
+
+
+# DOCX / PPTX / Markdown
+
+def write_docx(path: Path, pages: int, tables: bool = True, seed: int = 0) -> Path:
+    """
+    DOCX with one heading and LINES_PER_PAGE / 4 paragraphs per page, and a table every page if tables.
+    """
+    from docx import Document as DocxDocument
+
+    rng = random.Random(seed)
+    doc = DocxDocument()
+    for page in range(pages):
+        doc.add_heading(f"Section {page + 1}", level=2)
+        for _ in range(LINES_PER_PAGE // 4):
+            doc.add_paragraph(" ".join(_sentence(rng) for _ in range(4)))
+        if tables:
+            rows = _table(rng)
+            table = doc.add_table(rows=len(rows), cols=TABLE_COLS)
+            table.style = "Table Grid"
+            for r, row in enumerate(rows):
+                for c, cell in enumerate(row):
+                    table.cell(r, c).text = cell
+    doc.save(str(path))
+    return path
+
+
+def write_pptx(path: Path, pages: int, seed: int = 0) -> Path:
+    """
+    PPTX with one slide per page (title and bullet points).
+    """
+    from pptx import Presentation
+
+    rng = random.Random(seed)
+    deck = Presentation()
+    layout = deck.slide_layouts[1]  # Title and content
+    for page in range(pages):
+        slide = deck.slides.add_slide(layout)
+        slide.shapes.title.text = f"Slide {page + 1}: {_sentence(rng, 4)}"
+        body = slide.placeholders[1].text_frame
+        body.text = _sentence(rng)
+        for _ in range(LINES_PER_PAGE // 4 - 1):
+            body.add_paragraph().text = _sentence(rng)
+    deck.save(str(path))
+    return path
+
+
+def write_markdown(path: Path, pages: int, seed: int = 0) -> Path:
+    """
+    Markdown with a level 2 heading per page, paragraphs and a pipe table.
+    """
+    rng = random.Random(seed)
+    parts = [f"# Synthetic document {seed}\n"]
+    for page in range(pages):
+        parts.append(f"## Section {page + 1}\n")
+        for _ in range(LINES_PER_PAGE // 4):
+            parts.append(" ".join(_sentence(rng) for _ in range(4)) + "\n")
+        rows = _table(rng)
+        parts.append("| " + " | ".join(rows[0]) + " |")
+        parts.append("|" + "---|" * TABLE_COLS)
+        parts.extend("| " + " | ".join(row) + " |" for row in rows[1:])
+        parts.append("")
+    path.write_text("\n".join(parts), encoding="utf-8")
+    return path
+
+
+def pptx_available() -> bool:
+    try:
+        import pptx  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def generate_corpus(directory: Path, formats: List[str], files: int, pages: int) -> Dict[str, List[Path]]:
+    """
+    Writes `files` documents of `pages` pages for each format into directory.
+
+    Returns:
+        The paths per format (pptx is left out if python-pptx is not installed)
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    corpus: Dict[str, List[Path]] = {}
+    for fmt in formats:
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown format '{fmt}', expected one of {FORMATS}")
+        if fmt == "pptx" and not pptx_available():
+            continue
+        paths = []
+        for idx in range(files):
+            seed = 1000 * FORMATS.index(fmt) + idx
+            if fmt == "pdf":
+                paths.append(write_pdf(directory / f"plain_{idx}.pdf", pages, tables=False, seed=seed))
+            elif fmt == "pdf_tables":
+                paths.append(write_pdf(directory / f"tables_{idx}.pdf", pages, tables=True, seed=seed))
+            elif fmt == "docx":
+                paths.append(write_docx(directory / f"doc_{idx}.docx", pages, seed=seed))
+            elif fmt == "pptx":
+                paths.append(write_pptx(directory / f"deck_{idx}.pptx", pages, seed=seed))
+            else:
+                paths.append(write_markdown(directory / f"notes_{idx}.md", pages, seed=seed))
+        corpus[fmt] = paths
+    return corpus
@@ -0,0 +1,179 @@
+"""
+OpenAI-compatible LLM stand-in for load tests of /generate and /generate/stream.
+
+Serves POST /v1/chat/completions (plain and stream=True) and GET /v1/models,
+answering with filler tokens at a controlled pace:
+
+- --ttft-ms (+/- --ttft-jitter-ms): delay before the first token
+- --tokens-per-s: decode speed, --tokens: answer length (capped by max_tokens)
+- --failure-rate: share of requests answered with --failure-status before any token
+- --drop-rate: share of streams cut mid-answer (connection closed without the final chunk)
+
+    cd backend
+    python -m benchmarks.mock_llm --port 8090 --ttft-ms 400 --tokens-per-s 40
+
+and point the workers at it with OPENAI_BASE_URL=http://localhost:8090/v1
+(any OPENAI_API_KEY). In compose: docker compose --profile loadtest up and
+OPENAI_BASE_URL=http://mock-llm:8090/v1. Note that the OpenAI client retries
+5xx and 429 answers (2 retries by default) before the job sees the failure.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+import uuid
+
+from dataclasses import dataclass
+from typing import Any, Dict
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+logger = logging.getLogger(__name__)
+
+FILLER = (
+    "the answer is based on the retrieved context which describes the procedure "
+    "for the maintenance of the component and the schedule of the inspection"
+).split()
+
+
+@dataclass
+class MockSettings:
+    ttft_ms: float = 300.0
+    ttft_jitter_ms: float = 0.0
+    tokens_per_s: float = 50.0
+    tokens: int = 200
+    failure_rate: float = 0.0
+    failure_status: int = 500
+    drop_rate: float = 0.0
+    seed: int = 0
+
+
+def _completion_id() -> str:
+    return f"chatcmpl-mock-{uuid.uuid4().hex[:12]}"
+
+
+def create_app(settings: MockSettings) -> FastAPI:
+    app = FastAPI(title="KnowHub mock LLM")
+    rng = random.Random(settings.seed)
+    stats = {"requests": 0, "streams": 0, "failed": 0, "dropped": 0, "tokens": 0}
+
+    def ttft_seconds() -> float:
+        jitter = rng.uniform(-settings.ttft_jitter_ms, settings.ttft_jitter_ms)
+        return max(0.0, settings.ttft_ms + jitter) / 1000.0
+
+    def n_tokens(body: Dict[str, Any]) -> int:
+        max_tokens = body.get("max_tokens") or body.get("max_completion_tokens")
+        return max(1, min(settings.tokens, int(max_tokens))) if max_tokens else settings.tokens
+
+    @app.get("/v1/models")
+    def models():
+        return {"object": "list", "data": [{"id": "mock", "object": "model", "owned_by": "knowhub"}]}
+
+    @app.get("/stats")
+    def get_stats():
+        return stats
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        model = body.get("model", "mock")
+        stats["requests"] += 1
+
+        if rng.random() < settings.failure_rate:
+            stats["failed"] += 1
+            return JSONResponse(
+                status_code=settings.failure_status,
+                content={"error": {"message": "Injected failure", "type": "server_error", "code": None}},
+            )
+
+        count = n_tokens(body)
+        ttft = ttft_seconds()
+        completion_id = _completion_id()
+        created = int(time.time())
+
+        if not body.get("stream"):
+            await asyncio.sleep(ttft + (count - 1) / settings.tokens_per_s)
+            stats["tokens"] += count
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": " ".join(FILLER[i % len(FILLER)] for i in range(count))},
+                    "finish_reason": "length" if count < settings.tokens else "stop",
+                }],
+                "usage": {"prompt_tokens": 0, "completion_tokens": count, "total_tokens": count},
+            }
+
+        stats["streams"] += 1
+        drop_at = rng.randrange(count) if rng.random() < settings.drop_rate else None
+
+        def chunk(delta: Dict[str, Any], finish_reason=None) -> str:
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            return f"data: {json.dumps(payload)}\n\n"
+
+        async def stream():
+            start = time.perf_counter()
+            await asyncio.sleep(ttft)  # Like the real API, even the role chunk comes after the prefill
+            yield chunk({"role": "assistant", "content": ""})
+            for i in range(count):
+                # Paced on the start time, so slow event loop iterations don't add up.
+                delay = start + ttft + i / settings.tokens_per_s - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                if i == drop_at:
+                    stats["dropped"] += 1
+                    raise ConnectionAbortedError("Injected stream drop")  # Ends the response without the last chunk
+                stats["tokens"] += 1
+                yield chunk({"content": ("" if i == 0 else " ") + FILLER[i % len(FILLER)]})
+            yield chunk({}, finish_reason="length" if count < settings.tokens else "stop")
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="OpenAI-compatible mock LLM for load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--ttft-ms", type=float, default=300.0, help="Time to first token")
+    parser.add_argument("--ttft-jitter-ms", type=float, default=0.0, help="Uniform jitter added to the time to first token")
+    parser.add_argument("--tokens-per-s", type=float, default=50.0, help="Decode speed of each stream")
+    parser.add_argument("--tokens", type=int, default=200, help="Tokens per answer (capped by the request max_tokens)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Share of requests failing before the first token")
+    parser.add_argument("--failure-status", type=int, default=500, help="HTTP status of the failed requests")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="Share of streams cut mid-answer")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    settings = MockSettings(
+        ttft_ms=args.ttft_ms,
+        ttft_jitter_ms=args.ttft_jitter_ms,
+        tokens_per_s=args.tokens_per_s,
+        tokens=args.tokens,
+        failure_rate=args.failure_rate,
+        failure_status=args.failure_status,
+        drop_rate=args.drop_rate,
+        seed=args.seed,
+    )
+    logger.warning(f"Mock LLM on {args.host}:{args.port}: {settings}")
+    uvicorn.run(create_app(settings), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+Load driver for the streaming generation endpoint (GET /api/v1/generate/stream).
+
+Keeps --concurrency SSE streams open at a time until --streams streams have
+been run, for each concurrency level, and reports per level:
+
+- time to first token (request sent -> first token event), p50/p95/p99
+- inter-token latency (gap between token events), p50/p95/p99
+- tokens/s per stream and in total, streams/s
+- streams ending with done, with an error event, and dropped (connection lost,
+  timeout or end of the response without a done / error event)
+
+    cd backend
+    python -m benchmarks.sse_load --url http://localhost:8000 --collection docs \\
+        --concurrency 1,8,32,64 --streams 64
+
+To keep the LLM provider out of the numbers (and the bill), run the workers
+against benchmarks.mock_llm (OPENAI_BASE_URL). Every stream gets a distinct
+query (a "#n" suffix) so that job coalescing doesn't merge them, --same-query
+measures the coalesced path instead.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+
+from typing import Any, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+from benchmarks.common import default_output, run_info, write_results
+
+logger = logging.getLogger(__name__)
+
+STREAM_PATH = "/api/v1/generate/stream"
+DEFAULT_QUERY = "What is the maintenance schedule of the component?"
+
+
+def _percentiles(values: List[float], prefix: str) -> Dict[str, Optional[float]]:
+    if not values:
+        return {f"{prefix}_p50_ms": None, f"{prefix}_p95_ms": None, f"{prefix}_p99_ms": None}
+    array = np.asarray(values)
+    return {
+        f"{prefix}_p50_ms": round(float(np.percentile(array, 50)), 2),
+        f"{prefix}_p95_ms": round(float(np.percentile(array, 95)), 2),
+        f"{prefix}_p99_ms": round(float(np.percentile(array, 99)), 2),
+    }
+
+
+async def run_stream(client: httpx.AsyncClient, params: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+    """
+    Reads one SSE stream to the end, returns its outcome (done, error, dropped) and timings.
+    """
+    result: Dict[str, Any] = {"outcome": "dropped", "tokens": 0, "ttft_ms": None, "gaps_ms": [], "error": None}
+    start = time.perf_counter()
+    last_token = None
+
+    async def read():
+        nonlocal last_token
+        async with client.stream("GET", STREAM_PATH, params=params) as response:
+            if response.status_code != 200:
+                result["outcome"] = "error"
+                result["error"] = f"HTTP {response.status_code}"
+                return
+            event, data = "message", []
+            async for line in response.aiter_lines():
+                if line.startswith("event:"):
+                    event = line[6:].strip()
+                elif line.startswith("data:"):
+                    data.append(line[5:].strip())
+                elif not line and data:
+                    # Blank line: dispatch the event.
+                    now = time.perf_counter()
+                    if event == "message":
+                        if last_token is None:
+                            result["ttft_ms"] = (now - start) * 1000
+                        else:
+                            result["gaps_ms"].append((now - last_token) * 1000)
+                        last_token = now
+                        result["tokens"] += 1
+                    elif event in ("done", "error"):
+                        result["outcome"] = event
+                        if event == "error":
+                            result["error"] = "\n".join(data)[:200]
+                        return
+                    event, data = "message", []
+
+    try:
+        await asyncio.wait_for(read(), timeout=timeout)
+        if result["outcome"] == "dropped":
+            result["error"] = "Stream ended without a done or error event"
+    except asyncio.TimeoutError:
+        result["error"] = f"Timeout after {timeout}s"
+    except httpx.HTTPError as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+
+    result["duration_ms"] = (time.perf_counter() - start) * 1000
+    return result
+
+
+async def run_level(url: str,
+                    base_params: Dict[str, Any],
+                    concurrency: int,
+                    streams: int,
+                    timeout: float,
+                    distinct: bool,
+                    offset: int,
+                    ) -> Dict[str, Any]:
+    """
+    Runs `streams` streams, `concurrency` at a time, and aggregates them.
+    """
+    queue = list(range(offset, offset + streams))
+    results: List[Dict[str, Any]] = []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=httpx.Timeout(timeout)) as client:
+        async def worker():
+            while queue:
+                n = queue.pop(0)
+                params = dict(base_params)
+                if distinct:
+                    params["query"] = f"{params['query']} #{n}"
+                results.append(await run_stream(client, params, timeout))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    outcomes = {outcome: sum(1 for r in results if r["outcome"] == outcome) for outcome in ("done", "error", "dropped")}
+    finished = [r for r in results if r["outcome"] == "done"]
+    gaps = [gap for r in finished for gap in r["gaps_ms"]]
+    stream_rates = [
+        r["tokens"] / ((r["duration_ms"] - r["ttft_ms"]) / 1000.0)
+        for r in finished if r["ttft_ms"] is not None and r["tokens"] > 1 and r["duration_ms"] > r["ttft_ms"]
+    ]
+    errors = sorted({r["error"] for r in results if r["error"]})
+
+    return {
+        "concurrency": concurrency,
+        "streams": len(results),
+        **outcomes,
+        "dropped_rate": round(outcomes["dropped"] / len(results), 4) if results else None,
+        **_percentiles([r["ttft_ms"] for r in finished if r["ttft_ms"] is not None], "ttft"),
+        **_percentiles(gaps, "itl"),
+        "stream_tokens_per_s_p50": round(float(np.median(stream_rates)), 2) if stream_rates else None,
+        "tokens_per_s": round(sum(r["tokens"] for r in results) / elapsed, 2) if elapsed > 0 else None,
+        "streams_per_s": round(len(results) / elapsed, 3) if elapsed > 0 else None,
+        "wall_s": round(elapsed, 2),
+        "errors": errors[:10],
+    }
+
+
+def run(url: str,
+        collection: str,
+        query: str,
+        concurrencies: List[int],
+        streams: Optional[int],
+        k: int = 10,
+        timeout: float = 120.0,
+        distinct: bool = True,
+        ) -> Dict[str, Any]:
+    """
+    Runs every concurrency level in turn, returns the results (see the module docstring).
+    """
+    results = run_info({
+        "url": url,
+        "collection": collection,
+        "query": query,
+        "k": k,
+        "concurrency": concurrencies,
+        "streams": streams,
+        "timeout": timeout,
+        "distinct_queries": distinct,
+    })
+    base_params = {"query": query, "collection": collection, "k": k}
+
+    levels = []
+    offset = int(time.time())  # Distinct queries from one run to the next too (no cached answers)
+    for concurrency in concurrencies:
+        count = streams or concurrency * 4
+        logger.warning(f"{count} stream(s), {concurrency} at a time")
+        level = asyncio.run(run_level(url, base_params, concurrency, count, timeout, distinct, offset))
+        offset += count
+        logger.warning(json.dumps(level))
+        levels.append(level)
+    results["levels"] = levels
+    return results
+
+
+def _ints(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="KnowHub SSE generation load driver")
+    parser.add_argument("--url", default=os.getenv("BENCH_API_URL", "http://localhost:8000"), help="Base URL of the API")
+    parser.add_argument("--collection", required=True)
+    parser.add_argument("--query", default=DEFAULT_QUERY)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--concurrency", type=_ints, default=[1, 8, 32], help="Comma separated numbers of concurrent streams")
+    parser.add_argument("--streams", type=int, default=None, help="Streams per level (4 x concurrency by default)")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Seconds before a stream counts as dropped")
+    parser.add_argument("--same-query", action="store_true", help="Same query for every stream (coalesced jobs)")
+    parser.add_argument("--out", default=None, help="JSON output path (- for stdout), benchmarks/results/sse_load_<commit>.json by default")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    results = run(
+        url=args.url,
+        collection=args.collection,
+        query=args.query,
+        concurrencies=args.concurrency,
+        streams=args.streams,
+        k=args.k,
+        timeout=args.timeout,
+        distinct=not args.same_query,
+    )
+    write_results(results, args.out or default_output("sse_load", results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import json
+import os
+import subprocess
+import sys
+
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("dramatiq")
+
+BACKEND_DIR = Path(__file__).resolve().parents[1] / "backend"
+
+# Budget of `import app.main` in a fresh interpreter (FastAPI alone is a good part of it).
+IMPORT_BUDGET_SECONDS = float(os.getenv("IMPORT_BUDGET_SECONDS", "2.0"))
+
+# Loaded on first use only, never on the API import path.
+HEAVY_MODULES = ("torch", "transformers", "minio", "camelot", "pdfplumber", "langchain_community")
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "modules": sorted(sys.modules)}))
+"""
+
+
+def _import_app_main():
+    env = dict(os.environ, PRELOAD_EMBEDDER="false")
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    if out.returncode != 0:
+        # fastapi and dramatiq are there (importorskip above): a failing import is a broken app, not a missing extra.
+        pytest.fail(f"import app.main failed:\n{out.stderr.strip()}")
+    # The last line is the probe output, the app may print before it.
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def test_api_import_skips_heavy_modules():
+    result = _import_app_main()
+    loaded = set(result["modules"])
+    assert not [module for module in HEAVY_MODULES if module in loaded]
+
+
+def test_api_import_within_budget():
+    result = _import_app_main()
+    assert result["seconds"] < IMPORT_BUDGET_SECONDS, f"import app.main took {result['seconds']:.2f}s"
@@ -0,0 +1,71 @@
+import sys
+
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("dramatiq")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.api.v1.routes import ingest  # noqa: E402
+
+
+class _Bucket:
+    def __init__(self, keys):
+        self.keys = set(keys)
+
+    def object_exists(self, key):
+        return key in self.keys
+
+
+@pytest.fixture
+def client(monkeypatch):
+    sent = []
+
+    def send(**kwargs):
+        sent.append(kwargs)
+        return SimpleNamespace(message_id=f"job-{len(sent)}", queue_name="ingest-validate")
+
+    monkeypatch.setattr(ingest, "get_minio_client", lambda: _Bucket({"raw/a.pdf", "raw/b.pdf"}))
+    monkeypatch.setattr(ingest.validate_and_promote, "send", send)
+    monkeypatch.setattr(ingest, "save_batch", lambda job_ids, actor_name, queue: "batch-1")
+
+    app = FastAPI()
+    app.include_router(ingest.router)
+    test_client = TestClient(app)
+    test_client.sent = sent
+    return test_client
+
+
+def _item(doc_id, s3_key, **extra):
+    return {"doc_id": doc_id, "s3_key": s3_key, "filename": f"{doc_id}.pdf", "collection": "docs", **extra}
+
+
+def test_enqueue_batch_without_tenant(client):
+    response = client.post("/ingest/enqueue/batch", json={
+        "collection": "docs",
+        "items": [_item("a", "raw/a.pdf"), _item("missing", "raw/missing.pdf")],
+    })
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["job_ids"] == ["job-1"]
+    assert body["file_refused"] == ["missing"]
+    assert body["batch_id"] == "batch-1"
+    assert client.sent[0]["tenant"] is None
+
+
+def test_enqueue_batch_item_tenant(client):
+    response = client.post("/ingest/enqueue/batch", json={
+        "collection": "docs",
+        "items": [_item("a", "raw/a.pdf", tenant="acme"), _item("b", "raw/b.pdf")],
+    })
+
+    assert response.status_code == 200
+    assert [sent["tenant"] for sent in client.sent] == ["acme", None]
@@ -0,0 +1,47 @@
+import sys
+
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("dramatiq")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.api.v1.routes import jobs  # noqa: E402
+from app.core import job_status  # noqa: E402
+
+
+def _client(monkeypatch, status):
+    monkeypatch.setattr(job_status, "job_refs", lambda job_ids, actor_name, queue: [
+        job_status.JobRef(job_id, actor_name, "ingest-validate") for job_id in job_ids
+    ])
+    monkeypatch.setattr(job_status, "fetch_statuses", lambda refs, include_results, follow: {
+        ref.job_id: {"status": status, "state": status} for ref in refs
+    })
+    monkeypatch.setattr(jobs, "JOB_STATUS_POLL_MS", 10)
+
+    app = FastAPI()
+    app.include_router(jobs.router, prefix="/jobs")
+    return TestClient(app)
+
+
+def test_long_poll_of_finished_jobs_is_not_a_timeout(monkeypatch):
+    client = _client(monkeypatch, job_status.DONE)
+    body = client.post("/jobs/status", json={"job_ids": ["a", "b"], "wait_ms": 5000}).json()
+
+    assert body["pending"] == 0
+    assert body["changed"] == []
+    assert body["timed_out"] is False
+
+
+def test_long_poll_of_pending_jobs_times_out(monkeypatch):
+    client = _client(monkeypatch, job_status.PENDING)
+    body = client.post("/jobs/status", json={"job_ids": ["a"], "wait_ms": 50}).json()
+
+    assert body["pending"] == 1
+    assert body["timed_out"] is True
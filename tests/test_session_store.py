@@ -0,0 +1,49 @@
+import json
+import sys
+
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("psycopg")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from app.core.session_store import JsonlSessionSink  # noqa: E402
+
+
+@pytest.fixture
+def sink(tmp_path):
+    sink = JsonlSessionSink(directory=tmp_path, flush_interval=3600)
+    yield sink
+    sink.close()
+
+
+def _write_file(directory: Path, hour: str, *timestamps: str):
+    lines = "".join(json.dumps({"timestamp": ts, "job_id": ts}) + "\n" for ts in timestamps)
+    (directory / f"sessions-{hour}-1-000.jsonl").write_text(lines, encoding="utf-8")
+
+
+def test_read_sessions_flushed_in_the_next_hour(sink):
+    # Written at 11:00 UTC (flush time), timestamped 10:59.
+    _write_file(sink.directory, "20261019T11", "2026-10-19T10:59:59+00:00")
+
+    sessions = sink.read_sessions(
+        datetime(2026, 10, 19, 10, tzinfo=timezone.utc),
+        datetime(2026, 10, 19, 11, tzinfo=timezone.utc),
+    )
+    assert [s["job_id"] for s in sessions] == ["2026-10-19T10:59:59+00:00"]
+
+
+def test_read_sessions_with_a_non_utc_window(sink):
+    _write_file(sink.directory, "20261019T08", "2026-10-19T08:15:00+00:00")
+    _write_file(sink.directory, "20261019T10", "2026-10-19T10:15:00+00:00")
+
+    # 10:00-11:00 at +02:00 is 08:00-09:00 UTC.
+    plus_two = timezone(timedelta(hours=2))
+    sessions = sink.read_sessions(
+        datetime(2026, 10, 19, 10, tzinfo=plus_two),
+        datetime(2026, 10, 19, 11, tzinfo=plus_two),
+    )
+    assert [s["job_id"] for s in sessions] == ["2026-10-19T08:15:00+00:00"]